@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Compare the CPU and memory cost of the brown noise engines
+
+Generates a minute of brown noise in process (pure Python and, when
+installed, NumPy) and, when mpg123 and the bundled MP3 are available,
+decodes a minute of the file with mpg123 for comparison. Decoding runs
+as fast as possible, so the numbers are CPU seconds per minute of audio
+rather than wall time.
+
+    python benchmarks/audio_engine.py [--seconds 60]
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.constants import BROWN_NOISE_FILE, DEFAULT_VOLUME
+from src.noise import BrownNoise, _import_numpy
+
+
+def rss_kib():
+    """Resident set size of this process in KiB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_generated(seconds, use_numpy):
+    noise = BrownNoise(volume=float(DEFAULT_VOLUME), seed=1, use_numpy=use_numpy)
+    blocks = int(seconds * noise.sample_rate / noise.block_frames) + 1
+    before = rss_kib()
+    start = time.process_time()
+    for _ in range(blocks):
+        noise.block()
+    cpu = time.process_time() - start
+    return cpu, rss_kib() - before
+
+
+def bench_mpg123(seconds):
+    mp3 = os.path.join(os.path.dirname(__file__), '..', 'src', BROWN_NOISE_FILE)
+    if shutil.which('mpg123') is None or not os.path.exists(mp3):
+        return None
+    # MPEG-1 layer III frames hold 1152 samples; assume 44.1 kHz
+    frames = int(seconds * 44100 / 1152) + 1
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    subprocess.run(['mpg123', '-q', '-t', '-n', str(frames), mp3], check=True)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return cpu, after.ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60, help='Length of audio to produce')
+    args = parser.parse_args()
+    
+    rows = [('generated (array)',) + bench_generated(args.seconds, False)]
+    if _import_numpy():
+        rows.append(('generated (numpy)',) + bench_generated(args.seconds, True))
+    mpg123 = bench_mpg123(args.seconds)
+    if mpg123:
+        rows.append(('mpg123 subprocess',) + mpg123)
+    
+    print(f"{'engine':<20} {'CPU s/audio min':>16} {'CPU %':>7} {'RSS KiB':>9}")
+    for name, cpu, rss in rows:
+        per_minute = cpu * 60 / args.seconds
+        print(f"{name:<20} {per_minute:>16.3f} {100 * per_minute / 60:>6.2f}% {rss:>9}")
+    if not mpg123:
+        print("mpg123 or the bundled MP3 is not available; subprocess engine skipped")
+    print("RSS for generated engines is the growth of this process; for mpg123 it is the child's peak")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Stress concurrent stats logging from many processes
+
+N processes each log M sessions into one stats directory at the same
+time, then the counters are checked against what was logged and the
+throughput is reported. A lost update or an interleaved record shows up
+as a mismatch.
+
+    python benchmarks/concurrent_logging.py --processes 8 --sessions 500
+"""
+
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.constants import SESSION_TYPES
+from src.stats import SessionStats
+
+
+def session(worker, index):
+    """The deterministic session a worker logs at a given index"""
+    session_type = SESSION_TYPES[(worker + index) % len(SESSION_TYPES)]
+    return session_type, 1 + index % 5, index % 3 != 0
+
+
+def expected_counters(processes, sessions):
+    by_type = {session_type: 0 for session_type in SESSION_TYPES}
+    minutes = 0
+    for worker in range(processes):
+        for index in range(sessions):
+            session_type, duration, completed = session(worker, index)
+            by_type[session_type] += 1
+            minutes += duration if completed else 0
+    return {'total_sessions': processes * sessions, 'total_minutes': minutes, 'sessions_by_type': by_type}
+
+
+def log_sessions(stats_dir, backend, worker, sessions, barrier):
+    stats = SessionStats(stats_dir, backend)
+    barrier.wait()
+    for index in range(sessions):
+        session_type, duration, completed = session(worker, index)
+        stats.log_session(session_type, duration, completed=completed)
+
+
+def run(backend, processes, sessions):
+    """Return (elapsed seconds, counters, expected counters) for one run"""
+    stats_dir = tempfile.mkdtemp()
+    try:
+        barrier = multiprocessing.Barrier(processes + 1)
+        workers = [
+            multiprocessing.Process(target=log_sessions, args=(stats_dir, backend, worker, sessions, barrier))
+            for worker in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        
+        summary = SessionStats(stats_dir, backend).get_summary()
+        counters = {key: summary[key] for key in ('total_sessions', 'total_minutes', 'sessions_by_type')}
+        return elapsed, counters, expected_counters(processes, sessions)
+    finally:
+        shutil.rmtree(stats_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', '-n', type=int, default=8, help='Concurrent writer processes')
+    parser.add_argument('--sessions', '-m', type=int, default=500, help='Sessions logged by each process')
+    parser.add_argument('--backend', choices=['json', 'sqlite', 'all'], default='all')
+    args = parser.parse_args()
+    
+    backends = ['json', 'sqlite'] if args.backend == 'all' else [args.backend]
+    exact = True
+    print(f"{args.processes} processes x {args.sessions} sessions")
+    print(f"{'backend':<8} {'seconds':>8} {'sessions/s':>11}  counters")
+    for backend in backends:
+        elapsed, counters, expected = run(backend, args.processes, args.sessions)
+        ok = counters == expected
+        exact = exact and ok
+        rate = args.processes * args.sessions / elapsed
+        print(f"{backend:<8} {elapsed:>8.2f} {rate:>11.0f}  {'exact' if ok else 'MISMATCH'}")
+        if not ok:
+            print(f"  expected {expected}\n  got      {counters}")
+    sys.exit(0 if exact else 1)
+
+
+if __name__ == '__main__':
+    main()
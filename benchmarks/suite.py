@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Benchmark the timer, stats and audio hot paths with percentiles
+
+Every benchmark is run repeatedly and reported as p50/p90/p99 in
+milliseconds. Results can be saved as JSON and compared against a
+baseline from another commit; the comparison exits with status 1 when a
+median got slower by more than the threshold.
+
+    python benchmarks/suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/suite.py --compare before.json
+
+Groups (select with --only): cli (cold start per subcommand), log
+(log_session against histories of --sizes sessions), summary
+(get_summary and display_stats, cold and cached), tick (countdown tick
+lateness and CPU per session minute) and audio (AudioPlayer start/stop
+with stub outputs). --cprofile DIR also writes a cProfile dump per group.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from src import records, summarycache
+from src.audio import AudioPlayer
+from src.clock import SystemClock
+from src.constants import SESSION_TYPES, BROWN_NOISE_FILE
+from src.countdown import Countdown
+from src.stats import SessionStats
+from src.storage import open_backend
+
+
+GROUPS = ('cli', 'log', 'summary', 'tick', 'audio')
+BACKENDS = ('json', 'sqlite', 'binary')
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+
+CLI_COMMANDS = (
+    ['--version'], ['--help'], ['--list-modes'], ['status'],
+    ['stats'], ['stats', '--by', 'week'], ['stats', '--heatmap'], ['pause'],
+)
+
+# Generated histories: ten sessions a day, squeezed into ten years when larger
+SESSION_SPACING = 24 * 3600 // 10
+HISTORY_SECONDS = 10 * 365 * 24 * 3600
+
+
+def percentile(samples, fraction):
+    """Linear-interpolated percentile of sorted samples"""
+    if len(samples) == 1:
+        return samples[0]
+    position = (len(samples) - 1) * fraction
+    low = math.floor(position)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (position - low)
+
+
+def describe(samples_ms, **extra):
+    """Percentile summary of a list of millisecond samples"""
+    samples = sorted(samples_ms)
+    result = {
+        'n': len(samples),
+        'p50': percentile(samples, 0.5),
+        'p90': percentile(samples, 0.9),
+        'p99': percentile(samples, 0.99),
+        'min': samples[0],
+        'max': samples[-1],
+        'mean': sum(samples) / len(samples),
+    }
+    result.update(extra)
+    return result
+
+
+def measure(fn, repeat, budget=2.0, setup=None):
+    """Time fn up to repeat times, stopping early (after 3 runs) once budget seconds are spent"""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        if len(samples) >= 3 and time.perf_counter() - started > budget:
+            break
+    return describe(samples)
+
+
+def history(size):
+    """(epoch, type, minutes, completed) for size sessions ending now, oldest first"""
+    spacing = min(SESSION_SPACING, HISTORY_SECONDS // max(size, 1))
+    end = int(time.time()) - 3600
+    for index in range(size):
+        yield (end - (size - index) * spacing, SESSION_TYPES[index % 3],
+               (5, 15, 25)[index % 3], index % 5 != 0)
+
+
+def build_history(backend_name, stats_dir, size):
+    """Fill a stats directory with size sessions, bypassing log_session"""
+    backend = open_backend(backend_name, stats_dir)
+    backend._ensure_dir()
+    if backend_name == 'binary':
+        data = b''.join(
+            records.RECORD.pack(epoch, minutes * 60, SESSION_TYPES.index(session_type),
+                                records.FLAG_COMPLETED if completed else 0, 1)
+            for epoch, session_type, minutes, completed in history(size)
+        )
+        backend._write(data)
+    elif backend_name == 'sqlite':
+        conn = backend.conn
+        with conn:
+            conn.executemany(
+                "INSERT INTO sessions (timestamp, type, duration, completed) VALUES (?, ?, ?, ?)",
+                ((datetime.fromtimestamp(epoch).isoformat(), session_type, minutes, int(completed))
+                 for epoch, session_type, minutes, completed in history(size))
+            )
+            conn.execute("INSERT INTO totals (type, sessions, minutes) SELECT type, COUNT(*), "
+                         "SUM(CASE WHEN completed THEN duration ELSE 0 END) FROM sessions GROUP BY type")
+            conn.executescript(backend.BACKFILL_ROLLUPS)
+    else:
+        stats, _ = backend._replay()
+        for epoch, session_type, minutes, completed in history(size):
+            record = {'timestamp': datetime.fromtimestamp(epoch).isoformat(), 'type': session_type,
+                      'duration': minutes, 'completed': completed}
+            backend._apply_record(stats, record)
+        backend._downsample(stats)
+        backend._save_snapshot(stats)
+    backend.close()
+
+
+def bench_cli(args):
+    results = {}
+    home = tempfile.mkdtemp()
+    env = dict(os.environ, HOME=home)
+    try:
+        for argv in CLI_COMMANDS:
+            def run():
+                subprocess.run([sys.executable, '-m', 'src.cli', *argv], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            results[f"cli {' '.join(argv)}"] = measure(run, args.cli_repeat, budget=30)
+    finally:
+        shutil.rmtree(home)
+    return results
+
+
+def with_histories(args, fn):
+    """Call fn(backend, size, stats) for every backend and history size"""
+    results = {}
+    for backend in args.backends:
+        for size in args.sizes:
+            stats_dir = Path(tempfile.mkdtemp())
+            try:
+                build_history(backend, stats_dir, size)
+                summarycache._entries.clear()
+                stats = SessionStats(stats_dir=stats_dir, backend=backend)
+                for name, result in fn(stats).items():
+                    results[f"{name} {backend} {size}"] = result
+                stats.backend.close()
+            finally:
+                shutil.rmtree(stats_dir)
+    return results
+
+
+def bench_log(args):
+    def run(stats):
+        return {'log_session': measure(lambda: stats.log_session('long', 25), args.repeat)}
+    return with_histories(args, run)
+
+
+def bench_summary(args):
+    def run(stats):
+        with redirect_stdout(io.StringIO()):
+            return {
+                'get_summary cold': measure(stats.get_summary, args.repeat, setup=stats.cache.invalidate),
+                'get_summary cached': measure(stats.get_summary, args.repeat),
+                'display_stats cached': measure(stats.display_stats, args.repeat),
+            }
+    return with_histories(args, run)
+
+
+def bench_tick(args):
+    """Lateness of each countdown tick after its whole-second boundary"""
+    clock = SystemClock()
+    countdown = Countdown(args.tick_seconds, clock)
+    lateness = []
+
+    def on_tick(seconds_left):
+        lateness.append((clock.now() - (countdown.deadline - seconds_left)) * 1000)
+
+    cpu = time.process_time()
+    countdown.run(on_tick)
+    cpu = time.process_time() - cpu
+    minutes = args.tick_seconds / 60
+    return {'tick lateness': describe(lateness, cpu_ms_per_minute=cpu * 1000 / minutes)}
+
+
+class PacedSink:
+    """Sound card stand-in that accepts audio at the playback rate"""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.closed = threading.Event()
+
+    def write(self, pcm):
+        if self.closed.wait(len(pcm) / 2 / self.sample_rate):
+            raise OSError("sink closed")
+
+    def finish(self):
+        self.closed.set()
+
+    def close(self):
+        self.closed.set()
+
+
+def bench_audio(args):
+    results = {}
+    player = AudioPlayer(engine='generated')
+    with mock.patch('src.noise.open_sink', PacedSink):
+        results['audio generated start'] = measure(player.start_brown_noise, args.repeat,
+                                                   setup=player.stop_brown_noise)
+        player.stop_brown_noise()
+        results['audio generated stop'] = measure(player.stop_brown_noise, args.repeat,
+                                                  setup=player.start_brown_noise)
+
+    # A fake mpg123 that reads commands until its stdin closes, and a file for it to "play"
+    bin_dir = tempfile.mkdtemp()
+    try:
+        stub = os.path.join(bin_dir, 'mpg123')
+        with open(stub, 'w') as f:
+            f.write('#!/bin/sh\nexec cat >/dev/null\n')
+        os.chmod(stub, 0o755)
+        Path(bin_dir, BROWN_NOISE_FILE).touch()
+        player = AudioPlayer(engine='file')
+        player.system = 'Linux'
+        player.audio_dir = bin_dir
+        with mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ.get('PATH', '')}):
+            results['audio file start'] = measure(player.start_brown_noise, args.repeat,
+                                                  setup=player.stop_brown_noise)
+            player.stop_brown_noise()
+            results['audio file stop'] = measure(player.stop_brown_noise, args.repeat,
+                                                 setup=player.start_brown_noise)
+    finally:
+        shutil.rmtree(bin_dir)
+    return results
+
+
+BENCHMARKS = {
+    'cli': bench_cli,
+    'log': bench_log,
+    'summary': bench_summary,
+    'tick': bench_tick,
+    'audio': bench_audio,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results):
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        extra = f"  cpu {result['cpu_ms_per_minute']:.1f} ms/min" if 'cpu_ms_per_minute' in result else ""
+        print(f"{name:<{width}} {result['n']:>5} {result['p50']:>9.3f} {result['p90']:>9.3f} {result['p99']:>9.3f}{extra}")
+
+
+def compare(baseline, results, threshold, min_delta):
+    """Print median changes against a baseline; returns the names that regressed"""
+    regressions = []
+    common = [name for name in results if name in baseline]
+    if not common:
+        print("No benchmarks in common with the baseline")
+        return regressions
+    width = max(len(name) for name in common)
+    print(f"{'benchmark':<{width}} {'base p50':>9} {'p50':>9} {'change':>8}")
+    for name in common:
+        before, after = baseline[name]['p50'], results[name]['p50']
+        change = (after - before) / before if before else 0.0
+        slower = change > threshold and after - before > min_delta
+        if slower:
+            regressions.append(name)
+        print(f"{name:<{width}} {before:>9.3f} {after:>9.3f} {change:>+7.1%}{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', default=','.join(GROUPS), help=f"Comma-separated groups out of {', '.join(GROUPS)}")
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='Stats backends for the log and summary groups')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='History sizes in sessions')
+    parser.add_argument('--repeat', type=int, default=200, help='Samples per benchmark (fewer if a run is slow)')
+    parser.add_argument('--cli-repeat', type=int, default=10, help='Samples per CLI command')
+    parser.add_argument('--tick-seconds', type=int, default=10, help='Length of the countdown measured for tick jitter')
+    parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier run to compare medians against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown counted as a regression')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='Ignore slowdowns smaller than this many ms')
+    parser.add_argument('--cprofile', metavar='DIR', help='Write a cProfile dump per group to DIR')
+    args = parser.parse_args()
+    args.backends = [name for name in args.backends.split(',') if name]
+    args.sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    groups = [name for name in args.only.split(',') if name]
+    for name in groups:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown group: {name}")
+
+    results = {}
+    for name in groups:
+        print(f"Running {name}...", file=sys.stderr)
+        if args.cprofile:
+            os.makedirs(args.cprofile, exist_ok=True)
+            profiler = cProfile.Profile()
+            results.update(profiler.runcall(BENCHMARKS[name], args))
+            profiler.dump_stats(os.path.join(args.cprofile, f"{name}.prof"))
+        else:
+            results.update(BENCHMARKS[name](args))
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        print()
+        regressions = compare(baseline, results, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -31,14 +31,13 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     entry_points={
         "console_scripts": [
             "samaya=src.cli:main",
@@ -48,6 +47,10 @@ setup(
         # No external dependencies required
     ],
     extras_require={
+        "audio": [
+            "numpy",
+            "sounddevice",
+        ],
         "dev": [
             "pytest",
             "black",
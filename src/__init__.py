@@ -1,4 +1,21 @@
-from .timer import SessionTimer
-from .audio import AudioPlayer
+from ._version import __version__
 
-__all__ = ['SessionTimer', 'AudioPlayer']
\ No newline at end of file
+__all__ = ['SessionTimer', 'SessionStats', 'SessionRecord', 'AudioPlayer']
+
+
+def __getattr__(name):
+    # Imported on first use so that light commands such as `samaya status`
+    # do not pay for the timer, audio and stats modules.
+    if name == 'SessionTimer':
+        from .timer import SessionTimer
+        return SessionTimer
+    if name == 'SessionStats':
+        from .stats import SessionStats
+        return SessionStats
+    if name == 'SessionRecord':
+        from .storage import SessionRecord
+        return SessionRecord
+    if name == 'AudioPlayer':
+        from .audio import AudioPlayer
+        return AudioPlayer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -3,23 +3,151 @@
 import time
 import subprocess
 import platform
+import shutil
+import signal
+import threading
 import os
-from .constants import BROWN_NOISE_FILE, BELL_SOUND_FILE, DEFAULT_VOLUME, AUDIO_TIMEOUT
+from .constants import (
+    BROWN_NOISE_FILE, BELL_SOUND_FILE, DEFAULT_VOLUME, AUDIO_TIMEOUT,
+    AUDIO_ENGINE_ENV, DEFAULT_AUDIO_ENGINE
+)
+from .metrics import metrics
 
 
-class AudioPlayer:
-    """Handles playing audio notifications for different platforms"""
+class Mpg123Remote:
+    """One long-lived `mpg123 -R` that plays files on command
+    
+    Starting, pausing and stopping noise are single lines written to its
+    stdin, so only the first session pays for spawning a decoder. A dead
+    process is replaced on the next play().
+    """
     
     def __init__(self):
+        self.process = None
+        self.spawned = 0
+        self._current = 0
+        self._paused = False
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def available():
+        return shutil.which('mpg123') is not None
+    
+    def play(self, path):
+        """Play path from the start; returns a RemoteVoice for it"""
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self.process = subprocess.Popen(
+                    ["mpg123", "-R"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    universal_newlines=True
+                )
+                self.spawned += 1
+            self._send(f"LOAD {path}")
+            self._current += 1
+            self._paused = False
+            return RemoteVoice(self, self._current)
+    
+    def _update(self, token, paused=None, stop=False):
+        with self._lock:
+            if token != self._current or self.process is None:
+                return False
+            try:
+                if stop:
+                    self._send("STOP")
+                    self._current += 1
+                elif paused != self._paused:
+                    # PAUSE toggles
+                    self._send("PAUSE")
+                    self._paused = paused
+            except OSError:
+                return False
+        return True
+    
+    def _send(self, command):
+        self.process.stdin.write(command + "\n")
+        self.process.stdin.flush()
+
+
+class RemoteVoice:
+    """Controls one file played by an Mpg123Remote; stale voices do nothing"""
+    
+    __slots__ = ('remote', 'token')
+    
+    def __init__(self, remote, token):
+        self.remote = remote
+        self.token = token
+    
+    def pause(self):
+        return self.remote._update(self.token, paused=True)
+    
+    def resume(self):
+        return self.remote._update(self.token, paused=False)
+    
+    def stop(self):
+        return self.remote._update(self.token, stop=True)
+
+
+_mpg123_remote = None
+
+
+def mpg123_remote():
+    """The process-wide Mpg123Remote, or None if mpg123 is not installed"""
+    global _mpg123_remote
+    if _mpg123_remote is None and Mpg123Remote.available():
+        _mpg123_remote = Mpg123Remote()
+    return _mpg123_remote
+
+
+class AudioPlayer:
+    """Handles playing audio notifications for different platforms
+    
+    engine selects how sound is produced: "file" plays the bundled files
+    through external players, "generated" synthesizes brown noise and the
+    bell in process (see noise.py), and "auto" uses the generated engine
+    whenever a PCM output is available and falls back to files otherwise.
+    
+    Players stay warm across sessions: generated audio goes through one
+    WarmOutput per process (output, by default noise.warm_output()) and
+    on Linux the brown noise file through one `mpg123 -R`, so starting,
+    pausing and stopping noise or ringing the bell never spawns a process
+    once the first session has run.
+    """
+    
+    ENGINES = ('auto', 'generated', 'file')
+    
+    def __init__(self, engine=None, output=None):
         self.system = platform.system()
         self.audio_dir = os.path.dirname(__file__)
         self.brown_noise_process = None
+        # Voice of the noise playing on a warm output or mpg123 -R
+        self.noise_engine = None
+        self._output = output
+        self.engine = engine or os.environ.get(AUDIO_ENGINE_ENV, DEFAULT_AUDIO_ENGINE)
+        if self.engine not in self.ENGINES:
+            raise ValueError(f"Unknown audio engine: {self.engine}")
     
+    @property
+    def output(self):
+        """WarmOutput for generated noise and the bell"""
+        if self._output is None:
+            from .noise import warm_output
+            self._output = warm_output()
+        return self._output
     
     def play_bell_sound(self):
         """Play end notification sound"""
+        with metrics.span('bell'):
+            self._play_bell_sound()
+    
+    def _play_bell_sound(self):
         bell_path = os.path.join(self.audio_dir, BELL_SOUND_FILE)
         
+        if self.engine != 'file' and self._play_generated_bell(bell_path):
+            return
+        
         try:
             if os.path.exists(bell_path):
                 if self.system == "Darwin":
@@ -34,8 +162,19 @@ class AudioPlayer:
                 self._play_fallback_bell()
         except Exception as e:
             print(f"Audio error: {e}")
+            metrics.count('samaya_audio_failures', operation='bell')
             self._play_fallback_bell()
     
+    def _play_generated_bell(self, bell_path):
+        """Play the bell from a PCM buffer decoded once per process"""
+        from .noise import bell_pcm
+        try:
+            return self.output.play(bell_pcm(bell_path if os.path.exists(bell_path) else None))
+        except Exception as e:
+            print(f"Audio error: {e}")
+            metrics.count('samaya_audio_failures', operation='bell')
+            return False
+    
     def _play_windows_bell_file(self, bell_path):
         """Play bell sound file on Windows"""
         try:
@@ -56,6 +195,20 @@ class AudioPlayer:
     
     def start_brown_noise(self):
         """Start playing brown noise in background"""
+        with metrics.span('noise_start'):
+            started = self._start_brown_noise()
+        if not started:
+            metrics.count('samaya_audio_failures', operation='noise_start')
+        return started
+    
+    def _start_brown_noise(self):
+        if self.engine != 'file':
+            if self._start_generated_noise():
+                return True
+            if self.engine == 'generated':
+                print("No audio output available for generated brown noise")
+                return False
+        
         brown_noise_path = os.path.join(self.audio_dir, BROWN_NOISE_FILE)
         
         if not os.path.exists(brown_noise_path):
@@ -69,6 +222,8 @@ class AudioPlayer:
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL
                 )
+            elif self.system == "Linux" and mpg123_remote() is not None:
+                self.noise_engine = mpg123_remote().play(brown_noise_path)
             elif self.system == "Linux":
                 self.brown_noise_process = subprocess.Popen(
                     ["mpg123", "-q", brown_noise_path],
@@ -87,15 +242,69 @@ class AudioPlayer:
             print(f"Could not start brown noise: {e}")
             return False
     
+    def _start_generated_noise(self):
+        """Stream brown noise synthesized in process to the audio output"""
+        from .noise import BrownNoise
+        try:
+            voice = self.output.start_noise(BrownNoise(volume=float(DEFAULT_VOLUME)))
+        except Exception as e:
+            print(f"Could not start brown noise: {e}")
+            return False
+        if voice is None:
+            return False
+        self.noise_engine = voice
+        return True
+    
+    def pause_brown_noise(self):
+        """Silence the brown noise until resume_brown_noise()"""
+        if self.noise_engine is not None:
+            self.noise_engine.pause()
+        elif self.brown_noise_process and self.system != "Windows":
+            self._signal_process(signal.SIGSTOP)
+    
+    def resume_brown_noise(self):
+        """Continue brown noise paused by pause_brown_noise()"""
+        if self.noise_engine is not None:
+            self.noise_engine.resume()
+        elif self.brown_noise_process and self.system != "Windows":
+            self._signal_process(signal.SIGCONT)
+    
+    def _signal_process(self, signum):
+        try:
+            self.brown_noise_process.send_signal(signum)
+        except OSError:
+            pass
+    
     def stop_brown_noise(self):
         """Stop the brown noise playback"""
-        if self.brown_noise_process:
-            try:
-                self.brown_noise_process.terminate()
-                self.brown_noise_process.wait(timeout=AUDIO_TIMEOUT)
-            except subprocess.TimeoutExpired:
-                self.brown_noise_process.kill()
-            except Exception:
-                pass
-            finally:
-                self.brown_noise_process = None
\ No newline at end of file
+        self.detach_brown_noise()()
+    
+    def detach_brown_noise(self):
+        """Release the running brown noise and return a callable that stops it
+        
+        The caller can tear playback down on another thread while this
+        player is already free to start the next session's noise.
+        """
+        noise_engine, process = self.noise_engine, self.brown_noise_process
+        self.noise_engine = None
+        self.brown_noise_process = None
+        
+        def stop():
+            if noise_engine is None and not process:
+                return
+            with metrics.span('noise_stop'):
+                if noise_engine is not None:
+                    noise_engine.stop()
+                if process:
+                    try:
+                        if self.system != "Windows":
+                            # A stopped process would not handle SIGTERM
+                            process.send_signal(signal.SIGCONT)
+                        process.terminate()
+                        process.wait(timeout=AUDIO_TIMEOUT)
+                    except subprocess.TimeoutExpired:
+                        metrics.count('samaya_audio_failures', operation='noise_stop')
+                        process.kill()
+                    except Exception:
+                        pass
+        return stop
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+from .clock import SystemClock
+from .control import sessions_dir
+from .constants import BOOT_TOLERANCE
+from .locking import process_alive
+
+
+class SessionCheckpoint:
+    """Crash-safe record of the session running in this process
+    
+    Stored as ~/.samaya/sessions/<pid>.json next to the control socket and
+    rewritten by atomic rename only when the countdown changes state, so a
+    countdown costs nothing per tick. Each write anchors the remaining time
+    to both the monotonic clock and the wall clock: after a crash in the
+    same boot the monotonic anchor tells exactly how much time has passed,
+    and after a reboot the wall clock does.
+    """
+    
+    def __init__(self, session_type, minutes, path=None, clock=None, elapsed=0):
+        self.session_type = session_type
+        self.minutes = minutes
+        # Seconds run by earlier processes, for a resumed session
+        self.elapsed = elapsed
+        self.path = path or sessions_dir() / f"{os.getpid()}.json"
+        self.clock = clock or SystemClock()
+    
+    def update(self, countdown):
+        """Write the countdown's current state; usable as a Countdown listener"""
+        state = {
+            'pid': os.getpid(),
+            'type': self.session_type,
+            'minutes': self.minutes,
+            'duration': countdown.duration + self.elapsed,
+            'state': countdown.state,
+            'remaining': countdown.remaining(),
+            'clock': self.clock.now(),
+            'wall': time.time()
+        }
+        tmp_file = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # No fsync: this guards against the process dying, not the machine
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            pass
+    
+    def clear(self):
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def elapsed_since(state, clock=None):
+    """Seconds passed since a checkpoint was written"""
+    clock = clock or SystemClock()
+    now, wall = clock.now(), time.time()
+    # The same boot if the wall time of the monotonic origin has not moved
+    same_boot = abs((wall - now) - (state['wall'] - state['clock'])) < BOOT_TOLERANCE
+    return max(0.0, now - state['clock'] if same_boot else wall - state['wall'])
+
+
+def find_orphans(directory=None, clock=None):
+    """Checkpoints left behind by sessions whose process died, newest first
+    
+    Each orphan is the checkpoint dict plus its 'path' and the 'remaining'
+    seconds it would have now had it kept running.
+    """
+    directory = directory or sessions_dir()
+    orphans = []
+    try:
+        paths = list(directory.glob('*.json'))
+    except OSError:
+        return orphans
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+            pid = int(state['pid'])
+            if pid == os.getpid() or process_alive(pid):
+                continue
+            if state['state'] == 'running':
+                state['remaining'] = max(0.0, state['remaining'] - elapsed_since(state, clock))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        state['path'] = path
+        orphans.append(state)
+    orphans.sort(key=lambda state: state['wall'], reverse=True)
+    return orphans
+
+
+def claim_orphan(orphan):
+    """Take an orphan from find_orphans() for this process
+    
+    Several processes may find the same orphan. Its checkpoint is removed
+    before anything is done with it, and only the process whose removal
+    succeeded gets True, so the session is logged or resumed once.
+    """
+    try:
+        orphan['path'].unlink()
+    except OSError:
+        return False
+    return True
@@ -3,7 +3,10 @@
 import argparse
 import sys
 import os
-from .timer import SessionTimer
+from .constants import (
+    SESSION_MODES, EXTEND_DEFAULT_MINUTES, STATUS_DEFAULT_FORMAT, CYCLE_DEFAULT_PLAN, DISPLAY_MODES, DISPLAY_ENV,
+    DEFAULT_DISPLAY, COLLECTOR_PORT, COLLECTOR_DIR_NAME, SYNC_RETRIES, SYNC_URL_ENV, SYNC_CONFIG_NAME
+)
 from ._version import __version__
 
 
@@ -16,9 +19,24 @@ def create_parser():
     
     parser.add_argument(
         'mode',
-        choices=['short', 'medium', 'long', 'stats'],
+        choices=['short', 'medium', 'long', 'cycle', 'stats', 'status', 'daemon', 'attach', 'pause', 'resume', 'extend', 'abort',
+                 'sync', 'collector'],
         nargs='?',
-        help='Session mode: short (5 min), medium (15 min), long (25 min), stats (display session statistics and usage history)'
+        help='Session mode: short (5 min), medium (15 min), long (25 min), cycle (run a Pomodoro plan of work sessions and breaks), stats (display session statistics and usage history), status (print the running session for status bars), daemon (host sessions for this user in the background), attach (show the countdown of a daemon session), pause/resume/extend/abort (control the running session; extend adds --time minutes), sync (send queued sessions to the team collector now), collector (run the reference collector)'
+    )
+    
+    parser.add_argument(
+        'action',
+        choices=['export', 'import', 'merge'],
+        nargs='?',
+        help='With stats mode: export FILE streams every stored session to a .jsonl or .csv FILE (- for stdout), import FILE... adds the sessions not stored yet, merge FILE... --output FILE combines history files without duplicates'
+    )
+    
+    parser.add_argument(
+        'files',
+        nargs='*',
+        metavar='FILE',
+        help='History files for stats export, import or merge'
     )
     
     parser.add_argument(
@@ -27,6 +45,35 @@ def create_parser():
         help='Custom session duration in minutes'
     )
     
+    parser.add_argument(
+        '--background', '-b',
+        action='store_true',
+        help='Run the session in the samaya daemon and attach to it; Ctrl+C detaches'
+    )
+    
+    parser.add_argument(
+        '--session',
+        help='Daemon session ID to attach to or control (default: the newest)'
+    )
+    
+    parser.add_argument(
+        '--plan',
+        help=f'Cycle plan as Nxwork,break,long break using modes or minutes (default: {CYCLE_DEFAULT_PLAN}; use with cycle mode)'
+    )
+    
+    parser.add_argument(
+        '--cycles',
+        type=int,
+        default=1,
+        help='How many times to run the plan (use with cycle mode)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue the session left by a samaya process that was killed, or with cycle mode the cycle that was stopped'
+    )
+    
     parser.add_argument(
         '--list-modes',
         action='store_true',
@@ -39,6 +86,101 @@ def create_parser():
         help='Clear all session statistics (use with stats mode)'
     )
     
+    parser.add_argument(
+        '--export',
+        metavar='FILE',
+        help='Write all session statistics to FILE as JSON (use with stats mode)'
+    )
+    
+    parser.add_argument(
+        '--import',
+        dest='import_file',
+        metavar='FILE',
+        help='Add the sessions from a JSON statistics FILE (use with stats mode)'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        metavar='FILE',
+        help='Where stats merge writes the merged history (.jsonl, .csv or - for stdout), or the directory collector mode stores sessions in'
+    )
+    
+    parser.add_argument(
+        '--stats-profile',
+        metavar='NAME',
+        help='Log and show statistics in the named profile (default: $SAMAYA_PROFILE, or none)'
+    )
+    
+    parser.add_argument(
+        '--list-profiles',
+        action='store_true',
+        help='List the statistics profiles and exit'
+    )
+    
+    parser.add_argument(
+        '--aggregate',
+        metavar='DIR',
+        help='Combine the statistics of every store under DIR, e.g. a shared directory of per-user stores (use with stats mode)'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        help='Worker processes for --aggregate (default: one per CPU)'
+    )
+    
+    parser.add_argument(
+        '--by',
+        choices=['day', 'week', 'month'],
+        help='Show focus time per day, week or month (use with stats mode)'
+    )
+    
+    parser.add_argument(
+        '--heatmap',
+        action='store_true',
+        help='Show completed sessions by weekday and hour (use with stats mode)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        default=STATUS_DEFAULT_FORMAT,
+        help='Output format for status mode, e.g. "{type} {mmss}"; fields: state, type, remaining, mm, ss, mmss, minutes, pid'
+    )
+    
+    parser.add_argument(
+        '--display',
+        choices=DISPLAY_MODES,
+        help='How the countdown is shown: line (redrawn in place), full (full-screen digits and progress bar), '
+             'log (a line a minute), json (the same as JSON lines) or quiet; auto, the default, picks line on a '
+             f'terminal and log otherwise (default: ${DISPLAY_ENV}, or auto)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Time startup, audio, ticks, the bell and stats writes and print a summary on exit'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        metavar='FILE',
+        help='Record the same metrics as --profile and write them to FILE in the OpenMetrics text format on exit'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        metavar='PORT',
+        help='Serve OpenMetrics on http://127.0.0.1:PORT/metrics (use with daemon mode)'
+    )
+    
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=COLLECTOR_PORT,
+        help=f'Port collector mode listens on (default: {COLLECTOR_PORT})'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -48,36 +190,309 @@ def create_parser():
     return parser
 
 
+def run_in_daemon(args):
+    """Start or attach to a daemon-hosted session and follow its countdown"""
+    from .client import DaemonClient, DaemonError
+    from .render import make_renderer
+    
+    try:
+        with DaemonClient() as client:
+            session_id = args.session
+            if args.mode != 'attach':
+                if args.time:
+                    request = {'type': 'custom', 'minutes': args.time}
+                else:
+                    request = {'type': args.mode, 'minutes': SESSION_MODES[args.mode]}
+                session = client.request('start', **request)['session']
+                session_id = session['id']
+                print(f"Started {session['type']} session {session_id} in the daemon: {session['minutes']} minutes")
+            print("Press Ctrl+C to detach")
+            state = client.attach(session_id, renderer=make_renderer(args.display))
+    except DaemonError as e:
+        print(f"\n{e}")
+        print("Start it with: samaya daemon")
+        return False
+    except KeyboardInterrupt:
+        print("\nDetached; the session keeps running in the daemon.")
+        return True
+    
+    print(f"\nSession {state}.")
+    return state == 'completed'
+
+
+def control_session(args):
+    """Send pause/resume/extend/abort to the running session"""
+    from .client import DaemonClient, DaemonError
+    from .control import find_session_socket
+    
+    params = {}
+    if args.mode == 'extend':
+        params['seconds'] = (args.time or EXTEND_DEFAULT_MINUTES) * 60
+    
+    # Foreground sessions take precedence unless a daemon session is named
+    socket_path = None
+    if args.session:
+        params['id'] = args.session
+    else:
+        socket_path = find_session_socket()
+    
+    try:
+        with DaemonClient(socket_path) as client:
+            session = client.request(args.mode, **params)['session']
+    except DaemonError as e:
+        print(f"Could not {args.mode} session: {e}")
+        return False
+    
+    minutes_left, seconds_left = divmod(int(session['remaining']), 60)
+    print(f"{session['type'].capitalize()} session {session['state']}: {minutes_left:02d}:{seconds_left:02d} remaining")
+    return True
+
+
+def show_status(args):
+    """Print the running session from the status page; False when idle"""
+    from .statuspage import read_status, format_status
+    
+    status = read_status()
+    if status is None or status['state'] not in ('running', 'paused'):
+        return False
+    try:
+        print(format_status(status, args.format))
+    except (KeyError, IndexError, ValueError) as e:
+        print(f"Invalid status format: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def run_history_action(stats, args):
+    """Run stats export, import or merge; False on failure"""
+    if args.action == 'export':
+        if len(args.files) != 1:
+            print("Usage: samaya stats export FILE", file=sys.stderr)
+            return False
+        count = stats.export_history(args.files[0])
+        if args.files[0] != '-':
+            print(f"Exported {count} sessions to {args.files[0]}")
+        return True
+    if not args.files:
+        print(f"Usage: samaya stats {args.action} FILE...", file=sys.stderr)
+        return False
+    if args.action == 'import':
+        added, duplicates, skipped = stats.import_history(args.files)
+        print(f"Imported {added} sessions ({duplicates} already recorded)")
+        if skipped:
+            print(f"Skipped {skipped} sessions on days this store only keeps totals for, which already count sessions")
+        return True
+    
+    from .history import merge_files
+    if not args.output:
+        print("Usage: samaya stats merge FILE... --output FILE", file=sys.stderr)
+        return False
+    count = merge_files(args.files, args.output)
+    if args.output != '-':
+        print(f"Merged {count} sessions into {args.output}")
+    return True
+
+
+def run_sync(stats):
+    """Send the queued sessions to the collector, retrying failed batches"""
+    from .sync import Syncer
+    
+    try:
+        syncer = Syncer.from_config(stats.stats_dir)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    if syncer is None:
+        print(f"Sync is off: set {SYNC_URL_ENV} or \"url\" in ~/.samaya/{SYNC_CONFIG_NAME}")
+        return False
+    sent, error = syncer.flush(retries=SYNC_RETRIES, force=True)
+    print(f"Sent {sent} sessions in {syncer.client.requests} requests to {syncer.client.url}")
+    if error:
+        print(f"❌ {error}; {syncer.queue.pending()} sessions still queued")
+        return False
+    return True
+
+
+def run_cycle(timer, args):
+    """Run a Pomodoro plan, or resume the one left in the checkpoint"""
+    from .cycle import CyclePlan, CycleCheckpoint
+    
+    checkpoint = CycleCheckpoint()
+    start = 0
+    if args.resume:
+        state = checkpoint.load()
+        if state is None:
+            print("No interrupted cycle to resume")
+            return False
+        plan, start = state
+    else:
+        try:
+            plan = CyclePlan.parse(args.plan, args.cycles)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+    return timer.run_cycle(plan, start, checkpoint)
+
+
+def resume_session(timer):
+    """Resume the newest session whose process died; older ones are logged"""
+    from .checkpoint import find_orphans
+    
+    resumable = [orphan for orphan in find_orphans(clock=timer.clock)
+                 if orphan['state'] in ('running', 'paused') and orphan['remaining'] > 0]
+    orphan = resumable[0] if resumable else None
+    timer.recover_orphans(keep=orphan)
+    if orphan is None:
+        print("No interrupted session to resume")
+        return False
+    return timer.resume_orphan(orphan)
+
+
+def enable_metrics(args):
+    """Record metrics for this run and report them when the process exits"""
+    import atexit
+    from .metrics import metrics
+    
+    metrics.enable()
+    
+    def report():
+        if args.profile:
+            print(f"\n{metrics.format_report()}", file=sys.stderr)
+        if args.metrics_file:
+            try:
+                metrics.write_openmetrics(args.metrics_file)
+            except OSError as e:
+                print(f"Could not write metrics: {e}", file=sys.stderr)
+    atexit.register(report)
+
+
 def main():
     """Main CLI entry point"""
-    # Set terminal title
-    sys.stdout.write("\033]0;samaya - a pomodoro cli\007")
-    sys.stdout.flush()
-    
     parser = create_parser()
     args = parser.parse_args()
     
-    timer = SessionTimer()
+    # Metrics stay off, and nearly free, unless asked for
+    if args.profile or args.metrics_file:
+        enable_metrics(args)
+    
+    # Polled by status bars every second: keep it free of heavy imports
+    if args.mode == 'status':
+        sys.exit(0 if show_status(args) else 1)
+    
+    if not args.display and (os.environ.get(DISPLAY_ENV) or DEFAULT_DISPLAY) not in DISPLAY_MODES:
+        parser.error(f"{DISPLAY_ENV} must be one of {', '.join(DISPLAY_MODES)}")
+    
+    # Set terminal title; never into a pipe such as `stats export -`
+    if sys.stdout.isatty():
+        sys.stdout.write("\033]0;samaya - a pomodoro cli\007")
+        sys.stdout.flush()
+    
+    if args.mode == 'daemon':
+        from .daemon import run_daemon
+        sys.exit(0 if run_daemon(metrics_port=args.metrics_port, profile=args.stats_profile) else 1)
+    
+    if args.mode == 'collector':
+        from .collector import run_collector
+        from .stats import base_stats_dir
+        sys.exit(0 if run_collector(args.output or base_stats_dir() / COLLECTOR_DIR_NAME, args.port) else 1)
+    
+    if args.mode in ('pause', 'resume', 'extend', 'abort'):
+        sys.exit(0 if control_session(args) else 1)
+    
+    if args.mode == 'attach' or (args.background and (args.time or args.mode in SESSION_MODES)):
+        sys.exit(0 if run_in_daemon(args) else 1)
     
     if args.list_modes:
-        timer.list_modes()
+        print("Available session modes:")
+        for mode, duration in SESSION_MODES.items():
+            print(f"  {mode}: {duration} minutes")
+        return
+    
+    if args.list_profiles:
+        from .stats import list_profiles
+        profiles = list_profiles()
+        print("Statistics profiles:" if profiles else "No statistics profiles yet")
+        for profile in profiles:
+            print(f"  {profile}")
         return
     
+    if args.mode == 'stats' and args.aggregate:
+        from .fleet import aggregate_stores, display_aggregate
+        if not os.path.isdir(args.aggregate):
+            print(f"❌ Not a directory: {args.aggregate}")
+            sys.exit(1)
+        display_aggregate(aggregate_stores(args.aggregate, args.jobs), args.aggregate, args.by)
+        return
+    
+    # Imported here so informational commands never load the timer stack
+    from .timer import SessionTimer
+    timer = SessionTimer(display=args.display)
+    if args.stats_profile:
+        from .stats import SessionStats
+        try:
+            timer.stats = SessionStats(profile=args.stats_profile)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.action and args.mode != 'stats':
+        parser.error(f"{args.action} is only available in stats mode")
+    
+    if args.mode == 'sync':
+        sys.exit(0 if run_sync(timer.stats) else 1)
+    
     if args.mode == 'stats':
+        if args.action:
+            try:
+                success = run_history_action(timer.stats, args)
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}", file=sys.stderr)
+                success = False
+            sys.exit(0 if success else 1)
         if args.clear:
             timer.stats.clear_stats()
+        elif args.export or args.import_file:
+            try:
+                if args.export:
+                    count = timer.stats.export_json(args.export)
+                    print(f"Exported {count} sessions to {args.export}")
+                else:
+                    count = timer.stats.import_json(args.import_file)
+                    print(f"Imported {count} sessions from {args.import_file}")
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+        elif args.by or args.heatmap:
+            if args.by:
+                timer.stats.display_report(args.by)
+            if args.heatmap:
+                timer.stats.display_heatmap()
         else:
             timer.stats.display_stats()
         return
     
+    if args.resume and args.mode is None and not args.time:
+        success = resume_session(timer)
+        timer.wait_for_completion()
+        sys.exit(0 if success else 1)
+    
+    if args.mode == 'cycle':
+        timer.recover_orphans()
+        success = run_cycle(timer, args)
+        timer.wait_for_completion()
+        sys.exit(0 if success else 1)
+    
     if not args.mode and not args.time:
         parser.print_help()
         sys.exit(1)
     
+    # Sessions of samaya processes that were killed are logged before a new one starts
+    timer.recover_orphans()
     if args.time:
         success = timer.start_custom_session(args.time)
     else:
         success = timer.start_session(args.mode)
+    # Stats are written in the background; a slow bell is cut short
+    timer.wait_for_completion()
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import math
+import select
+import socket
+from .clock import SystemClock
+from .daemon import default_socket_path
+from .protocol import recv_message, send_message
+from .constants import DAEMON_CONNECT_TIMEOUT
+
+
+class DaemonError(Exception):
+    """Raised when the daemon is unreachable or rejects a request"""
+
+
+class DaemonClient:
+    """Thin blocking client for the timer daemon and session control sockets"""
+    
+    def __init__(self, socket_path=None, clock=None):
+        self.socket_path = str(socket_path or default_socket_path())
+        self.clock = clock or SystemClock()
+        self.sock = None
+    
+    def connect(self):
+        """Open the connection to the daemon"""
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise DaemonError(f"Cannot reach the samaya daemon at {self.socket_path}: {e}")
+            sock.settimeout(None)
+            self.sock = sock
+        return self
+    
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+    
+    def __enter__(self):
+        return self.connect()
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _receive(self):
+        message = recv_message(self.sock)
+        if message is None:
+            raise DaemonError("The samaya daemon closed the connection")
+        return message
+    
+    def request(self, command, **params):
+        """Send a command and return the daemon's response"""
+        self.connect()
+        send_message(self.sock, dict(params, cmd=command))
+        while True:
+            response = self._receive()
+            # Events for watched sessions can arrive ahead of the reply
+            if 'event' not in response:
+                break
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', 'Request failed'))
+        return response
+    
+    def list_sessions(self):
+        """Yield the info of every daemon session, a page per request"""
+        after = 0
+        while after is not None:
+            response = self.request('list', after=after)
+            yield from response['sessions']
+            after = response['next']
+    
+    def attach(self, session_id=None, on_tick=None, renderer=None):
+        """Follow a session until it ends and return its final state
+        
+        The countdown is drawn locally from the remaining time the daemon
+        reports, so an attached client costs the daemon nothing per second.
+        Without on_tick it is shown through renderer (default: make_renderer()).
+        """
+        session = self.request('watch', id=session_id)['session']
+        if on_tick is None:
+            from .render import make_renderer
+            renderer = renderer or make_renderer()
+            renderer.begin(session['type'], session['minutes'] * 60)
+            renderer.change(session['state'], session['minutes'] * 60, session['remaining'])
+            on_tick = renderer.tick
+        else:
+            renderer = None
+        try:
+            return self._follow(session, on_tick, renderer)
+        finally:
+            if renderer is not None:
+                renderer.end()
+    
+    def _follow(self, session, on_tick, renderer):
+        deadline = self.clock.now() + session['remaining']
+        paused = session['state'] == 'paused'
+        shown = None
+        
+        while True:
+            if paused:
+                timeout = None
+            else:
+                remaining = deadline - self.clock.now()
+                seconds_left = max(0, math.ceil(remaining))
+                if seconds_left and seconds_left != shown:
+                    on_tick(seconds_left)
+                    shown = seconds_left
+                # Wake on the next second boundary or as soon as the daemon speaks
+                timeout = remaining - (seconds_left - 1) if seconds_left else None
+            
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if not readable:
+                continue
+            
+            message = self._receive()
+            if message.get('event') in ('completed', 'cancelled'):
+                return message['event']
+            if 'session' in message:
+                session = message['session']
+                deadline = self.clock.now() + session['remaining']
+                paused = session['state'] == 'paused'
+                if renderer is not None:
+                    renderer.change(session['state'], session['minutes'] * 60, session['remaining'])
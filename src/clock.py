@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+
+
+def _suspend_aware_clock_id():
+    """Pick a clock_gettime clock that keeps counting while the machine sleeps"""
+    if hasattr(time, 'CLOCK_BOOTTIME'):
+        return time.CLOCK_BOOTTIME
+    if sys.platform == 'darwin' and hasattr(time, 'CLOCK_MONOTONIC'):
+        # On macOS CLOCK_MONOTONIC includes sleep, unlike time.monotonic()
+        return time.CLOCK_MONOTONIC
+    return None
+
+
+class SystemClock:
+    """Monotonic clock for countdowns
+    
+    Unaffected by NTP adjustments or manual changes to the wall clock. Where
+    the platform allows it, time spent suspended is counted, so a session
+    that should have ended while the laptop was asleep ends on resume.
+    """
+    
+    def __init__(self):
+        self._clock_id = _suspend_aware_clock_id()
+    
+    def now(self):
+        """Return the current time in seconds from an arbitrary origin"""
+        if self._clock_id is not None:
+            return time.clock_gettime(self._clock_id)
+        return time.monotonic()
+    
+    def sleep(self, seconds):
+        """Block for the given number of seconds"""
+        if seconds > 0:
+            time.sleep(seconds)
+    
+    def wait(self, event, timeout=None):
+        """Block until event is set or timeout seconds pass (None waits forever)"""
+        if timeout is None:
+            event.wait()
+        elif timeout > 0:
+            event.wait(timeout)
+
+
+class ManualClock:
+    """Clock that only moves when slept on or advanced explicitly
+    
+    Lets tests and simulations run a full session instantly.
+    """
+    
+    def __init__(self, start=0.0):
+        self.time = start
+        self.sleeps = 0
+    
+    def now(self):
+        return self.time
+    
+    def sleep(self, seconds):
+        self.sleeps += 1
+        if seconds > 0:
+            self.time += seconds
+    
+    def wait(self, event, timeout=None):
+        if event.is_set():
+            self.sleeps += 1
+            return
+        if timeout is None:
+            raise RuntimeError("Waiting forever on a manual clock")
+        self.sleep(timeout)
+    
+    def advance(self, seconds):
+        """Move the clock forward without sleeping, as a suspend would"""
+        self.time += seconds
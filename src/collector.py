@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from .constants import COLLECTOR_PORT, SYNC_MAX_BODY
+from .history import read_history, session_id
+
+
+class CollectorStore:
+    """Sessions received from every user, in SQLite, keyed by user and session ID
+    
+    Adding a session that is already stored does nothing, so clients can
+    resend a batch whose reply they never saw.
+    """
+    
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.directory / 'collector.db'), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "user TEXT NOT NULL, id TEXT NOT NULL, timestamp TEXT NOT NULL, type TEXT NOT NULL, "
+                "duration REAL NOT NULL, completed INTEGER NOT NULL, received TEXT NOT NULL, "
+                "PRIMARY KEY (user, id)) WITHOUT ROWID")
+    
+    def add(self, user, records):
+        """Store the new sessions; returns how many were added and how many were already there"""
+        received = datetime.now().isoformat()
+        rows = [(user, session_id(record), record['timestamp'], record['type'], record['duration'],
+                 int(record['completed']), received) for record in records]
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self._db.total_changes - before
+        return added, len(rows) - added
+    
+    def summary(self):
+        """Per-user totals for a dashboard"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT user, COUNT(*), SUM(completed), SUM(CASE WHEN completed THEN duration ELSE 0 END), "
+                "MAX(timestamp) FROM sessions GROUP BY user ORDER BY user").fetchall()
+        return {user: {'sessions': sessions, 'completed': completed, 'minutes': round(minutes, 2), 'last': last}
+                for user, sessions, completed, minutes, last in rows}
+    
+    def close(self):
+        self._db.close()
+
+
+def _decompress(body):
+    """Inflate a gzip body, refusing anything that grows past SYNC_MAX_BODY"""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(body, SYNC_MAX_BODY + 1)
+    if len(data) > SYNC_MAX_BODY or inflater.unconsumed_tail:
+        raise OverflowError("body too large")
+    return data
+
+
+def make_collector(store, port=COLLECTOR_PORT, host='127.0.0.1'):
+    """HTTP server taking batches on POST /sessions and serving GET /summary
+    
+    Batches are JSONL session histories, optionally gzipped, from the user
+    named in X-Samaya-User. Connections are kept alive between requests.
+    Call serve_forever() on the result, and shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_POST(self):
+            if self.path.split('?')[0] != '/sessions':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', ''))
+            except ValueError:
+                self._reply(411, {'error': 'Content-Length required'})
+                return
+            if length > SYNC_MAX_BODY:
+                self._reply(413, {'error': 'body too large'}, close=True)
+                return
+            body = self.rfile.read(length)
+            user = self.headers.get('X-Samaya-User', '').strip()
+            if not user:
+                self._reply(400, {'error': 'X-Samaya-User required'})
+                return
+            try:
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = _decompress(body)
+                records = list(read_history(io.StringIO(body.decode('utf-8')), 'jsonl', 'request'))
+            except OverflowError as e:
+                self._reply(413, {'error': str(e)})
+                return
+            except (ValueError, zlib.error, UnicodeDecodeError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            added, duplicates = store.add(user, records)
+            self._reply(200, {'accepted': added, 'duplicates': duplicates})
+        
+        def do_GET(self):
+            if self.path.split('?')[0] != '/summary':
+                self._reply(404, {'error': 'not found'})
+                return
+            self._reply(200, store.summary())
+        
+        def _reply(self, status, payload, close=False):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if close:
+                self.send_header('Connection', 'close')
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_collector(directory, port=COLLECTOR_PORT, host='127.0.0.1'):
+    """Run the reference collector in the foreground until Ctrl+C"""
+    store = CollectorStore(directory)
+    server = make_collector(store, port, host)
+    print(f"Collecting sessions on http://{host}:{server.server_address[1]}/sessions into {directory}")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nCollector stopped.")
+    finally:
+        server.server_close()
+        store.close()
+    return True
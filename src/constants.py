@@ -8,11 +8,138 @@ BELL_SOUND_FILE = "end_notification.m4a"
 DEFAULT_VOLUME = "0.3"
 AUDIO_TIMEOUT = 2
 
+# Audio engines: "file" plays the bundled files through external players,
+# "generated" synthesizes noise and bell in process, "auto" prefers generated
+AUDIO_ENGINE_ENV = "SAMAYA_AUDIO_ENGINE"
+DEFAULT_AUDIO_ENGINE = "auto"
+NOISE_SAMPLE_RATE = 22050
+NOISE_BLOCK_FRAMES = 2048
+NOISE_CUTOFF_HZ = 20
+# Seconds an idle PCM output is kept open for the next noise or bell
+AUDIO_WARM_IDLE_SECONDS = 60
+
+# Completion pipeline: background workers for audio teardown, the bell,
+# stats and hooks, and how long the CLI waits for them before exiting
+COMPLETION_WORKERS = 3
+COMPLETION_QUEUE_SIZE = 32
+COMPLETION_SUBMIT_TIMEOUT = 1
+COMPLETION_TIMEOUT = 5
+
+# Event hooks (see events.py): run on their own small pool, each with a
+# bounded queue of pending events and a per-call timeout in seconds
+EVENT_KINDS = ("start", "tick", "pause", "resume", "extend", "complete", "abort")
+# Hooks that do not choose get every event but the once-a-second tick
+DEFAULT_HOOK_EVENTS = ("start", "pause", "resume", "extend", "complete", "abort")
+HOOK_WORKERS = 2
+HOOK_QUEUE_SIZE = 16
+HOOK_TIMEOUT = 5
+HOOKS_FILE_NAME = "hooks.json"
+HOOK_ENTRY_POINT_GROUP = "samaya.hooks"
+
+# Session types counted separately in stats; anything else counts as custom
+SESSION_TYPES = ("short", "medium", "long", "custom")
+
+# Preset session lengths in minutes
+SESSION_MODES = {
+    'short': 5,      # 5 minutes
+    'medium': 15,    # 15 minutes
+    'long': 25       # 25 minutes (standard pomodoro)
+}
+
 # Stats configuration
 STATS_DIR_NAME = ".samaya"
 STATS_FILE_NAME = "stats.json"
+JOURNAL_FILE_NAME = "journal.jsonl"
+STATS_LOCK_NAME = "stats.lock"
+SQLITE_FILE_NAME = "stats.db"
+BINARY_FILE_NAME = "sessions.bin"
 MAX_STORED_SESSIONS = 100
+# Tiered retention of the JSON store: sessions in full for RETENTION_DETAIL_DAYS,
+# then per-day buckets up to RETENTION_DAILY_DAYS, then per-month buckets
+RETENTION_DETAIL_DAYS = 30
+RETENTION_DAILY_DAYS = 365
+JOURNAL_COMPACT_BYTES = 64 * 1024
+DEFAULT_STATS_BACKEND = "json"
+STATS_BACKEND_ENV = "SAMAYA_STATS_BACKEND"
+# Named profiles keep separate stores in <stats dir>/profiles/<name>;
+# SAMAYA_STATS_DIR moves the whole stats directory, e.g. to a shared disk
+STATS_DIR_ENV = "SAMAYA_STATS_DIR"
+PROFILE_ENV = "SAMAYA_PROFILE"
+PROFILES_DIR_NAME = "profiles"
+SQLITE_TIMEOUT = 10
+
+# Session history files for moving and merging sessions between machines:
+# formats, records sorted in memory per spilled run, and records per write
+HISTORY_FORMATS = ("jsonl", "csv")
+HISTORY_RUN_SIZE = 100000
+HISTORY_BATCH_SIZE = 1000
+
+# Precomputed summary and rollups, reused while the stored data is unchanged
+SUMMARY_CACHE_NAME = "summary.json"
+SUMMARY_CACHE_ENTRIES = 8
+
+# Stats reports: how many periods `samaya stats --by` shows
+REPORT_PERIODS = {"day": 14, "week": 12, "month": 12}
+REPORT_BAR_WIDTH = 30
+
+# Timer daemon
+DAEMON_SOCKET_NAME = "daemon.sock"
+DAEMON_MAX_SLEEP = 5
+DAEMON_CONNECT_TIMEOUT = 2
+# Sessions per `list` reply; larger lists are paged so a reply fits in one frame
+DAEMON_LIST_PAGE = 200
+
+# Session control sockets
+SESSIONS_DIR_NAME = "sessions"
+EXTEND_DEFAULT_MINUTES = 5
+
+# Crash-safe session checkpoints (see checkpoint.py): how far the implied
+# boot time may move before the monotonic anchor is considered to come
+# from an earlier boot, in seconds
+BOOT_TOLERANCE = 2.0
+
+# Pomodoro cycles: work sessions, the break between them and the long
+# break after every group, as "Nxwork,break,long break"
+CYCLE_DEFAULT_PLAN = "4xlong,short,medium"
+CYCLE_CHECKPOINT_NAME = "cycle.json"
+
+# Countdown display (see render.py): "auto" redraws one line on a terminal
+# and writes a line every DISPLAY_LOG_INTERVAL seconds anywhere else
+DISPLAY_ENV = "SAMAYA_DISPLAY"
+DISPLAY_MODES = ("auto", "line", "full", "log", "json", "quiet")
+DEFAULT_DISPLAY = "auto"
+DISPLAY_LOG_INTERVAL = 60
+
+# Team sync (see sync.py): sessions queue in <stats dir>/sync/ and are
+# posted in gzipped JSONL batches to the collector named by SAMAYA_SYNC_URL
+# or the url in sync.json; failed attempts back off exponentially
+SYNC_URL_ENV = "SAMAYA_SYNC_URL"
+SYNC_CONFIG_NAME = "sync.json"
+SYNC_DIR_NAME = "sync"
+SYNC_BATCH_SIZE = 1000
+SYNC_TIMEOUT = 3
+SYNC_RETRIES = 3
+SYNC_BACKOFF_BASE = 1
+SYNC_BACKOFF_MAX = 3600
+SYNC_MAX_BODY = 8 * 1024 * 1024
+# Reference collector
+COLLECTOR_PORT = 8750
+COLLECTOR_DIR_NAME = "collector"
+
+# Status page for status bars
+STATUS_PAGE_NAME = "status"
+STATUS_DEFAULT_FORMAT = "{type} {mmss}"
+
+# Instrumentation (see metrics.py): every timed phase is one series of
+# PHASE_METRIC, bucketed in seconds for OpenMetrics export
+PHASE_METRIC = "samaya_phase_seconds"
+TICK_LATENESS_METRIC = "samaya_tick_lateness_seconds"
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
 
 # Session display messages
 SESSION_END_EMOJI = "🛎️"
-STATS_EMOJI = "📊"
\ No newline at end of file
+STATS_EMOJI = "📊"
+
+# Import-time budget for informational commands (--version, --help,
+# --list-modes), on top of the interpreter and argparse
+STARTUP_BUDGET_MS = 30
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import os
+import select
+import socket
+import threading
+from pathlib import Path
+from .protocol import ProtocolError, encode, recv_message, send_message
+from .constants import STATS_DIR_NAME, SESSIONS_DIR_NAME
+
+
+def sessions_dir():
+    """Directory holding the control sockets of running foreground sessions"""
+    return Path.home() / STATS_DIR_NAME / SESSIONS_DIR_NAME
+
+
+def session_socket_path(pid=None):
+    """Control socket for the session running in process pid"""
+    return sessions_dir() / f"{pid or os.getpid()}.sock"
+
+
+def find_session_socket():
+    """Return the socket of the newest live foreground session, or None
+    
+    Sockets left behind by processes that died are removed on the way.
+    """
+    try:
+        candidates = sorted(sessions_dir().glob('*.sock'), key=lambda p: p.stat().st_mtime, reverse=True)
+    except OSError:
+        return None
+    for path in candidates:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            return path
+        except OSError:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        finally:
+            probe.close()
+    return None
+
+
+class ControlServer:
+    """Unix socket endpoint controlling a running Countdown
+    
+    Clients send framed requests (see protocol.py) with a 'cmd' of status,
+    pause, resume, extend (with 'seconds') or abort and may keep the
+    connection open for further requests. Each connection is served on its
+    own thread; the accept loop blocks without polling.
+    """
+    
+    def __init__(self, countdown, info, socket_path=None):
+        self.countdown = countdown
+        self.info = info
+        self.socket_path = Path(socket_path) if socket_path else session_socket_path()
+        self._listener = None
+        self._stop_reader, self._stop_writer = None, None
+        self._thread = None
+        self._connections = set()
+        self._lock = threading.Lock()
+    
+    def status(self):
+        """Describe the session for clients"""
+        return dict(self.info, state=self.countdown.state, remaining=self.countdown.remaining(),
+                    duration=self.countdown.duration)
+    
+    def handle_request(self, request):
+        """Execute one command and return the response message"""
+        command = request.get('cmd')
+        if command == 'status':
+            changed = True
+        elif command == 'pause':
+            changed = self.countdown.pause()
+        elif command == 'resume':
+            changed = self.countdown.resume()
+        elif command == 'abort':
+            changed = self.countdown.abort()
+        elif command == 'extend':
+            seconds = request.get('seconds')
+            if not isinstance(seconds, (int, float)) or seconds <= 0:
+                return {'ok': False, 'error': "seconds must be a positive number"}
+            changed = self.countdown.extend(seconds)
+        else:
+            return {'ok': False, 'error': f"Unknown command: {command}"}
+        
+        if not changed:
+            return {'ok': False, 'error': f"Cannot {command} a {self.countdown.state} session", 'session': self.status()}
+        return {'ok': True, 'session': self.status()}
+    
+    def start(self):
+        """Bind the socket and start serving; returns False if that is not possible"""
+        if not hasattr(socket, 'AF_UNIX'):
+            return False
+        try:
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(self.socket_path))
+            os.chmod(self.socket_path, 0o600)
+            listener.listen()
+        except OSError:
+            return False
+        
+        self._listener = listener
+        self._stop_reader, self._stop_writer = socket.socketpair()
+        self._thread = threading.Thread(target=self._serve, name='samaya-control', daemon=True)
+        self._thread.start()
+        return True
+    
+    def stop(self):
+        """Stop serving, drop open connections and remove the socket"""
+        if self._thread is None:
+            return
+        self._stop_writer.send(b'x')
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        for sock in (self._listener, self._stop_reader, self._stop_writer):
+            sock.close()
+        try:
+            self.socket_path.unlink()
+        except OSError:
+            pass
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def _serve(self):
+        while True:
+            readable, _, _ = select.select([self._listener, self._stop_reader], [], [])
+            if self._stop_reader in readable:
+                return
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+    
+    def _serve_connection(self, conn):
+        with self._lock:
+            self._connections.add(conn)
+        try:
+            while True:
+                try:
+                    request = recv_message(conn)
+                except ProtocolError as e:
+                    conn.sendall(encode({'ok': False, 'error': str(e)}))
+                    return
+                if request is None:
+                    return
+                send_message(conn, self.handle_request(request))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
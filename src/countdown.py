@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+from .clock import SystemClock
+
+
+class Countdown:
+    """Deadline-based countdown
+    
+    The deadline is fixed when the countdown starts and every tick recomputes
+    the remaining time from it, so slow redraws or late wakeups never
+    accumulate into drift. pause(), resume(), extend() and abort() may be
+    called from other threads; they wake the running loop immediately.
+    
+    Callables in listeners are invoked with the countdown after every state
+    change (start, pause, resume, extend, abort, finish), never per tick.
+    """
+    
+    def __init__(self, duration_seconds, clock=None):
+        self.duration = duration_seconds
+        self.clock = clock or SystemClock()
+        self.deadline = None
+        self.state = 'pending'
+        self._paused_remaining = None
+        self.listeners = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+    
+    def start(self):
+        """Fix the deadline relative to now"""
+        with self._lock:
+            self.deadline = self.clock.now() + self.duration
+            self.state = 'running'
+        self._notify()
+    
+    def remaining(self):
+        """Return the seconds left before the deadline"""
+        with self._lock:
+            if self.state == 'paused':
+                return self._paused_remaining
+            if self.deadline is None:
+                return self.duration
+            if self.state == 'aborted':
+                return 0
+            return max(0, self.deadline - self.clock.now())
+    
+    def pause(self):
+        """Freeze the remaining time; returns False if not running"""
+        with self._lock:
+            if self.state != 'running':
+                return False
+            self._paused_remaining = max(0, self.deadline - self.clock.now())
+            self.state = 'paused'
+        self._changed()
+        return True
+    
+    def resume(self):
+        """Continue a paused countdown; returns False if not paused"""
+        with self._lock:
+            if self.state != 'paused':
+                return False
+            self.deadline = self.clock.now() + self._paused_remaining
+            self._paused_remaining = None
+            self.state = 'running'
+        self._changed()
+        return True
+    
+    def extend(self, seconds):
+        """Add time to an unfinished countdown; returns False if it has ended"""
+        with self._lock:
+            if self.state in ('finished', 'aborted'):
+                return False
+            self.duration += seconds
+            if self.state == 'paused':
+                self._paused_remaining += seconds
+            elif self.deadline is not None:
+                self.deadline += seconds
+        self._changed()
+        return True
+    
+    def abort(self):
+        """Stop the countdown early; returns False if it has already ended"""
+        with self._lock:
+            if self.state in ('finished', 'aborted'):
+                return False
+            self.state = 'aborted'
+        self._changed()
+        return True
+    
+    def run(self, on_tick):
+        """Block until the deadline; returns False if the countdown was aborted
+        
+        on_tick is called with the whole seconds left (rounded up) only when
+        that value changes, and the loop sleeps until the next whole-second
+        boundary instead of polling.
+        """
+        if self.deadline is None:
+            self.start()
+        
+        shown = None
+        while True:
+            with self._lock:
+                if self.state == 'aborted':
+                    return False
+                if self.state == 'paused':
+                    remaining = None
+                else:
+                    remaining = self.deadline - self.clock.now()
+                    if remaining <= 0:
+                        self.state = 'finished'
+                        break
+            
+            if remaining is None:
+                # Nothing to redraw until a resume, extend or abort wakes us
+                self._wait(None)
+                continue
+            
+            seconds_left = math.ceil(remaining)
+            if seconds_left != shown:
+                on_tick(seconds_left)
+                shown = seconds_left
+                # The redraw took time; measure again before sleeping
+                remaining = self.deadline - self.clock.now()
+            
+            self._wait(remaining - (seconds_left - 1))
+        
+        self._notify()
+        return True
+    
+    def _changed(self):
+        """Wake the running loop and tell listeners about a state change"""
+        self._wakeup.set()
+        self._notify()
+    
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self)
+    
+    def _wait(self, timeout):
+        self.clock.wait(self._wakeup, timeout)
+        self._wakeup.clear()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from pathlib import Path
+from .constants import SESSION_MODES, STATS_DIR_NAME, CYCLE_DEFAULT_PLAN, CYCLE_CHECKPOINT_NAME
+
+
+class Segment:
+    """One timed part of a cycle: a work session or a break"""
+    
+    __slots__ = ('kind', 'type', 'minutes')
+    
+    def __init__(self, kind, session_type, minutes):
+        self.kind = kind
+        self.type = session_type
+        self.minutes = minutes
+    
+    def __repr__(self):
+        return f"Segment({self.kind!r}, {self.type!r}, {self.minutes!r})"
+
+
+def parse_length(item):
+    """(session type, minutes) for a mode name or a number of minutes"""
+    item = item.strip()
+    if item in SESSION_MODES:
+        return item, SESSION_MODES[item]
+    try:
+        minutes = int(item)
+    except ValueError:
+        raise ValueError(f"Unknown session length: {item!r} (use {', '.join(SESSION_MODES)} or minutes)")
+    if minutes <= 0:
+        raise ValueError("Session lengths must be greater than 0 minutes")
+    return 'custom', minutes
+
+
+class CyclePlan:
+    """A Pomodoro plan: `every` work sessions separated by short breaks, then a long break
+    
+    Plans are written as "Nxwork,break,long break", where each part is a
+    session mode or a number of minutes, e.g. "4xlong,short,medium" or
+    "3x50,10,30". The whole group repeats `cycles` times.
+    """
+    
+    def __init__(self, work, short_break, long_break, every=4, cycles=1):
+        if every < 1 or cycles < 1:
+            raise ValueError("A cycle needs at least one work session")
+        self.work = work
+        self.short_break = short_break
+        self.long_break = long_break
+        self.every = every
+        self.cycles = cycles
+    
+    @classmethod
+    def parse(cls, spec=None, cycles=1):
+        """Build a plan from its written form"""
+        spec = spec or CYCLE_DEFAULT_PLAN
+        parts = spec.split(',')
+        if len(parts) != 3:
+            raise ValueError(f"Invalid plan {spec!r}: expected Nxwork,break,long break")
+        every, _, work = parts[0].strip().replace('×', 'x').rpartition('x')
+        try:
+            every = int(every) if every else 1
+        except ValueError:
+            raise ValueError(f"Invalid plan {spec!r}: bad repeat count {every!r}")
+        return cls(parse_length(work), parse_length(parts[1]), parse_length(parts[2]), every, cycles)
+    
+    @property
+    def spec(self):
+        """The written form of the plan, without the cycle count"""
+        def part(length):
+            session_type, minutes = length
+            return session_type if session_type != 'custom' else str(minutes)
+        return f"{self.every}x{part(self.work)},{part(self.short_break)},{part(self.long_break)}"
+    
+    def segments(self):
+        """Every segment of the plan in order"""
+        segments = []
+        for _ in range(self.cycles):
+            for index in range(self.every):
+                segments.append(Segment('work', *self.work))
+                if index < self.every - 1:
+                    segments.append(Segment('break', *self.short_break))
+            segments.append(Segment('break', *self.long_break))
+        return segments
+    
+    def total_minutes(self):
+        return sum(segment.minutes for segment in self.segments())
+
+
+def default_checkpoint_path():
+    """Per-user checkpoint of the running cycle"""
+    return Path.home() / STATS_DIR_NAME / CYCLE_CHECKPOINT_NAME
+
+
+class CycleCheckpoint:
+    """Records which segment of a plan is running, so a restart can pick it up
+    
+    Written with an atomic rename when a segment starts, never while one
+    is counting down.
+    """
+    
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_checkpoint_path()
+    
+    def save(self, plan, index):
+        tmp_file = self.path.with_name(self.path.name + '.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w') as f:
+                json.dump({'plan': plan.spec, 'cycles': plan.cycles, 'segment': index, 'pid': os.getpid()}, f)
+            os.replace(tmp_file, self.path)
+            return True
+        except OSError:
+            return False
+    
+    def load(self):
+        """Return (plan, segment index) from the checkpoint, or None"""
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            return CyclePlan.parse(state['plan'], state['cycles']), int(state['segment'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def clear(self):
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+
+import asyncio
+import heapq
+import itertools
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from .clock import SystemClock
+from .protocol import ProtocolError, encode, read_message
+from .metrics import metrics
+from .constants import STATS_DIR_NAME, DAEMON_SOCKET_NAME, DAEMON_MAX_SLEEP, DAEMON_LIST_PAGE, TICK_LATENESS_METRIC
+
+
+def default_socket_path():
+    """Per-user socket the daemon listens on"""
+    return Path.home() / STATS_DIR_NAME / DAEMON_SOCKET_NAME
+
+
+class DaemonSession:
+    """A countdown hosted by the daemon"""
+    
+    __slots__ = ('id', 'type', 'minutes', 'deadline', 'paused_remaining', 'started', 'state', 'bell', 'watchers')
+    
+    def __init__(self, session_id, session_type, minutes, deadline, bell=True):
+        self.id = session_id
+        self.type = session_type
+        self.minutes = minutes
+        self.deadline = deadline
+        self.paused_remaining = None
+        self.started = datetime.now().isoformat()
+        self.state = 'running'
+        self.bell = bell
+        self.watchers = set()
+    
+    def info(self, now):
+        """Describe the session for clients"""
+        if self.state == 'running':
+            remaining = max(0.0, self.deadline - now)
+        elif self.state == 'paused':
+            remaining = self.paused_remaining
+        else:
+            remaining = 0.0
+        return {
+            'id': self.id,
+            'type': self.type,
+            'minutes': self.minutes,
+            'started': self.started,
+            'state': self.state,
+            'remaining': remaining
+        }
+
+
+class SessionScheduler:
+    """Min-heap of session deadlines served by a single event loop timer
+    
+    Only the earliest deadline is ever armed on the loop, so the cost of
+    hosting a session is one heap entry. Cancelled or rescheduled entries
+    are dropped lazily when they reach the top of the heap.
+    """
+    
+    def __init__(self, loop, clock, on_expire):
+        self.loop = loop
+        self.clock = clock
+        self.on_expire = on_expire
+        self._heap = []
+        self._counter = itertools.count()
+        self._handle = None
+        self._armed_for = None
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def schedule(self, session):
+        """Add or move a session to its current deadline"""
+        heapq.heappush(self._heap, (session.deadline, next(self._counter), session))
+        self._arm()
+    
+    def _arm(self):
+        """Make sure the loop wakes up for the earliest deadline"""
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            self._disarm()
+            return
+        
+        deadline = self._heap[0][0]
+        if self._handle is not None and self._armed_for <= deadline:
+            return
+        self._disarm()
+        # The loop's own clock stops during suspend, so never sleep past
+        # DAEMON_MAX_SLEEP without re-reading the suspend-aware clock.
+        delay = min(max(0.0, deadline - self.clock.now()), DAEMON_MAX_SLEEP)
+        self._handle = self.loop.call_later(delay, self._fire)
+        self._armed_for = deadline
+    
+    def _disarm(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._armed_for = None
+    
+    def _is_current(self, entry):
+        deadline, _, session = entry
+        return session.state == 'running' and session.deadline == deadline
+    
+    def _fire(self):
+        self._handle = None
+        self._armed_for = None
+        now = self.clock.now()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                self.on_expire(entry[2], now - entry[0])
+        self._arm()
+
+
+class TimerDaemon:
+    """Hosts many sessions on one asyncio event loop behind a Unix socket
+    
+    Completed sessions are logged through SessionStats and ring the bell
+    through AudioPlayer on the loop's default executor, so slow disks or
+    audio never hold up other sessions.
+    """
+    
+    def __init__(self, socket_path=None, stats=None, audio_player=None, clock=None):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.stats = stats
+        self.audio_player = audio_player
+        self.clock = clock or SystemClock()
+        self.sessions = {}
+        self.scheduler = None
+        self.completed = 0
+        self.max_lateness = 0.0
+        self._ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._finished = []
+        self._server = None
+        self._stopped = None
+    
+    async def start(self):
+        """Start listening; call from inside the event loop"""
+        loop = asyncio.get_event_loop()
+        self.scheduler = SessionScheduler(loop, self.clock, self._expire)
+        self._stopped = asyncio.Event()
+        # On a fresh install nothing has created ~/.samaya yet
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_socket()
+        self._server = await asyncio.start_unix_server(self._handle_client, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+    
+    async def serve(self):
+        """Run until stop() is called"""
+        if self._server is None:
+            await self.start()
+        await self._stopped.wait()
+        self._server.close()
+        await self._server.wait_closed()
+        try:
+            self.socket_path.unlink()
+        except OSError:
+            pass
+    
+    def stop(self):
+        """Ask serve() to return"""
+        if self._stopped is not None:
+            self._stopped.set()
+    
+    def _remove_stale_socket(self):
+        """Clear a socket left behind by a daemon that is no longer running"""
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"A samaya daemon is already listening on {self.socket_path}")
+    
+    def start_session(self, session_type, minutes, bell=True):
+        """Schedule a new session and return it"""
+        session_id = str(next(self._ids))
+        deadline = self.clock.now() + minutes * 60
+        session = DaemonSession(session_id, session_type, minutes, deadline, bell)
+        self.sessions[session_id] = session
+        self.scheduler.schedule(session)
+        return session
+    
+    def cancel_session(self, session):
+        """Stop a running session early and log it as incomplete"""
+        session.state = 'cancelled'
+        self._finish(session, completed=False)
+    
+    def pause_session(self, session):
+        """Freeze a running session's remaining time"""
+        if session.state != 'running':
+            raise ValueError(f"Cannot pause a {session.state} session")
+        session.paused_remaining = max(0.0, session.deadline - self.clock.now())
+        session.state = 'paused'
+        self._changed(session)
+    
+    def resume_session(self, session):
+        """Restart the countdown of a paused session"""
+        if session.state != 'paused':
+            raise ValueError(f"Cannot resume a {session.state} session")
+        session.deadline = self.clock.now() + session.paused_remaining
+        session.paused_remaining = None
+        session.state = 'running'
+        self.scheduler.schedule(session)
+        self._changed(session)
+    
+    def extend_session(self, session, seconds):
+        """Add time to a running or paused session"""
+        session.minutes += seconds / 60
+        if session.state == 'paused':
+            session.paused_remaining += seconds
+        else:
+            session.deadline += seconds
+            self.scheduler.schedule(session)
+        self._changed(session)
+    
+    def _changed(self, session):
+        if session.watchers:
+            self._notify(session, {'event': 'changed', 'session': session.info(self.clock.now())})
+    
+    def _expire(self, session, lateness):
+        session.state = 'completed'
+        self.completed += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        metrics.observe(TICK_LATENESS_METRIC, lateness)
+        self._finish(session, completed=True)
+    
+    def _finish(self, session, completed):
+        del self.sessions[session.id]
+        if session.watchers:
+            self._notify(session, {'event': session.state, 'session': session.info(self.clock.now())})
+        
+        # Sessions finishing in the same loop iteration share one executor job
+        if not self._finished:
+            asyncio.get_event_loop().call_soon(self._flush_finished)
+        self._finished.append((session, completed))
+    
+    def _flush_finished(self):
+        batch, self._finished = self._finished, []
+        asyncio.get_event_loop().run_in_executor(None, self._complete, batch)
+    
+    def _complete(self, batch):
+        """Persist and announce finished sessions; runs off the event loop"""
+        bell = False
+        with self._stats_lock:
+            for session, completed in batch:
+                if self.stats is not None:
+                    self.stats.log_session(session.type, session.minutes, completed=completed)
+                bell = bell or (completed and session.bell)
+        if bell and self.audio_player is not None:
+            self.audio_player.play_bell_sound()
+    
+    def _notify(self, session, message):
+        """Push an event to every client watching a session"""
+        frame = encode(message)
+        for writer in list(session.watchers):
+            try:
+                writer.write(frame)
+            except (ConnectionError, RuntimeError):
+                session.watchers.discard(writer)
+    
+    def _find(self, request):
+        """Resolve the session a request refers to; defaults to the newest"""
+        session_id = request.get('id')
+        if session_id is None and self.sessions:
+            session_id = max(self.sessions, key=int)
+        session = self.sessions.get(str(session_id)) if session_id is not None else None
+        if session is None:
+            raise LookupError("No such running session")
+        return session
+    
+    def _list_page(self, request, now):
+        """Up to limit sessions with IDs after the one given, oldest first
+        
+        next is the ID to ask for the following page from, or None after
+        the last one. Paging by ID rather than position skips nothing when
+        sessions end between pages.
+        """
+        after = request.get('after', 0)
+        limit = request.get('limit', DAEMON_LIST_PAGE)
+        if not isinstance(after, (int, str)) or not str(after).isdigit():
+            raise ValueError("after must be a session ID")
+        if not isinstance(limit, int) or limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        after, limit = int(after), min(limit, DAEMON_LIST_PAGE)
+        # Sessions are kept in the order they started, which is ID order
+        newer = (session for session in self.sessions.values() if int(session.id) > after)
+        page = [session.info(now) for session in itertools.islice(newer, limit + 1)]
+        more = len(page) > limit
+        page = page[:limit]
+        return {'ok': True, 'sessions': page, 'total': len(self.sessions), 'next': page[-1]['id'] if more else None}
+    
+    def handle_request(self, request, writer=None):
+        """Execute one command and return the response message"""
+        command = request.get('cmd')
+        now = self.clock.now()
+        
+        if command == 'start':
+            minutes = request.get('minutes')
+            if not isinstance(minutes, (int, float)) or minutes <= 0:
+                raise ValueError("minutes must be a positive number")
+            session = self.start_session(str(request.get('type', 'custom')), minutes, bool(request.get('bell', True)))
+            return {'ok': True, 'session': session.info(now)}
+        if command == 'status':
+            return {'ok': True, 'session': self._find(request).info(now)}
+        if command == 'list':
+            return self._list_page(request, now)
+        if command in ('cancel', 'abort'):
+            session = self._find(request)
+            self.cancel_session(session)
+            return {'ok': True, 'session': session.info(now)}
+        if command == 'pause':
+            session = self._find(request)
+            self.pause_session(session)
+            return {'ok': True, 'session': session.info(now)}
+        if command == 'resume':
+            session = self._find(request)
+            self.resume_session(session)
+            return {'ok': True, 'session': session.info(self.clock.now())}
+        if command == 'extend':
+            seconds = request.get('seconds')
+            if not isinstance(seconds, (int, float)) or seconds <= 0:
+                raise ValueError("seconds must be a positive number")
+            session = self._find(request)
+            self.extend_session(session, seconds)
+            return {'ok': True, 'session': session.info(now)}
+        if command == 'watch':
+            session = self._find(request)
+            if writer is not None:
+                session.watchers.add(writer)
+            return {'ok': True, 'session': session.info(now)}
+        if command == 'daemon':
+            return {
+                'ok': True,
+                'pid': os.getpid(),
+                'sessions': len(self.sessions),
+                'completed': self.completed,
+                'max_lateness': self.max_lateness
+            }
+        raise ValueError(f"Unknown command: {command}")
+    
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except ProtocolError as e:
+                    writer.write(encode({'ok': False, 'error': str(e)}))
+                    break
+                if request is None:
+                    break
+                try:
+                    response = self.handle_request(request, writer)
+                except (LookupError, ValueError) as e:
+                    response = {'ok': False, 'error': str(e)}
+                try:
+                    frame = encode(response)
+                except ProtocolError as e:
+                    frame = encode({'ok': False, 'error': str(e)})
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in self.sessions.values():
+                session.watchers.discard(writer)
+            writer.close()
+
+
+def run_daemon(socket_path=None, metrics_port=None, profile=None):
+    """Run the timer daemon in the foreground until interrupted
+    
+    Sessions are logged to the stats of profile, if given. With
+    metrics_port, metrics are recorded and served in the OpenMetrics format
+    on http://127.0.0.1:<metrics_port>/metrics.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        print("The samaya daemon needs Unix domain sockets, which this platform lacks")
+        return False
+    
+    from .audio import AudioPlayer
+    from .stats import SessionStats
+    
+    try:
+        stats = SessionStats(profile=profile)
+    except ValueError as e:
+        print(f"Could not start daemon: {e}")
+        return False
+    daemon = TimerDaemon(socket_path, stats=stats, audio_player=AudioPlayer())
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    executor = ThreadPoolExecutor()
+    loop.set_default_executor(executor)
+    try:
+        loop.run_until_complete(daemon.start())
+    except (RuntimeError, OSError) as e:
+        print(f"Could not start daemon: {e}")
+        loop.close()
+        return False
+    
+    metrics_server = None
+    if metrics_port is not None:
+        from .metrics import serve_http
+        metrics.enable()
+        try:
+            metrics_server = serve_http(metrics, metrics_port)
+        except OSError as e:
+            print(f"Could not serve metrics on port {metrics_port}: {e}")
+        else:
+            print(f"Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
+    
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, daemon.stop)
+    print(f"samaya daemon listening on {daemon.socket_path}")
+    try:
+        loop.run_until_complete(daemon.serve())
+        # Let in-flight stats writes and bells finish
+        executor.shutdown(wait=True)
+    finally:
+        loop.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    return True
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from datetime import datetime
+from .metrics import metrics
+from .workers import WorkerPool
+from .constants import (
+    EVENT_KINDS, DEFAULT_HOOK_EVENTS, HOOK_WORKERS, HOOK_QUEUE_SIZE, HOOK_TIMEOUT,
+    HOOKS_FILE_NAME, HOOK_ENTRY_POINT_GROUP
+)
+
+
+class SessionEvent:
+    """Something that happened to a session, as handed to hooks
+    
+    kind is one of EVENT_KINDS; remaining is in seconds and minutes is
+    the session's planned length, including any extension.
+    """
+    
+    __slots__ = ('kind', 'session_type', 'minutes', 'remaining', 'time', 'pid')
+    
+    def __init__(self, kind, session_type, minutes, remaining=None, timestamp=None):
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event: {kind}")
+        self.kind = kind
+        self.session_type = session_type
+        self.minutes = minutes
+        self.remaining = remaining
+        # timestamp is the time.time() the event happened at, now by default
+        self.time = datetime.fromtimestamp(time.time() if timestamp is None else timestamp).isoformat()
+        self.pid = os.getpid()
+    
+    def as_dict(self):
+        return {
+            'event': self.kind,
+            'type': self.session_type,
+            'minutes': self.minutes,
+            'remaining': self.remaining,
+            'time': self.time,
+            'pid': self.pid
+        }
+    
+    def __repr__(self):
+        return f"SessionEvent({self.kind!r}, {self.session_type!r}, {self.minutes!r}, {self.remaining!r})"
+
+
+class Hook:
+    """A callable subscribed to some event kinds
+    
+    Events wait in a small queue of their own and are delivered one at a
+    time, in order. When the queue is full a pending tick is dropped to
+    make room, or else the new event. Calls that take longer than timeout
+    are counted; they cannot be interrupted, but while one runs, events
+    for this hook only pile up to the queue bound. Failures are counted
+    and kept for EventBus.report_failures(), never printed from the pool,
+    where they would land in the middle of the countdown.
+    """
+    
+    def __init__(self, fn, events=None, name=None, timeout=HOOK_TIMEOUT, queue_size=HOOK_QUEUE_SIZE):
+        self.fn = fn
+        self.events = frozenset(events if events is not None else DEFAULT_HOOK_EVENTS)
+        unknown = self.events - set(EVENT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown events: {', '.join(sorted(unknown))}")
+        self.name = name or getattr(fn, '__name__', None) or type(fn).__name__
+        self.timeout = timeout
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.dropped = 0
+        self.last_error = None
+        self._reported = 0
+        self._queue = deque()
+        self._queue_size = queue_size
+        self._scheduled = False
+        self._lock = threading.Lock()
+    
+    def __call__(self, event):
+        return self.fn(event)
+    
+    def _offer(self, event):
+        """Queue an event; returns True if the hook needs a worker"""
+        with self._lock:
+            if len(self._queue) >= self._queue_size:
+                ticks = [queued for queued in self._queue if queued.kind == 'tick']
+                if not ticks:
+                    self._drop()
+                    return False
+                self._queue.remove(ticks[0])
+                self._drop()
+            self._queue.append(event)
+            if self._scheduled:
+                return False
+            self._scheduled = True
+            return True
+    
+    def _drop(self):
+        self.dropped += 1
+        metrics.count('samaya_hook_dropped', hook=self.name)
+    
+    def _unschedule(self):
+        """The pool had no room: drop what is queued so a later event can retry"""
+        with self._lock:
+            for _ in self._queue:
+                self._drop()
+            self._queue.clear()
+            self._scheduled = False
+    
+    def _run(self):
+        """Deliver queued events until the queue is empty; runs on the pool"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._scheduled = False
+                    return
+                event = self._queue.popleft()
+            start = time.perf_counter()
+            try:
+                self(event)
+            except Exception as e:
+                self.failures += 1
+                metrics.count('samaya_hook_failures', hook=self.name)
+                self.last_error = f"{event.kind}: {e}"
+            elapsed = time.perf_counter() - start
+            self.calls += 1
+            metrics.observe('samaya_hook_seconds', elapsed, hook=self.name)
+            if self.timeout is not None and elapsed > self.timeout:
+                self.timeouts += 1
+                metrics.count('samaya_hook_timeouts', hook=self.name)
+
+
+class CommandHook(Hook):
+    """Runs a command per event, killed after timeout
+    
+    The event is passed as JSON on stdin and as SAMAYA_EVENT,
+    SAMAYA_SESSION_TYPE, SAMAYA_MINUTES and SAMAYA_REMAINING in the
+    environment.
+    """
+    
+    def __init__(self, command, events=None, name=None, timeout=HOOK_TIMEOUT):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        if not self.command:
+            raise ValueError("Empty hook command")
+        self.command[0] = os.path.expanduser(self.command[0])
+        super().__init__(self._run_command, events, name or os.path.basename(self.command[0]), timeout)
+    
+    def _run_command(self, event):
+        env = dict(os.environ,
+                   SAMAYA_EVENT=event.kind,
+                   SAMAYA_SESSION_TYPE=str(event.session_type),
+                   SAMAYA_MINUTES=str(event.minutes),
+                   SAMAYA_REMAINING='' if event.remaining is None else str(int(event.remaining)))
+        try:
+            subprocess.run(self.command, input=json.dumps(event.as_dict()), env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           universal_newlines=True, timeout=self.timeout, check=True)
+        except subprocess.TimeoutExpired:
+            # subprocess.run has killed it; counted as a timeout by _run
+            pass
+
+
+class EventBus:
+    """Delivers session events to hooks on a bounded pool of threads
+    
+    emit() never blocks: it queues the event on each subscribed hook and
+    hands hooks that are not already running to the pool without waiting
+    for room. The pool is separate from the completion workers, so hooks
+    cannot hold up the countdown or stats logging.
+    """
+    
+    def __init__(self, hooks=(), workers=HOOK_WORKERS):
+        self.hooks = []
+        self.pool = WorkerPool(workers=workers, max_pending=HOOK_QUEUE_SIZE, submit_timeout=0, name='samaya-hook')
+        for hook in hooks:
+            self.register(hook)
+    
+    def register(self, hook, events=None, name=None, timeout=HOOK_TIMEOUT):
+        """Subscribe a Hook, or a plain callable taking a SessionEvent; returns the Hook"""
+        if not isinstance(hook, Hook):
+            hook = Hook(hook, events if events is not None else getattr(hook, 'events', None), name, timeout)
+        self.hooks.append(hook)
+        return hook
+    
+    def wants(self, kind):
+        """Whether any hook listens for kind; lets callers skip building events"""
+        return any(kind in hook.events for hook in self.hooks)
+    
+    def emit(self, event):
+        for hook in self.hooks:
+            if event.kind in hook.events and hook._offer(event):
+                if self.pool.submit(hook._run) is None:
+                    hook._unschedule()
+    
+    def drain(self, timeout=None):
+        """Wait for queued events to be delivered; False on timeout"""
+        return self.pool.drain(timeout)
+    
+    def report_failures(self, stream=None):
+        """Write a line to stderr per hook that failed since the last report
+        
+        Call it once the countdown is off the screen.
+        """
+        for hook in self.hooks:
+            failures = hook.failures - hook._reported
+            if failures:
+                hook._reported += failures
+                print(f"Hook {hook.name} failed {failures} time{'s' if failures != 1 else ''}, last on {hook.last_error}",
+                      file=stream or sys.stderr)
+
+
+def load_hooks(hooks_file=None):
+    """Hooks from the `samaya.hooks` entry points and the hooks file
+    
+    hooks_file defaults to hooks.json in the stats directory and holds
+    {"hooks": [{"command": ..., "events": [...], "timeout": seconds, "name": ...}]}.
+    Hooks that cannot be loaded are reported and skipped.
+    """
+    hooks = []
+    for entry_point in _entry_points():
+        try:
+            fn = entry_point.load()
+            hooks.append(Hook(fn, getattr(fn, 'events', None), entry_point.name,
+                              getattr(fn, 'timeout', HOOK_TIMEOUT)))
+        except Exception as e:
+            print(f"Could not load hook {entry_point.name}: {e}")
+    
+    if hooks_file is None:
+        from .stats import base_stats_dir
+        hooks_file = base_stats_dir() / HOOKS_FILE_NAME
+    try:
+        with open(hooks_file, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return hooks
+    except (OSError, ValueError) as e:
+        print(f"Could not read {hooks_file}: {e}")
+        return hooks
+    
+    entries = config.get('hooks', []) if isinstance(config, dict) else None
+    if not isinstance(entries, list):
+        print(f"Could not read {hooks_file}: expected {{\"hooks\": [...]}}")
+        return hooks
+    for index, entry in enumerate(entries):
+        try:
+            hooks.append(CommandHook(entry['command'], entry.get('events'), entry.get('name'),
+                                     entry.get('timeout', HOOK_TIMEOUT)))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            print(f"Skipping hook {index + 1} in {hooks_file}: {e}")
+    return hooks
+
+
+@lru_cache(maxsize=None)
+def _entry_points():
+    # Scanning every installed distribution is slow; hooks installed while
+    # the process runs are picked up by the next one
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return ()
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return tuple(found.select(group=HOOK_ENTRY_POINT_GROUP))
+    return tuple(found.get(HOOK_ENTRY_POINT_GROUP, ()))
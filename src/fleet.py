@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from .constants import (
+    SQLITE_FILE_NAME, BINARY_FILE_NAME, STATS_FILE_NAME, JOURNAL_FILE_NAME, SESSION_TYPES,
+    STATS_EMOJI, REPORT_PERIODS, REPORT_BAR_WIDTH
+)
+from .rollups import empty_rollups, group_days
+from .storage import counter_type
+
+
+# The file that marks a directory as a store of each backend, in the order
+# they are tried; a directory holds one store
+STORE_FILES = (
+    ('sqlite', SQLITE_FILE_NAME),
+    ('binary', BINARY_FILE_NAME),
+    ('json', JOURNAL_FILE_NAME),
+    ('json', STATS_FILE_NAME),
+)
+
+
+def find_stores(root):
+    """Yield (directory, backend name) for every stats store under root"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        names = set(filenames)
+        for backend, filename in STORE_FILES:
+            if filename in names:
+                yield dirpath, backend
+                break
+
+
+def summarize_store(store):
+    """Summary and rollups of one store, or the error that stopped it
+    
+    Runs in a worker process. Reads the store's summary cache, so a store
+    unchanged since its owner last wrote the sidecar costs a stat() and a
+    small read, but writes nothing: the stores may be read-only or belong
+    to other users.
+    """
+    from .stats import SessionStats
+    path, backend = store
+    stats = SessionStats(Path(path), backend=backend)
+    try:
+        entry = stats.cache.get(save=False)
+        return {'path': path, 'summary': entry['summary'], 'rollups': entry['rollups']}
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        return {'path': path, 'error': str(e)}
+    finally:
+        stats.close()
+
+
+def empty_aggregate():
+    return {
+        'stores': 0,
+        'failed': [],
+        'summary': {
+            'total_sessions': 0,
+            'total_minutes': 0,
+            'sessions_by_type': {session_type: 0 for session_type in SESSION_TYPES}
+        },
+        'rollups': empty_rollups()
+    }
+
+
+def merge_partial(aggregate, partial):
+    """Add one store's result from summarize_store() into aggregate"""
+    if 'error' in partial:
+        aggregate['failed'].append((partial['path'], partial['error']))
+        return aggregate
+    aggregate['stores'] += 1
+    summary, rollups = aggregate['summary'], aggregate['rollups']
+    summary['total_sessions'] += partial['summary']['total_sessions']
+    summary['total_minutes'] += partial['summary']['total_minutes']
+    for session_type, count in partial['summary']['sessions_by_type'].items():
+        summary['sessions_by_type'][counter_type(session_type)] += count
+    for period in ('days', 'months'):
+        merged = rollups[period]
+        for key, (sessions, completed, minutes) in partial['rollups'].get(period, {}).items():
+            bucket = merged.setdefault(key, [0, 0, 0])
+            bucket[0] += sessions
+            bucket[1] += completed
+            bucket[2] += minutes
+    for totals, hours in zip(rollups['hours'], partial['rollups']['hours']):
+        for hour, count in enumerate(hours):
+            totals[hour] += count
+    return aggregate
+
+
+def aggregate_stores(root, jobs=None):
+    """Summarize every store under root on a process pool and merge the results
+    
+    Each worker summarizes whole stores and returns only their counters and
+    rollup buckets, which the parent adds up as they arrive, so the work
+    spreads over the cores and little crosses process boundaries.
+    """
+    stores = list(find_stores(root))
+    jobs = min(jobs or os.cpu_count() or 1, len(stores)) or 1
+    aggregate = empty_aggregate()
+    if jobs == 1:
+        for store in stores:
+            merge_partial(aggregate, summarize_store(store))
+        return aggregate
+    # A few chunks per worker keeps them busy when store sizes vary
+    chunksize = max(1, len(stores) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for partial in pool.map(summarize_store, stores, chunksize=chunksize):
+            merge_partial(aggregate, partial)
+    return aggregate
+
+
+def display_aggregate(aggregate, root, by=None):
+    """Display the combined statistics of every store under root"""
+    summary = aggregate['summary']
+    hours = round(summary['total_minutes'] / 60, 1)
+    
+    print(f"\n{STATS_EMOJI} Combined Statistics: {root}")
+    print("=" * 25)
+    print(f"Stores: {aggregate['stores']}")
+    print(f"Total Sessions: {summary['total_sessions']}")
+    print(f"Total Time: {summary['total_minutes']} minutes ({hours} hours)")
+    print()
+    print("Sessions by Type:")
+    for session_type, count in summary['sessions_by_type'].items():
+        if count > 0:
+            print(f"  {session_type.capitalize()}: {count}")
+    print()
+    if by:
+        rows = group_days(aggregate['rollups']['days'], by, REPORT_PERIODS[by], months=aggregate['rollups']['months'])
+        peak = max(row['minutes'] for row in rows) or 1
+        print(f"Focus Time by {by.capitalize()}")
+        for row in rows:
+            bar = "█" * round(row['minutes'] / peak * REPORT_BAR_WIDTH)
+            print(f"{row['period']}  {bar:<{REPORT_BAR_WIDTH}} {row['minutes']:>5} min ({row['completed']}/{row['sessions']})")
+        print()
+    for path, error in aggregate['failed']:
+        print(f"Skipped {path}: {error}")
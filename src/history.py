@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import csv
+import hashlib
+import heapq
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from operator import itemgetter
+from .constants import HISTORY_FORMATS, HISTORY_RUN_SIZE
+from .storage import counter_type
+
+
+# Columns of the CSV format; JSONL lines carry the same keys
+FIELDS = ('id', 'timestamp', 'type', 'duration', 'completed')
+
+_sort_key = itemgetter(0)
+
+
+def session_id(record):
+    """Content hash identifying a session across machines and stores
+    
+    Built from what every store keeps exactly: the start time to the
+    second, the type as counted, the length in whole seconds and the
+    outcome. The same session exported twice, or from a JSON and a binary
+    store, gets the same ID.
+    """
+    content = "|".join((
+        record['timestamp'][:19],
+        counter_type(record['type']),
+        str(int(round(record['duration'] * 60))),
+        '1' if record['completed'] else '0'
+    ))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+def history_format(path):
+    """History format for a file name: jsonl (also for '-') or csv"""
+    path = str(path)
+    if path == '-' or path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    raise ValueError(f"Cannot tell the history format of {path} (use .jsonl or .csv)")
+
+
+@contextmanager
+def open_history(path, mode='r'):
+    """Open a history file, or stdin/stdout for '-'
+    
+    Files opened for writing are written under a temporary name and moved
+    into place once complete, so an output may also be one of the inputs.
+    """
+    if str(path) == '-':
+        yield sys.stdout if 'w' in mode else sys.stdin
+        return
+    newline = '' if history_format(path) == 'csv' else None
+    if 'w' not in mode:
+        with open(path, mode, newline=newline, encoding='utf-8') as f:
+            yield f
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, mode, newline=newline, encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def write_history(records, f, fmt='jsonl'):
+    """Write session records, each with its ID, to a text file; returns how many"""
+    if fmt not in HISTORY_FORMATS:
+        raise ValueError(f"Unknown history format: {fmt}")
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(FIELDS)
+    count = 0
+    for record in records:
+        row = (session_id(record), record['timestamp'], record['type'], record['duration'], bool(record['completed']))
+        if writer is not None:
+            writer.writerow(row[:4] + ('true' if row[4] else 'false',))
+        else:
+            f.write(json.dumps(dict(zip(FIELDS, row)), separators=(',', ':')) + '\n')
+        count += 1
+    return count
+
+
+def read_history(f, fmt='jsonl', source='history'):
+    """Yield the session records of a JSONL or CSV history file, one at a time
+    
+    Blank lines are skipped; anything else that is not a valid session
+    raises ValueError naming source and the line.
+    """
+    if fmt == 'jsonl':
+        rows = ((number, line) for number, line in enumerate(f, 1) if line.strip())
+        for number, line in rows:
+            try:
+                yield _session(json.loads(line))
+            except (ValueError, TypeError, KeyError) as e:
+                raise ValueError(f"{source}:{number}: not a session record ({e})")
+    elif fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                yield _session(row)
+            except (ValueError, TypeError, KeyError) as e:
+                raise ValueError(f"{source}:{reader.line_num}: not a session record ({e})")
+    else:
+        raise ValueError(f"Unknown history format: {fmt}")
+
+
+def read_history_file(path):
+    """Yield the session records of a history file, or of stdin for '-'"""
+    with open_history(path) as f:
+        yield from read_history(f, history_format(path), str(path))
+
+
+def _session(row):
+    """Validate and normalize a parsed row into a session record"""
+    if not isinstance(row, dict):
+        raise TypeError("expected an object")
+    timestamp = row['timestamp']
+    datetime.fromisoformat(timestamp)
+    duration = row['duration']
+    if isinstance(duration, str):
+        duration = float(duration)
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0:
+        raise ValueError(f"bad duration {row['duration']!r}")
+    completed = row['completed']
+    if isinstance(completed, str):
+        if completed.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"bad completed flag {completed!r}")
+        completed = completed.lower() in ('true', '1')
+    return {
+        'timestamp': timestamp,
+        'type': str(row['type']),
+        'duration': int(duration) if duration == int(duration) else duration,
+        'completed': bool(completed)
+    }
+
+
+def _keyed(records):
+    for record in records:
+        yield ((record['timestamp'][:19], session_id(record)), record)
+
+
+def sort_history(records, run_size=HISTORY_RUN_SIZE):
+    """Yield (key, record) pairs in time order, keeping at most run_size records in memory
+    
+    Larger inputs are cut into sorted runs spilled to temporary files and
+    merged back. The whole input is consumed before the first pair is
+    yielded, so it is safe to write to the store it came from by then.
+    """
+    runs = []
+    buffer = []
+    try:
+        for item in _keyed(records):
+            buffer.append(item)
+            if len(buffer) >= run_size:
+                runs.append(_spill(buffer))
+                buffer = []
+        buffer.sort(key=_sort_key)
+        if not runs:
+            yield from buffer
+            return
+        yield from heapq.merge(buffer, *(_read_run(run) for run in runs), key=_sort_key)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _spill(buffer):
+    buffer.sort(key=_sort_key)
+    run = tempfile.TemporaryFile('w+', encoding='utf-8')
+    for (second, identity), record in buffer:
+        run.write(json.dumps([second, identity, record], separators=(',', ':')) + '\n')
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    for line in run:
+        second, identity, record = json.loads(line)
+        yield ((second, identity), record)
+
+
+def _tagged(stream, index):
+    for key, record in stream:
+        yield key, index, record
+
+
+def _merge_sorted(streams):
+    """Yield (record, stream index) for each distinct session, from the first stream holding it"""
+    tagged = [_tagged(stream, index) for index, stream in enumerate(streams)]
+    last = None
+    # heapq.merge breaks ties by stream order, so earlier streams win
+    for key, index, record in heapq.merge(*tagged, key=_sort_key):
+        if key != last:
+            last = key
+            yield record, index
+
+
+def merge_history(sources, run_size=HISTORY_RUN_SIZE):
+    """Yield the distinct sessions of several record iterables in time order
+    
+    Each source is sorted in bounded memory (see sort_history), then all of
+    them are merged in one pass that drops sessions with an ID already seen.
+    """
+    for record, _ in _merge_sorted([sort_history(source, run_size) for source in sources]):
+        yield record
+
+
+def new_sessions(stored, incoming, run_size=HISTORY_RUN_SIZE):
+    """Yield the sessions of incoming that are neither in stored nor repeated"""
+    for record, index in _merge_sorted([sort_history(stored, run_size), sort_history(incoming, run_size)]):
+        if index == 1:
+            yield record
+
+
+def merge_files(paths, output):
+    """Merge history files into output without duplicates; returns how many sessions it holds"""
+    with open_history(output, 'w') as f:
+        return write_history(merge_history([read_history_file(path) for path in paths]), f, history_format(output))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+@contextmanager
+def file_lock(path, exclusive=True, blocking=True):
+    """Hold an advisory lock on path (created if needed) for the block
+    
+    Shared locks let many writers append side by side while an exclusive
+    holder, such as compaction rewriting the files, waits for all of them.
+    The lock belongs to the open file, so threads of one process exclude
+    each other too. Windows has no shared locks; every lock is exclusive.
+    Without blocking, a lock held elsewhere raises BlockingIOError.
+    A shared lock on a store that cannot be written, such as another
+    user's, is taken on a read-only descriptor, or skipped when the lock
+    file does not exist since nothing can be writing there.
+    """
+    try:
+        fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        if exclusive or e.errno not in (errno.EACCES, errno.EPERM, errno.EROFS):
+            raise
+        try:
+            fd = os.open(str(path), os.O_RDONLY)
+        except FileNotFoundError:
+            yield
+            return
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+            except OSError as e:
+                if blocking:
+                    raise
+                raise BlockingIOError(f"{path} is locked") from e
+        elif msvcrt is not None:
+            try:
+                # Retries for about ten seconds before raising OSError
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError as e:
+                if blocking:
+                    raise
+                raise BlockingIOError(f"{path} is locked") from e
+        yield
+    finally:
+        if fcntl is None and msvcrt is not None:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            except OSError:
+                pass
+        os.close(fd)
+
+
+def process_alive(pid):
+    """Whether process pid is still running"""
+    if os.name != 'posix':
+        # Without a harmless probe, never treat another process's session as orphaned
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from .constants import METRICS_BUCKETS, PHASE_METRIC
+
+
+class _NullSpan:
+    """Context manager that does nothing, handed out while metrics are off"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times a block on the monotonic clock and records it as a phase"""
+    
+    __slots__ = ('registry', 'labels', 'start')
+    
+    def __init__(self, registry, labels):
+        self.registry = registry
+        self.labels = labels
+        self.start = None
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.registry.observe(PHASE_METRIC, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram:
+    """Count, sum, maximum and cumulative bucket counts of observed values"""
+    
+    __slots__ = ('count', 'sum', 'max', 'buckets')
+    
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(METRICS_BUCKETS)
+    
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(METRICS_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class Metrics:
+    """Counters and timing histograms, off until enable() is called
+    
+    While disabled, span() hands out a shared no-op context manager and
+    count() and observe() return after one attribute check, so
+    instrumented code pays next to nothing. Series are keyed by metric
+    name and a sorted tuple of label pairs; updates may come from any
+    thread.
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self.origin = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._marks = set()
+    
+    def enable(self):
+        """Start recording; mark() measures from this moment"""
+        if not self.enabled:
+            self.origin = time.perf_counter()
+            self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._marks.clear()
+    
+    def span(self, phase, **labels):
+        """Context manager recording how long its block takes as phase"""
+        if not self.enabled:
+            return _NULL_SPAN
+        labels['phase'] = phase
+        return _Span(self, labels)
+    
+    def mark(self, phase):
+        """Record the time since enable() as phase, the first time only"""
+        if not self.enabled or phase in self._marks:
+            return
+        self._marks.add(phase)
+        self.observe(PHASE_METRIC, time.perf_counter() - self.origin, phase=phase)
+    
+    def count(self, name, amount=1, **labels):
+        """Add amount to the counter name"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        """Add a value, in seconds, to the histogram name"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+    
+    def counter(self, name, **labels):
+        """Current value of a counter"""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+    
+    def histogram(self, name, **labels):
+        """Current histogram for a series, or None if nothing was observed"""
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+    
+    def format_report(self):
+        """Human-readable table of phase timings and counters for --profile"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        
+        lines = [f"{'phase':<28} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for (name, labels), histogram in histograms:
+            label = _describe(name, labels)
+            mean = histogram.sum / histogram.count
+            lines.append(f"{label:<28} {histogram.count:>6} {histogram.sum * 1000:>10.2f} "
+                         f"{mean * 1000:>9.2f} {histogram.max * 1000:>9.2f}")
+        if counters:
+            lines.append("")
+            for (name, labels), value in counters:
+                lines.append(f"{_describe(name, labels):<28} {value:>6}")
+        return "\n".join(lines)
+    
+    def to_openmetrics(self):
+        """Render every series in the OpenMetrics text format"""
+        with self._lock:
+            histograms = sorted((key, (h.count, h.sum, list(h.buckets))) for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+        
+        lines = []
+        family = None
+        for (name, labels), (count, total, buckets) in histograms:
+            if name != family:
+                family = name
+                lines.append(f"# TYPE {name} histogram")
+                lines.append(f"# UNIT {name} seconds")
+            for bound, bucket in zip(METRICS_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_labels(labels, le=repr(float(bound)))} {bucket}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+        for (name, labels), value in counters:
+            if name != family:
+                family = name
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}_total{_labels(labels)} {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+    
+    def write_openmetrics(self, path):
+        """Write to_openmetrics() to path, replacing it atomically"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.to_openmetrics())
+        os.replace(temp_path, path)
+
+
+def _describe(name, labels):
+    """Short series name for the --profile table"""
+    labels = dict(labels)
+    if name == PHASE_METRIC:
+        name = labels.pop('phase')
+    if labels:
+        name += "{" + ",".join(f"{key}={value}" for key, value in labels.items()) + "}"
+    return name
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def serve_http(registry, port, host='127.0.0.1'):
+    """Serve registry on http://host:port/metrics from a background thread
+    
+    Returns the server; call shutdown() on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_openmetrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='samaya-metrics', daemon=True).start()
+    return server
+
+
+# The process-wide registry that samaya's modules record into
+metrics = Metrics()
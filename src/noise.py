@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+
+import math
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+from array import array
+from collections import deque
+from .constants import (
+    NOISE_SAMPLE_RATE, NOISE_BLOCK_FRAMES, NOISE_CUTOFF_HZ, AUDIO_TIMEOUT, AUDIO_WARM_IDLE_SECONDS
+)
+
+
+# All audio here is 16-bit signed little-endian mono PCM
+SAMPLE_WIDTH = 2
+FULL_SCALE = 32767
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+# Size written into the header of a WAV stream whose length is unknown
+STREAM_DATA_SIZE = 0x7FFFFFFF
+
+# Inharmonic partials of a struck bell: (frequency ratio, amplitude)
+BELL_PARTIALS = ((1.0, 1.0), (2.76, 0.5), (5.40, 0.25), (8.93, 0.12))
+
+
+def _import_numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def leak_coefficient(cutoff_hz, sample_rate):
+    """Per-sample decay of a one-pole integrator with the given corner frequency"""
+    return math.exp(-2 * math.pi * cutoff_hz / sample_rate)
+
+
+class BrownNoise:
+    """Brown noise from a leaky-integrated random walk, computed in blocks
+    
+    Each sample is leak * previous + white noise. The leak pulls the walk
+    back towards zero so it never drifts into clipping, while the spectrum
+    above the cutoff keeps the 1/f^2 slope of brown noise. Blocks are
+    computed with NumPy when it is installed and with a loop filling an
+    array('h') otherwise.
+    """
+    
+    def __init__(self, volume=0.3, sample_rate=NOISE_SAMPLE_RATE, block_frames=NOISE_BLOCK_FRAMES,
+                 cutoff_hz=NOISE_CUTOFF_HZ, seed=None, use_numpy=None):
+        self.sample_rate = sample_rate
+        self.block_frames = block_frames
+        self.leak = leak_coefficient(cutoff_hz, sample_rate)
+        # White noise of this deviation settles the walk at a quarter of
+        # full scale for volume 1, leaving headroom before clipping
+        self.step = 0.25 * volume * FULL_SCALE * math.sqrt(1 - self.leak ** 2)
+        self.level = 0.0
+        
+        self._numpy = _import_numpy() if use_numpy is not False else None
+        if use_numpy and self._numpy is None:
+            raise ImportError("numpy is not installed")
+        if self._numpy is not None:
+            self._rng = self._numpy.random.default_rng(seed)
+            # leak^1 .. leak^n, used to run the recursion as a cumulative sum
+            self._decay = self.leak ** self._numpy.arange(1, block_frames + 1)
+        else:
+            self._random = random.Random(seed)
+    
+    def block(self):
+        """Return the next block_frames samples as PCM bytes"""
+        if self._numpy is not None:
+            return self._numpy_block()
+        return self._array_block()
+    
+    def blocks(self):
+        """Endless iterator over PCM blocks"""
+        while True:
+            yield self.block()
+    
+    def _numpy_block(self):
+        np = self._numpy
+        white = self._rng.standard_normal(self.block_frames) * self.step
+        # y[i] = leak^(i+1) * (y0 + sum(x[j] * leak^-(j+1) for j <= i))
+        walk = self._decay * (self.level + np.cumsum(white / self._decay))
+        self.level = float(walk[-1])
+        return np.clip(walk, -FULL_SCALE, FULL_SCALE).astype('<i2').tobytes()
+    
+    def _array_block(self):
+        leak, level = self.leak, self.level
+        # Uniform white noise scaled to the same deviation as step
+        step = self.step * math.sqrt(12)
+        uniform = self._random.random
+        samples = array('h', bytes(self.block_frames * SAMPLE_WIDTH))
+        for i in range(self.block_frames):
+            level = leak * level + step * (uniform() - 0.5)
+            if level > FULL_SCALE:
+                level = FULL_SCALE
+            elif level < -FULL_SCALE:
+                level = -FULL_SCALE
+            samples[i] = int(level)
+        self.level = level
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return samples.tobytes()
+
+
+def wav_header(sample_rate, frames=None):
+    """RIFF header for mono 16-bit PCM; frames=None for an endless stream"""
+    data_size = frames * SAMPLE_WIDTH if frames is not None else STREAM_DATA_SIZE
+    return WAV_HEADER.pack(
+        b'RIFF', min(data_size + 36, 0xFFFFFFFF), b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * SAMPLE_WIDTH, SAMPLE_WIDTH, 8 * SAMPLE_WIDTH,
+        b'data', data_size
+    )
+
+
+def synthesize_bell(sample_rate=NOISE_SAMPLE_RATE, frequency=880.0, seconds=1.5, volume=0.5):
+    """Render a decaying bell strike as PCM bytes"""
+    frames = int(sample_rate * seconds)
+    total = sum(amplitude for _, amplitude in BELL_PARTIALS)
+    samples = array('h', bytes(frames * SAMPLE_WIDTH))
+    for i in range(frames):
+        t = i / sample_rate
+        value = 0.0
+        for ratio, amplitude in BELL_PARTIALS:
+            # Higher partials die away faster, as on a real bell
+            value += amplitude * math.exp(-3.0 * ratio * t) * math.sin(2 * math.pi * frequency * ratio * t)
+        samples[i] = int(volume * FULL_SCALE * value / total)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def decode_audio_file(path, sample_rate=NOISE_SAMPLE_RATE):
+    """Decode an audio file to PCM with ffmpeg, or None if that is not possible"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+    try:
+        result = subprocess.run(
+            [ffmpeg, '-v', 'error', '-i', str(path), '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10 * AUDIO_TIMEOUT
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+_bell_cache = {}
+
+
+def bell_pcm(path=None, sample_rate=NOISE_SAMPLE_RATE):
+    """The bell as PCM bytes, decoded from path or synthesized, once per process"""
+    key = (str(path) if path else None, sample_rate)
+    if key not in _bell_cache:
+        pcm = decode_audio_file(path, sample_rate) if path else None
+        _bell_cache[key] = pcm or synthesize_bell(sample_rate)
+    return _bell_cache[key]
+
+
+class AplaySink:
+    """Streams PCM to ALSA as a WAV stream on aplay's stdin
+    
+    aplay only copies samples to the sound card, so this costs far less
+    than keeping an MP3 decoder running for the whole session.
+    """
+    
+    def __init__(self, sample_rate):
+        self.process = subprocess.Popen(
+            ['aplay', '-q', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self.process.stdin.write(wav_header(sample_rate))
+    
+    @staticmethod
+    def available():
+        return sys.platform.startswith('linux') and shutil.which('aplay') is not None
+    
+    def write(self, pcm):
+        """Queue samples; blocks while the sound card's buffer is full"""
+        self.process.stdin.write(pcm)
+    
+    def finish(self):
+        """Play out everything written so far, then release the device"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            self.close()
+    
+    def close(self):
+        """Stop playback immediately"""
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=AUDIO_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+
+class SoundDeviceSink:
+    """Plays PCM through PortAudio in process, when sounddevice is installed"""
+    
+    def __init__(self, sample_rate):
+        import sounddevice
+        self.stream = sounddevice.RawOutputStream(samplerate=sample_rate, channels=1, dtype='int16')
+        self.stream.start()
+    
+    def write(self, pcm):
+        self.stream.write(pcm)
+    
+    def finish(self):
+        self.stream.stop()
+        self.stream.close()
+    
+    def close(self):
+        self.stream.abort()
+        self.stream.close()
+
+
+def open_sink(sample_rate=NOISE_SAMPLE_RATE):
+    """Return the first PCM sink that works on this machine, or None"""
+    try:
+        return SoundDeviceSink(sample_rate)
+    except Exception:
+        pass
+    if AplaySink.available():
+        try:
+            return AplaySink(sample_rate)
+        except OSError:
+            pass
+    return None
+
+
+def play_pcm(pcm, sample_rate=NOISE_SAMPLE_RATE, sink_factory=None):
+    """Play a PCM buffer to the end; returns False if there is no sink"""
+    sink = (sink_factory or open_sink)(sample_rate)
+    if sink is None:
+        return False
+    try:
+        sink.write(pcm)
+    except OSError:
+        sink.close()
+        return False
+    sink.finish()
+    return True
+
+
+class NoiseEngine:
+    """Streams brown noise blocks to a PCM sink from a background thread
+    
+    The sink's blocking write paces generation, so only a couple of blocks
+    are ever buffered and the thread sleeps between them.
+    """
+    
+    def __init__(self, noise=None, sink_factory=None):
+        self.noise = noise or BrownNoise()
+        self.sink_factory = sink_factory or open_sink
+        self.sink = None
+        self.blocks_written = 0
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Open the sink and start streaming; returns False without a sink"""
+        self.sink = self.sink_factory(self.noise.sample_rate)
+        if self.sink is None:
+            return False
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='samaya-noise', daemon=True)
+        self._thread.start()
+        return True
+    
+    def stop(self):
+        """Stop streaming and release the sink"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        # Closing the sink also unblocks a write in progress
+        self.sink.close()
+        self._thread.join(AUDIO_TIMEOUT)
+        self._thread = None
+        self.sink = None
+    
+    def _run(self):
+        try:
+            for block in self.noise.blocks():
+                if self._stopped.is_set():
+                    return
+                self.sink.write(block)
+                self.blocks_written += 1
+        except (OSError, ValueError):
+            # The sink went away underneath us
+            pass
+
+
+class _Clip:
+    """PCM queued on a WarmOutput, and whether it reached the sink"""
+    
+    __slots__ = ('pcm', 'done', 'played')
+    
+    def __init__(self, pcm):
+        self.pcm = pcm
+        self.done = threading.Event()
+        self.played = False
+
+
+class NoiseVoice:
+    """Controls one noise source started on a WarmOutput
+    
+    Calls only take effect while this is still the output's current noise,
+    so a stale voice stopped late never silences the next session.
+    """
+    
+    __slots__ = ('output', 'noise')
+    
+    def __init__(self, output, noise):
+        self.output = output
+        self.noise = noise
+    
+    def pause(self):
+        return self.output._update(self.noise, paused=True)
+    
+    def resume(self):
+        return self.output._update(self.noise, paused=False)
+    
+    def stop(self):
+        return self.output._update(self.noise, stop=True)
+
+
+class WarmOutput:
+    """A PCM sink and feeder thread kept open across sessions and bells
+    
+    Starting, pausing or stopping noise only changes what the feeder
+    writes next, so none of them opens a device or spawns aplay. Queued
+    clips such as the bell are played ahead of the noise, which resumes
+    after them. Once nothing has been played for idle_timeout seconds the
+    sink is released; the next call opens a new one.
+    """
+    
+    def __init__(self, sample_rate=NOISE_SAMPLE_RATE, sink_factory=None,
+                 block_frames=NOISE_BLOCK_FRAMES, idle_timeout=AUDIO_WARM_IDLE_SECONDS):
+        self.sample_rate = sample_rate
+        self.sink_factory = sink_factory
+        self.block_bytes = block_frames * SAMPLE_WIDTH
+        self.idle_timeout = idle_timeout
+        self.sink = None
+        self.sinks_opened = 0
+        self.blocks_written = 0
+        self._noise = None
+        self._paused = False
+        self._clips = deque()
+        self._closing = False
+        self._thread = None
+        self._lock = threading.Condition()
+    
+    def start_noise(self, noise):
+        """Make noise the current source; returns its NoiseVoice, or None without a sink"""
+        with self._lock:
+            if not self._ensure_running():
+                return None
+            self._noise = noise
+            self._paused = False
+            self._lock.notify()
+        return NoiseVoice(self, noise)
+    
+    def play(self, pcm, timeout=None):
+        """Play a PCM buffer ahead of the noise and wait until it is written
+        
+        Returns False if there is no sink or it failed before the end.
+        """
+        clip = _Clip(pcm)
+        with self._lock:
+            if not self._ensure_running():
+                return False
+            self._clips.append(clip)
+            self._lock.notify()
+        return clip.done.wait(timeout) and clip.played
+    
+    def close(self):
+        """Stop everything and release the sink now"""
+        with self._lock:
+            thread, sink = self._thread, self.sink
+            self._closing = True
+            self._lock.notify()
+        if sink is not None:
+            # Also unblocks a write in progress
+            sink.close()
+        if thread is not None:
+            thread.join(AUDIO_TIMEOUT)
+        with self._lock:
+            self._closing = False
+    
+    def _update(self, noise, paused=None, stop=False):
+        with self._lock:
+            if self._noise is not noise:
+                return False
+            if stop:
+                self._noise = None
+            else:
+                self._paused = paused
+            self._lock.notify()
+        return True
+    
+    def _ensure_running(self):
+        """Open the sink and start the feeder unless they are up; holds the lock"""
+        if self._thread is not None:
+            return True
+        sink = (self.sink_factory or open_sink)(self.sample_rate)
+        if sink is None:
+            return False
+        self.sink = sink
+        self.sinks_opened += 1
+        self._thread = threading.Thread(target=self._run, args=(sink,), name='samaya-audio', daemon=True)
+        self._thread.start()
+        return True
+    
+    def _next(self):
+        """What to write next: (pcm, clip) or (None, noise); None to shut down"""
+        while not self._closing:
+            if self._clips:
+                clip = self._clips[0]
+                block, clip.pcm = clip.pcm[:self.block_bytes], clip.pcm[self.block_bytes:]
+                if not clip.pcm:
+                    self._clips.popleft()
+                    return block, clip
+                return block, None
+            if self._noise is not None and not self._paused:
+                return None, self._noise
+            # Idle: the sink underruns harmlessly until there is work again
+            if not self._lock.wait(self.idle_timeout) and not self._clips and self._noise is None:
+                return None
+        return None
+    
+    def _run(self, sink):
+        try:
+            while True:
+                with self._lock:
+                    work = self._next()
+                    if work is None:
+                        self._thread = None
+                        self.sink = None
+                        break
+                block, source = work
+                if block is None:
+                    # Generated outside the lock so control calls never wait on it
+                    block = source.block()
+                    source = None
+                sink.write(block)
+                self.blocks_written += 1
+                if source is not None:
+                    source.played = True
+                    source.done.set()
+        except (OSError, ValueError):
+            # The sink went away underneath us
+            with self._lock:
+                self._thread = None
+                self.sink = None
+                clips, self._clips = self._clips, deque()
+            for clip in clips:
+                clip.done.set()
+        sink.close()
+
+
+_warm_output = None
+_warm_output_lock = threading.Lock()
+
+
+def warm_output():
+    """The process-wide WarmOutput shared by every AudioPlayer"""
+    global _warm_output
+    with _warm_output_lock:
+        if _warm_output is None:
+            _warm_output = WarmOutput()
+        return _warm_output
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import json
+import struct
+
+
+# Every message is a JSON object preceded by its length as a 4 byte
+# big-endian unsigned integer.
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed or oversized frame"""
+
+
+def encode(message):
+    """Frame a message for the wire"""
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Message too large: {len(payload)} bytes")
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode(payload):
+    """Parse a frame payload into a message dict"""
+    try:
+        message = json.loads(payload.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ProtocolError(f"Invalid message: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("Messages must be JSON objects")
+    return message
+
+
+def _check_length(length):
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame too large: {length} bytes")
+    return length
+
+
+async def read_message(reader):
+    """Read one message from an asyncio stream, or None at end of stream"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        payload = await reader.readexactly(_check_length(length))
+    except EOFError:
+        return None
+    return decode(payload)
+
+
+def send_message(sock, message):
+    """Write one message to a blocking socket"""
+    sock.sendall(encode(message))
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    """Read one message from a blocking socket, or None if the peer closed it"""
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    payload = _recv_exactly(sock, _check_length(length))
+    if payload is None:
+        return None
+    return decode(payload)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import struct
+from datetime import datetime, timedelta
+from .constants import SESSION_TYPES
+from .rollups import empty_rollups
+
+
+# File header: magic, format version and record size
+HEADER = struct.Struct('<4sHH8x')
+MAGIC = b'SMYB'
+VERSION = 1
+
+# One fixed-width record: start time in epoch seconds, duration in seconds,
+# index into SESSION_TYPES, flags, and how many sessions the record stands
+# for (1 for a single session, more for an aggregate)
+RECORD = struct.Struct('<qIBBH')
+EPOCH = struct.Struct('<q')
+
+FLAG_COMPLETED = 1
+FLAG_AGGREGATE = 2
+MAX_COUNT = 0xFFFF
+
+# Records scanned per memoryview slice
+SCAN_CHUNK = 4096
+
+
+def type_index(session_type):
+    """Small enum value for a session type; unknown types count as custom"""
+    if session_type in SESSION_TYPES:
+        return SESSION_TYPES.index(session_type)
+    return SESSION_TYPES.index('custom')
+
+
+def to_epoch(timestamp):
+    """Epoch seconds for a local ISO timestamp"""
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+
+def encode_duration(minutes):
+    return int(round(minutes * 60))
+
+
+def decode_duration(seconds):
+    """Minutes for a stored duration, as an int when whole"""
+    if seconds % 60 == 0:
+        return seconds // 60
+    return round(seconds / 60, 2)
+
+
+def pack_record(record, count=1, aggregate=False):
+    """Pack a session record dict into its fixed-width form"""
+    flags = FLAG_COMPLETED if record['completed'] else 0
+    if aggregate:
+        flags |= FLAG_AGGREGATE
+    return RECORD.pack(to_epoch(record['timestamp']), encode_duration(record['duration']),
+                       type_index(record['type']), flags, count)
+
+
+def unpack_fields(fields):
+    """(timestamp, type, duration, completed) for unpacked record fields"""
+    epoch, seconds, type_number, flags, _ = fields
+    return (
+        datetime.fromtimestamp(epoch).isoformat(),
+        SESSION_TYPES[type_number] if type_number < len(SESSION_TYPES) else 'custom',
+        decode_duration(seconds),
+        bool(flags & FLAG_COMPLETED)
+    )
+
+
+def unpack_record(fields):
+    """Session record dict for unpacked record fields"""
+    timestamp, session_type, duration, completed = unpack_fields(fields)
+    return {
+        'timestamp': timestamp,
+        'type': session_type,
+        'duration': duration,
+        'completed': completed
+    }
+
+
+def period_bounds(epoch, by):
+    """Return the key of the period holding epoch and its start and end epochs
+    
+    Keys match storage.period_key: 'HH' for hours, the date for days, the
+    Monday for weeks and 'YYYY-MM' for months.
+    """
+    moment = datetime.fromtimestamp(epoch)
+    if by == 'hour':
+        start = moment.replace(minute=0, second=0, microsecond=0)
+        return f"{start.hour:02d}", start.timestamp(), (start + timedelta(hours=1)).timestamp()
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if by == 'day':
+        return day.date().isoformat(), day.timestamp(), (day + timedelta(days=1)).timestamp()
+    if by == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start.date().isoformat(), start.timestamp(), (start + timedelta(days=7)).timestamp()
+    if by == 'month':
+        start = day.replace(day=1)
+        return start.strftime('%Y-%m'), start.timestamp(), (start + timedelta(days=32)).replace(day=1).timestamp()
+    raise ValueError(f"Unknown period: {by}")
+
+
+class RecordFile:
+    """Read-only memory map over a packed record file
+    
+    Records are appended in time order, so time bounds are found by binary
+    search and a scan touches only the records inside them. Scans unpack
+    straight out of the mapping with struct.iter_unpack; nothing is read
+    into Python objects beyond the tuple being looked at. A torn record at
+    the end of the file is ignored.
+    """
+    
+    def __init__(self, path):
+        self._map = None
+        self.count = 0
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < HEADER.size:
+                    return
+                self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except OSError:
+            return
+        magic, version, record_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a samaya record file")
+        self.count = (size - HEADER.size) // RECORD.size
+    
+    def __len__(self):
+        return self.count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self.count = 0
+    
+    def epoch_at(self, index):
+        return EPOCH.unpack_from(self._map, HEADER.size + index * RECORD.size)[0]
+    
+    def bisect(self, epoch):
+        """Index of the first record starting at or after epoch"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.epoch_at(middle) < epoch:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def scan(self, since=None, until=None, start=None):
+        """Yield raw record tuples with since <= epoch < until
+        
+        start, if given, is the index to begin at instead of since.
+        """
+        if self._map is None:
+            return
+        if start is None:
+            start = self.bisect(since) if since is not None else 0
+        stop = self.bisect(until) if until is not None else self.count
+        view = memoryview(self._map)
+        try:
+            for first in range(start, stop, SCAN_CHUNK):
+                last = min(first + SCAN_CHUNK, stop)
+                chunk = view[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]
+                records = RECORD.iter_unpack(chunk)
+                try:
+                    yield from records
+                finally:
+                    del records
+                    chunk.release()
+        finally:
+            view.release()
+
+
+def summarize(records):
+    """Lifetime counters over raw record tuples"""
+    counts = [0] * len(SESSION_TYPES)
+    seconds = 0
+    for _, duration, type_number, flags, count in records:
+        counts[type_number] += count
+        if flags & FLAG_COMPLETED:
+            seconds += duration
+    return {
+        'total_sessions': sum(counts),
+        'total_minutes': decode_duration(seconds),
+        'sessions_by_type': dict(zip(SESSION_TYPES, counts))
+    }
+
+
+def aggregate(records, by=None, session_type=None):
+    """Per-period rows of sessions, completed and minutes over raw record tuples
+    
+    Period keys are computed once per period rather than once per record.
+    """
+    wanted = type_index(session_type) if session_type is not None else None
+    rows = {}
+    key, start, end = None, None, None
+    for epoch, duration, type_number, flags, count in records:
+        if wanted is not None and type_number != wanted:
+            continue
+        if by is not None and (start is None or not start <= epoch < end):
+            key, start, end = period_bounds(epoch, by)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = [0, 0, 0]
+        row[0] += count
+        if flags & FLAG_COMPLETED:
+            row[1] += count
+            row[2] += duration
+    return [
+        {'period': k, 'sessions': row[0], 'completed': row[1], 'minutes': decode_duration(row[2])}
+        for k, row in sorted(rows.items(), key=lambda item: (item[0] is not None, item[0]))
+    ]
+
+
+def rollups(records):
+    """Daily and weekday x hour rollups (see rollups.py) over raw record tuples
+    
+    Aggregate records carry no time of day, so they count towards the
+    daily buckets but not the weekday x hour grid.
+    """
+    result = empty_rollups()
+    hours = result['hours']
+    days = {}
+    bucket, weekday, hour, start, end = None, 0, 0, None, None
+    for epoch, duration, _, flags, count in records:
+        if start is None or not start <= epoch < end:
+            moment = datetime.fromtimestamp(epoch).replace(minute=0, second=0, microsecond=0)
+            start, end = moment.timestamp(), (moment + timedelta(hours=1)).timestamp()
+            weekday, hour = moment.weekday(), moment.hour
+            bucket = days.setdefault(moment.date().isoformat(), [0, 0, 0])
+        bucket[0] += count
+        if flags & FLAG_COMPLETED:
+            bucket[1] += count
+            bucket[2] += duration
+            if not flags & FLAG_AGGREGATE:
+                hours[weekday][hour] += count
+    result['days'] = {
+        day: [sessions, completed, decode_duration(seconds)]
+        for day, (sessions, completed, seconds) in sorted(days.items())
+    }
+    return result
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import os
+import shutil
+import signal
+import sys
+import threading
+from .constants import DISPLAY_ENV, DISPLAY_MODES, DEFAULT_DISPLAY, DISPLAY_LOG_INTERVAL
+
+
+def format_mmss(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class Renderer:
+    """Shows the countdown of a session; this base class shows nothing
+    
+    The timer calls begin() before the countdown starts, tick() with the
+    whole seconds left whenever they change, update() with the countdown
+    after a pause, resume or extension (or change() with its state, length
+    and remaining time), and end() once it is over.
+    Subclasses write each change with a single write and flush.
+    """
+    
+    mode = 'quiet'
+    
+    def __init__(self, stream=None):
+        # None follows sys.stdout, so redirect_stdout keeps working
+        self._stream = stream
+        self.session_type = None
+        self.total = 0
+        self.seconds_left = 0
+        self.state = 'pending'
+        self.writes = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def stream(self):
+        return self._stream if self._stream is not None else sys.stdout
+    
+    def begin(self, session_type, total_seconds):
+        self.session_type = session_type
+        self.total = total_seconds
+        self.seconds_left = math.ceil(total_seconds)
+        self.state = 'running'
+    
+    def tick(self, seconds_left):
+        with self._lock:
+            self.seconds_left = seconds_left
+            self._tick()
+    
+    def update(self, countdown):
+        self.change(countdown.state, countdown.duration, countdown.remaining())
+    
+    def change(self, state, total_seconds, remaining):
+        """Show a new state or length; ignores the states that end a session"""
+        with self._lock:
+            previous = (self.state, self.total)
+            if state in ('running', 'paused'):
+                self.state = state
+            self.total = total_seconds
+            self.seconds_left = math.ceil(remaining)
+            if (self.state, self.total) != previous:
+                self._update(*previous)
+    
+    def end(self):
+        pass
+    
+    def _tick(self):
+        pass
+    
+    def _update(self, state, total):
+        pass
+    
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+        self.writes += 1
+
+
+class LineRenderer(Renderer):
+    """Redraws `Time remaining: MM:SS` in place, writing only the characters that changed"""
+    
+    mode = 'line'
+    
+    def begin(self, session_type, total_seconds):
+        super().begin(session_type, total_seconds)
+        self._line = None
+    
+    def _tick(self):
+        self._draw()
+    
+    def _update(self, state, total):
+        self._draw()
+    
+    def _draw(self):
+        line = f"Time remaining: {format_mmss(self.seconds_left)}"
+        if self.state == 'paused':
+            line += " (paused)"
+        old = self._line
+        self._line = line
+        if old is None:
+            self._write("\r" + line)
+            return
+        if line == old:
+            return
+        common = 0
+        while common < min(len(old), len(line)) and old[common] == line[common]:
+            common += 1
+        # Back up over the changed tail, rewrite it and clear what is left of a longer line
+        text = "\b" * (len(old) - common) + line[common:]
+        if len(line) < len(old):
+            text += "\033[K"
+        self._write(text)
+
+
+class LogRenderer(Renderer):
+    """Plain lines for logs and pipes: the remaining time every interval seconds and control changes"""
+    
+    mode = 'log'
+    LABELS = {'tick': "Time remaining", 'extend': "Extended", 'pause': "Paused", 'resume': "Resumed"}
+    
+    def __init__(self, stream=None, interval=DISPLAY_LOG_INTERVAL):
+        super().__init__(stream)
+        self.interval = interval
+    
+    def begin(self, session_type, total_seconds):
+        super().begin(session_type, total_seconds)
+        self._first = True
+    
+    def _tick(self):
+        if self._first or self.seconds_left % self.interval == 0:
+            self._first = False
+            self._write(self._format('tick'))
+    
+    def _update(self, state, total):
+        if self.total != total:
+            self._write(self._format('extend'))
+        if self.state != state:
+            self._write(self._format('pause' if self.state == 'paused' else 'resume'))
+    
+    def _format(self, event):
+        return f"{self.LABELS[event]}: {format_mmss(self.seconds_left)}\n"
+
+
+class JsonRenderer(LogRenderer):
+    """The log cadence as JSON lines, for other programs"""
+    
+    mode = 'json'
+    
+    def _format(self, event):
+        return json.dumps({
+            'event': event,
+            'type': self.session_type,
+            'state': self.state,
+            'remaining': self.seconds_left,
+            'duration': self.total
+        }) + "\n"
+
+
+# Big digits, five rows tall; every cell is drawn two columns wide
+GLYPHS = {
+    '0': ("###", "# #", "# #", "# #", "###"),
+    '1': ("  #", "  #", "  #", "  #", "  #"),
+    '2': ("###", "  #", "###", "#  ", "###"),
+    '3': ("###", "  #", "###", "  #", "###"),
+    '4': ("# #", "# #", "###", "  #", "  #"),
+    '5': ("###", "#  ", "###", "  #", "###"),
+    '6': ("###", "#  ", "###", "# #", "###"),
+    '7': ("###", "  #", "  #", "  #", "  #"),
+    '8': ("###", "# #", "###", "# #", "###"),
+    '9': ("###", "# #", "###", "  #", "###"),
+    ':': (" ", "#", " ", "#", " "),
+}
+
+ENTER_SCREEN = "\033[?1049h\033[?25l"
+LEAVE_SCREEN = "\033[?25h\033[?1049l"
+CLEAR_SCREEN = "\033[H\033[2J"
+# Unchanged cells between two changes are rewritten when that is shorter than moving the cursor
+MAX_GAP = 6
+
+
+def big_digits(text):
+    rows = []
+    for row in range(5):
+        cells = "  ".join(GLYPHS[char][row] for char in text)
+        rows.append(cells.replace('#', '██').replace(' ', '  '))
+    return rows
+
+
+class FullScreenRenderer(Renderer):
+    """Big digits and a progress bar on the alternate screen
+    
+    Keeps the last frame and repaints only the cells that changed, so
+    most seconds cost a few bytes in one write. A resize redraws it all.
+    """
+    
+    mode = 'full'
+    
+    def __init__(self, stream=None, size=None):
+        super().__init__(stream)
+        # A fixed (columns, lines) skips asking the terminal
+        self._fixed_size = size
+        self._rows = None
+        self._previous_handler = None
+    
+    def begin(self, session_type, total_seconds):
+        super().begin(session_type, total_seconds)
+        self._rows = None
+        self._size = self._terminal_size()
+        try:
+            self._previous_handler = signal.signal(signal.SIGWINCH, self._resized)
+        except (AttributeError, ValueError):
+            # No SIGWINCH on this platform, or not the main thread
+            self._previous_handler = None
+    
+    def end(self):
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGWINCH, self._previous_handler)
+            self._previous_handler = None
+        if self._rows is not None:
+            self._rows = None
+            self._write(LEAVE_SCREEN)
+    
+    def _resized(self, signum, frame):
+        self._size = None
+    
+    def _terminal_size(self):
+        if self._fixed_size is not None:
+            return self._fixed_size
+        return tuple(shutil.get_terminal_size())
+    
+    def _tick(self):
+        self._draw()
+    
+    def _update(self, state, total):
+        self._draw()
+    
+    def frame(self, columns, lines):
+        """The screen as lines rows of exactly columns characters"""
+        elapsed = max(0, self.total - self.seconds_left)
+        fraction = min(1, elapsed / self.total) if self.total else 1
+        width = max(10, min(columns - 8, 60))
+        filled = int(width * fraction)
+        bar = "█" * filled + "░" * (width - filled) + f" {int(fraction * 100):3d}%"
+        title = f"{(self.session_type or 'custom').capitalize()} session"
+        status = "paused" if self.state == 'paused' else ""
+        
+        content = [title, ""] + big_digits(format_mmss(self.seconds_left)) + ["", bar, status]
+        top = max(0, (lines - len(content)) // 2)
+        rows = [""] * top + content
+        rows += [""] * (lines - len(rows))
+        return [row.center(columns)[:columns].ljust(columns) for row in rows[:lines]]
+    
+    def _draw(self):
+        if self._size is None:
+            self._size = self._terminal_size()
+            if self._rows:
+                # Repaint everything at the new size
+                self._rows = []
+        columns, lines = self._size
+        rows = self.frame(columns, lines)
+        
+        if not self._rows:
+            prefix = ENTER_SCREEN if self._rows is None else ""
+            text = prefix + CLEAR_SCREEN + "\r\n".join(row.rstrip() for row in rows)
+        else:
+            text = "".join(self._diff(number, old, new)
+                           for number, (old, new) in enumerate(zip(self._rows, rows)) if old != new)
+        self._rows = rows
+        if text:
+            self._write(text)
+    
+    @staticmethod
+    def _diff(number, old, new):
+        """Cursor moves and text turning row old into new"""
+        changed = [column for column, (was, now) in enumerate(zip(old, new)) if was != now]
+        runs = []
+        start = end = changed[0]
+        for column in changed[1:]:
+            if column - end > MAX_GAP:
+                runs.append((start, end))
+                start = column
+            end = column
+        runs.append((start, end))
+        return "".join(f"\033[{number + 1};{start + 1}H{new[start:end + 1]}" for start, end in runs)
+
+
+RENDERERS = {
+    'line': LineRenderer,
+    'full': FullScreenRenderer,
+    'log': LogRenderer,
+    'json': JsonRenderer,
+    'quiet': Renderer,
+}
+
+
+def make_renderer(mode=None, stream=None):
+    """Renderer for a display mode (default: SAMAYA_DISPLAY, or auto)
+    
+    auto redraws a line when the output is a terminal and writes log lines
+    when it is a file or a pipe.
+    """
+    mode = mode or os.environ.get(DISPLAY_ENV) or DEFAULT_DISPLAY
+    if mode not in DISPLAY_MODES:
+        raise ValueError(f"Unknown display mode: {mode} (choose from {', '.join(DISPLAY_MODES)})")
+    if mode == 'auto':
+        output = stream if stream is not None else sys.stdout
+        try:
+            mode = 'line' if output.isatty() else 'log'
+        except (AttributeError, ValueError):
+            mode = 'log'
+    return RENDERERS[mode](stream)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+from datetime import date, timedelta
+
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def empty_rollups():
+    """Return empty rollup buckets
+    
+    'days' maps a local date to [sessions, completed, minutes] and 'hours' is
+    a weekday x hour grid counting completed sessions by start time. Stores
+    with bounded retention fold old days into 'months' ('YYYY-MM' to the same
+    triple) and keep the streak state of the folded days in 'streak'.
+    """
+    return {
+        'days': {},
+        'months': {},
+        'hours': [[0] * 24 for _ in WEEKDAYS],
+        'streak': None
+    }
+
+
+def apply_rollup(rollups, record):
+    """Fold a single session record into the rollup buckets"""
+    timestamp = record['timestamp']
+    bucket = rollups['days'].setdefault(timestamp[:10], [0, 0, 0])
+    bucket[0] += 1
+    if record['completed']:
+        bucket[1] += 1
+        bucket[2] += record['duration']
+        weekday = parse_day(timestamp).weekday()
+        rollups['hours'][weekday][int(timestamp[11:13])] += 1
+
+
+def parse_day(value):
+    """Parse the date part of a local ISO timestamp"""
+    return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+
+
+def period_start(day, by):
+    """Return the first day of the day/week/month period containing day"""
+    if by == 'day':
+        return day
+    if by == 'week':
+        return day - timedelta(days=day.weekday())
+    if by == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {by}")
+
+
+def previous_period(start, by):
+    """Return the start of the period before the one starting at start"""
+    if by == 'day':
+        return start - timedelta(days=1)
+    if by == 'week':
+        return start - timedelta(days=7)
+    return (start - timedelta(days=1)).replace(day=1)
+
+
+def fold_days(rollups, before):
+    """Move daily buckets older than the date before into monthly buckets
+    
+    Returns the number of days folded. The run of active days ending at
+    the last folded day is kept in rollups['streak'] so streaks that
+    started before the cutoff still count in full.
+    """
+    cutoff = before.isoformat()
+    folded = sorted(day for day in rollups['days'] if day < cutoff)
+    if not folded:
+        return 0
+    
+    streak = rollups.get('streak') or {'day': None, 'run': 0, 'longest': 0}
+    previous = parse_day(streak['day']) if streak['day'] else None
+    run, longest = streak['run'], streak['longest']
+    months = rollups.setdefault('months', {})
+    for key in folded:
+        sessions, completed, minutes = rollups['days'].pop(key)
+        bucket = months.setdefault(key[:7], [0, 0, 0])
+        bucket[0] += sessions
+        bucket[1] += completed
+        bucket[2] += minutes
+        if completed:
+            day = parse_day(key)
+            run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+    
+    rollups['streak'] = {'day': previous.isoformat() if previous else None, 'run': run, 'longest': longest}
+    return len(folded)
+
+
+def group_days(days, by, count, today=None, months=None):
+    """Sum daily buckets into the last count periods, oldest first
+    
+    Periods without sessions are included so the rows form a continuous
+    histogram. Each row has the period start, sessions, completed sessions
+    and completed minutes. Monthly buckets, if given, count towards
+    monthly rows only.
+    """
+    today = today or date.today()
+    starts = [period_start(today, by)]
+    while len(starts) < count:
+        starts.append(previous_period(starts[-1], by))
+    starts.reverse()
+    
+    rows = {start: {'period': start.isoformat(), 'sessions': 0, 'completed': 0, 'minutes': 0}
+            for start in starts}
+    for key, (sessions, completed, minutes) in days.items():
+        start = period_start(parse_day(key), by)
+        row = rows.get(start)
+        if row is not None:
+            row['sessions'] += sessions
+            row['completed'] += completed
+            row['minutes'] += minutes
+    if by == 'month':
+        for key, (sessions, completed, minutes) in (months or {}).items():
+            row = rows.get(parse_day(key + '-01'))
+            if row is not None:
+                row['sessions'] += sessions
+                row['completed'] += completed
+                row['minutes'] += minutes
+    return [rows[start] for start in starts]
+
+
+def find_streaks(days, today=None, streak=None):
+    """Return the current and longest runs of consecutive days with a completed session
+    
+    The current streak is still alive if the last active day is today or
+    yesterday. streak is the state left by fold_days, if any.
+    """
+    active = sorted(parse_day(key) for key, bucket in days.items() if bucket[1] > 0)
+    longest = run = 0
+    previous = None
+    if streak and streak['day']:
+        previous, run, longest = parse_day(streak['day']), streak['run'], streak['longest']
+    for day in active:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    
+    today = today or date.today()
+    current = run if previous is not None and (today - previous).days <= 1 else 0
+    return {'current': current, 'longest': longest}
+
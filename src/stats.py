@@ -1,105 +1,275 @@
 #!/usr/bin/env python3
 
 import json
+import os
+import re
+import sqlite3
 from datetime import datetime
 from pathlib import Path
-from .constants import STATS_DIR_NAME, STATS_FILE_NAME, MAX_STORED_SESSIONS, STATS_EMOJI
+from .constants import (
+    STATS_DIR_NAME, STATS_FILE_NAME, JOURNAL_FILE_NAME, DEFAULT_STATS_BACKEND,
+    STATS_BACKEND_ENV, STATS_EMOJI, REPORT_PERIODS, REPORT_BAR_WIDTH, HISTORY_BATCH_SIZE,
+    STATS_DIR_ENV, PROFILE_ENV, PROFILES_DIR_NAME
+)
+from .storage import open_backend, to_timestamp, empty_stats
+from .rollups import WEEKDAYS, group_days, find_streaks
+from .summarycache import SummaryCache
+from .metrics import metrics
+
+
+PROFILE_NAME = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_.-]*')
+
+
+def base_stats_dir():
+    """The stats directory: SAMAYA_STATS_DIR, or ~/.samaya"""
+    if os.environ.get(STATS_DIR_ENV):
+        return Path(os.environ[STATS_DIR_ENV]).expanduser()
+    return Path.home() / STATS_DIR_NAME
+
+
+def profile_stats_dir(profile=None):
+    """Stats directory of a named profile (default: SAMAYA_PROFILE), or the base one"""
+    profile = profile or os.environ.get(PROFILE_ENV)
+    if not profile:
+        return base_stats_dir()
+    if not PROFILE_NAME.fullmatch(profile):
+        raise ValueError(f"Invalid profile name: {profile!r} (use letters, digits, '_', '-' and '.')")
+    return base_stats_dir() / PROFILES_DIR_NAME / profile
+
+
+def list_profiles():
+    """Names of the profiles that have a stats directory"""
+    try:
+        entries = os.scandir(base_stats_dir() / PROFILES_DIR_NAME)
+    except OSError:
+        return []
+    with entries:
+        return sorted(entry.name for entry in entries if entry.is_dir() and PROFILE_NAME.fullmatch(entry.name))
 
 
 class SessionStats:
     """Handle session statistics and tracking"""
     
-    def __init__(self):
-        self.stats_dir = Path.home() / STATS_DIR_NAME
+    def __init__(self, stats_dir=None, backend=None, profile=None):
+        self.stats_dir = Path(stats_dir) if stats_dir else profile_stats_dir(profile)
         self.stats_file = self.stats_dir / STATS_FILE_NAME
-        self._ensure_stats_dir()
+        self.backend_name = backend or os.environ.get(STATS_BACKEND_ENV) or DEFAULT_STATS_BACKEND
+        self._backend = None
+        self._cache = None
+    
+    @property
+    def backend(self):
+        """Storage backend for the current stats directory"""
+        if self._backend is None or self._backend.stats_dir != self.stats_dir:
+            if self._backend is not None:
+                self._backend.close()
+            kwargs = {'stats_file': self.stats_file} if self.backend_name == 'json' else {}
+            self._backend = open_backend(self.backend_name, self.stats_dir, **kwargs)
+        return self._backend
+    
+    def close(self):
+        """Release the storage backend, if one was opened"""
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+    
+    def __enter__(self):
+        return self
     
-    def _ensure_stats_dir(self):
-        """Create stats directory if it doesn't exist"""
-        self.stats_dir.mkdir(exist_ok=True)
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @property
+    def cache(self):
+        """Summary cache for the current backend"""
+        backend = self.backend
+        if self._cache is None or self._cache.backend is not backend:
+            self._cache = SummaryCache(backend)
+        return self._cache
+    
+    @property
+    def journal_file(self):
+        """Append-only journal holding sessions logged since the last compaction"""
+        return self.stats_dir / JOURNAL_FILE_NAME
     
     def _load_stats(self):
         """Load existing stats or create new ones"""
-        if self.stats_file.exists():
-            try:
-                with open(self.stats_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                # If file is corrupted, start fresh
-                pass
-        
-        return {
-            'total_sessions': 0,
-            'sessions_by_type': {
-                'short': 0,
-                'medium': 0, 
-                'long': 0,
-                'custom': 0
-            },
-            'total_minutes': 0,
-            'sessions': []
-        }
+        return self.backend.load()
     
-    def _save_stats(self, stats):
-        """Save stats to file"""
-        try:
-            with open(self.stats_file, 'w') as f:
-                json.dump(stats, f, indent=2)
-        except IOError:
-            # Silently fail if we can't write stats
-            pass
+    def compact(self):
+        """Fold pending writes into the backend's compact form"""
+        return self.backend.compact()
     
-    def log_session(self, session_type, duration_minutes, completed=True):
-        """Log a completed session"""
-        stats = self._load_stats()
-        
-        # Update counters
-        stats['total_sessions'] += 1
-        if session_type in stats['sessions_by_type']:
-            stats['sessions_by_type'][session_type] += 1
-        else:
-            stats['sessions_by_type']['custom'] += 1
-        
-        if completed:
-            stats['total_minutes'] += duration_minutes
-        
-        # Log individual session
-        session_record = {
+    @staticmethod
+    def make_record(session_type, duration_minutes, completed=True):
+        """Session record for a session ending now"""
+        return {
             'timestamp': datetime.now().isoformat(),
             'type': session_type,
             'duration': duration_minutes,
             'completed': completed
         }
-        stats['sessions'].append(session_record)
+    
+    def log_session(self, session_type, duration_minutes, completed=True):
+        """Log a completed session; returns its record"""
+        record = self.make_record(session_type, duration_minutes, completed)
+        self.log_sessions([record])
+        return record
+    
+    def log_sessions(self, records):
+        """Log several session records from make_record() in one write"""
+        try:
+            with metrics.span('stats_write'):
+                self.backend.append_many(records)
+        except (IOError, OSError, sqlite3.Error):
+            # Silently fail if we can't write stats
+            metrics.count('samaya_stats_write_failures')
+        self.cache.invalidate()
+        if metrics.enabled:
+            for record in records:
+                metrics.count('samaya_sessions', type=record['type'], completed=str(bool(record['completed'])).lower())
+    
+    def query_sessions(self, since=None, until=None, session_type=None, completed=None):
+        """Return stored sessions in [since, until), optionally filtered by type and outcome"""
+        return list(self.backend.query(to_timestamp(since), to_timestamp(until), session_type, completed))
+    
+    def iter_sessions(self, since=None, until=None, session_type=None, completed=None):
+        """Yield stored sessions in [since, until) as SessionRecord tuples, oldest first
         
-        # Keep only last MAX_STORED_SESSIONS to avoid file bloat
-        if len(stats['sessions']) > MAX_STORED_SESSIONS:
-            stats['sessions'] = stats['sessions'][-MAX_STORED_SESSIONS:]
+        The filters are handed to the backend, which reads matching sessions
+        one at a time (SQL for SQLite, a bisected memory map for the binary
+        store), so memory stays flat however long the history is. since
+        and until may be datetimes, dates or ISO strings.
+        """
+        return self.backend.iter_records(to_timestamp(since), to_timestamp(until), session_type, completed)
+    
+    def aggregate(self, by=None, since=None, until=None, session_type=None):
+        """Group sessions in [since, until) by 'hour', 'day', 'week' or 'month'
         
-        self._save_stats(stats)
+        Each row has the period key, the number of sessions, how many were
+        completed and the completed minutes.
+        """
+        return self.backend.aggregate(by, to_timestamp(since), to_timestamp(until), session_type)
+    
+    def get_range_summary(self, since=None, until=None, session_type=None):
+        """Summarize sessions in [since, until), including the completion rate"""
+        rows = self.aggregate(None, since, until, session_type)
+        row = rows[0] if rows else {'sessions': 0, 'completed': 0, 'minutes': 0}
+        return {
+            'sessions': row['sessions'],
+            'completed': row['completed'],
+            'minutes': row['minutes'],
+            'completion_rate': round(row['completed'] / row['sessions'], 3) if row['sessions'] else 0.0
+        }
     
     def get_summary(self):
         """Get session summary statistics"""
-        stats = self._load_stats()
+        return self._summary(self.cache.get())
+    
+    def _summary(self, entry):
+        stats = entry['summary']
         return {
             'total_sessions': stats['total_sessions'],
             'total_minutes': stats['total_minutes'],
-            'sessions_by_type': stats['sessions_by_type'],
+            'sessions_by_type': dict(stats['sessions_by_type']),
             'total_hours': round(stats['total_minutes'] / 60, 1)
         }
     
+    def get_report(self, by='day', periods=None):
+        """Get per-period totals for the most recent periods from the rollups"""
+        periods = periods or REPORT_PERIODS[by]
+        rollups = self.cache.get()['rollups']
+        return group_days(rollups['days'], by, periods, months=rollups.get('months'))
+    
+    def get_streaks(self):
+        """Get the current and longest streaks of days with a completed session"""
+        rollups = self.cache.get()['rollups']
+        return find_streaks(rollups['days'], streak=rollups.get('streak'))
+    
+    def get_heatmap(self):
+        """Get completed sessions by weekday (Monday first) and starting hour"""
+        return [list(hours) for hours in self.cache.get()['rollups']['hours']]
+    
+    def export_json(self, path):
+        """Write every stored session and the lifetime counters in the stats.json format"""
+        stats = self.backend.export_stats()
+        with open(path, 'w') as f:
+            json.dump(stats, f, indent=2)
+        return len(stats['sessions'])
+    
+    def import_json(self, path):
+        """Add the sessions of a file in the stats.json format; returns how many"""
+        with open(path, 'r') as f:
+            stats = json.load(f)
+        if not isinstance(stats, dict) or not isinstance(stats.get('sessions'), list):
+            raise ValueError(f"{path} is not a samaya stats file")
+        stats = dict(empty_stats(), **stats)
+        self.backend.import_stats(stats)
+        self.cache.invalidate()
+        return len(stats['sessions'])
+    
+    def export_history(self, path):
+        """Stream every stored session to a JSONL or CSV file ('-' for stdout); returns how many"""
+        from .history import history_format, open_history, write_history
+        fmt = history_format(path)
+        with open_history(path, 'w') as f:
+            return write_history(self.backend.query(), f, fmt)
+    
+    def import_history(self, paths):
+        """Add the sessions of JSONL or CSV history files that are not stored yet
+        
+        Incoming sessions are matched against the stored ones by content
+        hash in a streaming sort-merge, so memory stays bounded however
+        long the histories are. A store that only keeps totals for old days
+        cannot match sessions on them, so those are skipped when their day
+        (or month) is already counted. Nothing is written unless every file
+        parses. Returns how many sessions were added, how many were
+        duplicates and how many were skipped.
+        """
+        from .history import new_sessions, read_history_file
+        cutoff, buckets = self.backend.totals_only()
+        seen = skipped = 0
+        
+        def incoming():
+            nonlocal seen, skipped
+            for path in paths:
+                for record in read_history_file(path):
+                    seen += 1
+                    timestamp = record['timestamp']
+                    if cutoff is not None and timestamp < cutoff and (timestamp[:10] in buckets or timestamp[:7] in buckets):
+                        skipped += 1
+                        continue
+                    yield record
+        
+        added = 0
+        batch = []
+        try:
+            for record in new_sessions(self.backend.query(), incoming()):
+                batch.append(record)
+                if len(batch) >= HISTORY_BATCH_SIZE:
+                    self.backend.import_records(batch)
+                    added += len(batch)
+                    batch = []
+            self.backend.import_records(batch)
+            added += len(batch)
+        finally:
+            self.cache.invalidate()
+        return added, seen - added - skipped, skipped
+    
     def clear_stats(self):
         """Clear all session statistics"""
         try:
-            if self.stats_file.exists():
-                self.stats_file.unlink()
+            self.backend.clear()
+            self.cache.invalidate()
             print("✅ All session statistics have been cleared.")
         except OSError:
             print("❌ Failed to clear statistics file.")
     
     def display_stats(self):
         """Display formatted session statistics"""
-        summary = self.get_summary()
+        # One cache lookup serves both the totals and the streaks
+        entry = self.cache.get()
+        summary = self._summary(entry)
         
         print(f"\n{STATS_EMOJI} Session Statistics")
         print("=" * 25)
@@ -110,4 +280,36 @@ class SessionStats:
         for session_type, count in summary['sessions_by_type'].items():
             if count > 0:
                 print(f"  {session_type.capitalize()}: {count}")
+        print()
+        streaks = find_streaks(entry['rollups']['days'], streak=entry['rollups'].get('streak'))
+        print(f"Current Streak: {streaks['current']} days (longest: {streaks['longest']} days)")
+        print()
+    
+    def display_report(self, by='day'):
+        """Display a histogram of completed minutes per day, week or month"""
+        rows = self.get_report(by)
+        peak = max(row['minutes'] for row in rows) or 1
+        
+        print(f"\n{STATS_EMOJI} Focus Time by {by.capitalize()}")
+        print("=" * 25)
+        for row in rows:
+            bar = "█" * round(row['minutes'] / peak * REPORT_BAR_WIDTH)
+            print(f"{row['period']}  {bar:<{REPORT_BAR_WIDTH}} {row['minutes']:>5} min ({row['completed']}/{row['sessions']})")
+        print()
+        streaks = self.get_streaks()
+        print(f"Current Streak: {streaks['current']} days (longest: {streaks['longest']} days)")
+        print()
+    
+    def display_heatmap(self):
+        """Display completed sessions by weekday and starting hour"""
+        grid = self.get_heatmap()
+        peak = max(max(hours) for hours in grid)
+        shades = " ░▒▓█"
+        
+        print(f"\n{STATS_EMOJI} Sessions by Hour")
+        print("=" * 25)
+        print("     " + "".join(f"{hour:<3d}" for hour in range(0, 24, 3)))
+        for weekday, hours in zip(WEEKDAYS, grid):
+            cells = "".join(shades[-(-count * (len(shades) - 1) // peak)] if peak else " " for count in hours)
+            print(f"{weekday}  {cells}")
         print()
\ No newline at end of file
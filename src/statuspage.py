@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from .clock import SystemClock
+from .constants import STATS_DIR_NAME, STATUS_PAGE_NAME, SESSION_TYPES
+from .locking import process_alive
+
+
+# Fixed layout shared by the writer and readers:
+#   magic, layout version, sequence number (odd while a write is in
+#   progress), pid, state, session type, then deadline, remaining and
+#   duration in seconds. The deadline is on SystemClock, which every process
+#   on the machine reads the same way.
+LAYOUT = struct.Struct('<4sHxxQIBBxxdddxxxxxxxx')
+MAGIC = b'SMYA'
+VERSION = 1
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 8
+
+STATES = ('idle', 'running', 'paused', 'finished', 'aborted')
+
+
+def default_status_path():
+    """Per-user status page written by the running session"""
+    return Path.home() / STATS_DIR_NAME / STATUS_PAGE_NAME
+
+
+class StatusPage:
+    """Publishes the running session's state into a small memory-mapped file
+    
+    Writes only happen on state changes. Readers use a sequence lock: the
+    sequence number is odd while a write is in progress and changes with
+    every write, so a reader retries until it sees the same even number
+    before and after copying the fields.
+    """
+    
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_status_path()
+        self._map = None
+        self._sequence = 0
+    
+    def open(self):
+        """Create or reuse the page; returns False if it cannot be mapped"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < LAYOUT.size:
+                    os.ftruncate(fd, LAYOUT.size)
+                self._map = mmap.mmap(fd, LAYOUT.size)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError):
+            return False
+        
+        fields = LAYOUT.unpack_from(self._map)
+        self._sequence = fields[2] + (fields[2] & 1) if fields[0] == MAGIC else 0
+        return True
+    
+    def publish(self, state, session_type='custom', deadline=0.0, remaining=0.0, duration=0.0):
+        """Write a complete snapshot of the session state"""
+        if self._map is None:
+            return
+        type_index = SESSION_TYPES.index(session_type) if session_type in SESSION_TYPES else SESSION_TYPES.index('custom')
+        self._sequence += 1
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+        LAYOUT.pack_into(self._map, 0, MAGIC, VERSION, self._sequence, os.getpid(),
+                         STATES.index(state), type_index, deadline, remaining, duration)
+        self._sequence += 1
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+    
+    def publish_countdown(self, session_type, countdown):
+        """Publish a Countdown's current state; usable as a Countdown listener"""
+        self.publish(
+            countdown.state if countdown.state in STATES else 'idle',
+            session_type,
+            deadline=countdown.deadline or 0.0,
+            remaining=countdown.remaining(),
+            duration=countdown.duration
+        )
+    
+    def close(self):
+        """Mark the page idle if this process still owns it, then unmap it"""
+        if self._map is None:
+            return
+        fields = LAYOUT.unpack_from(self._map)
+        if fields[3] == os.getpid():
+            self.publish('idle')
+        self._map.close()
+        self._map = None
+
+
+def read_status(path=None, clock=None, retries=100):
+    """Read a consistent snapshot of the status page, or None if there is none
+    
+    Returns a dict with state, type, remaining, duration and pid. The
+    remaining time of a running session is computed from its deadline.
+    A page left behind by a process that was killed reads as idle.
+    """
+    path = Path(path) if path else default_status_path()
+    try:
+        with open(path, 'rb') as f:
+            page = mmap.mmap(f.fileno(), LAYOUT.size, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    
+    with page:
+        for _ in range(retries):
+            fields = LAYOUT.unpack_from(page)
+            if fields[0] != MAGIC or fields[1] != VERSION:
+                return None
+            sequence = fields[2]
+            if sequence & 1 or SEQUENCE.unpack_from(page, SEQUENCE_OFFSET)[0] != sequence:
+                continue
+            break
+        else:
+            return None
+    
+    _, _, _, pid, state_index, type_index, deadline, remaining, duration = fields
+    state = STATES[state_index] if state_index < len(STATES) else 'idle'
+    if state != 'idle':
+        if not process_alive(pid):
+            state, remaining = 'idle', 0.0
+    if state == 'running':
+        remaining = max(0.0, deadline - (clock or SystemClock()).now())
+    return {
+        'state': state,
+        'type': SESSION_TYPES[type_index] if type_index < len(SESSION_TYPES) else 'custom',
+        'remaining': remaining,
+        'duration': duration,
+        'pid': pid
+    }
+
+
+def format_status(status, fmt):
+    """Render a status snapshot with str.format-style fields
+    
+    Available fields: state, type, pid, remaining (whole seconds), mm, ss,
+    mmss and minutes (the planned length).
+    """
+    seconds = math.ceil(status['remaining'])
+    minutes_left, seconds_left = divmod(seconds, 60)
+    return fmt.format(
+        state=status['state'],
+        type=status['type'],
+        pid=status['pid'],
+        remaining=seconds,
+        mm=f"{minutes_left:02d}",
+        ss=f"{seconds_left:02d}",
+        mmss=f"{minutes_left:02d}:{seconds_left:02d}",
+        minutes=int(status['duration'] // 60)
+    )
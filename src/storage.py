@@ -0,0 +1,949 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from .constants import (
+    STATS_FILE_NAME, JOURNAL_FILE_NAME, STATS_LOCK_NAME, SQLITE_FILE_NAME, BINARY_FILE_NAME,
+    MAX_STORED_SESSIONS, JOURNAL_COMPACT_BYTES, SQLITE_TIMEOUT, SESSION_TYPES,
+    RETENTION_DETAIL_DAYS, RETENTION_DAILY_DAYS
+)
+from .locking import file_lock
+from . import records
+from .rollups import empty_rollups, apply_rollup, fold_days, parse_day
+
+
+PERIODS = ('hour', 'day', 'week', 'month')
+
+
+def empty_stats():
+    """Return a fresh stats structure"""
+    return {
+        'total_sessions': 0,
+        'sessions_by_type': {session_type: 0 for session_type in SESSION_TYPES},
+        'total_minutes': 0,
+        'sessions': [],
+        'rollups': empty_rollups()
+    }
+
+
+def counter_type(session_type):
+    """Return the sessions_by_type bucket a session type is counted under"""
+    return session_type if session_type in SESSION_TYPES else 'custom'
+
+
+def to_timestamp(value):
+    """Normalize a datetime, date or ISO string bound to an ISO timestamp string"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).isoformat()
+    raise TypeError(f"Unsupported time bound: {value!r}")
+
+
+def file_version(path):
+    """(inode, size, mtime_ns) of a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def period_key(timestamp, by):
+    """Return the bucket a local ISO timestamp falls in for a group-by period"""
+    if by == 'hour':
+        return timestamp[11:13]
+    if by == 'day':
+        return timestamp[:10]
+    if by == 'month':
+        return timestamp[:7]
+    if by == 'week':
+        day = date(int(timestamp[:4]), int(timestamp[5:7]), int(timestamp[8:10]))
+        return (day - timedelta(days=day.weekday())).isoformat()
+    raise ValueError(f"Unknown period: {by}")
+
+
+class SessionRecord(namedtuple('SessionRecord', ('timestamp', 'type', 'duration', 'completed'))):
+    """A stored session as a tuple: timestamp (local ISO string), type, duration (minutes), completed
+    
+    Without a per-record dict, streaming millions of them costs no more
+    memory than the one being looked at.
+    """
+    
+    __slots__ = ()
+    
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record['timestamp'], record['type'], record['duration'], bool(record['completed']))
+    
+    def as_dict(self):
+        """The record dict the backends store, e.g. for log_sessions()"""
+        return dict(zip(self._fields, self))
+
+
+def record_matches(record, since=None, until=None, session_type=None, completed=None):
+    """Check a session record against the query filters"""
+    if since is not None and record['timestamp'] < since:
+        return False
+    if until is not None and record['timestamp'] >= until:
+        return False
+    if session_type is not None and record['type'] != session_type:
+        return False
+    if completed is not None and bool(record['completed']) != completed:
+        return False
+    return True
+
+
+def aggregate_records(records, by=None):
+    """Group session records into period rows of sessions, completed and minutes"""
+    rows = {}
+    for record in records:
+        key = period_key(record['timestamp'], by) if by else None
+        row = rows.setdefault(key, {'period': key, 'sessions': 0, 'completed': 0, 'minutes': 0})
+        row['sessions'] += 1
+        if record['completed']:
+            row['completed'] += 1
+            row['minutes'] += record['duration']
+    return [rows[key] for key in sorted(rows, key=lambda k: (k is not None, k))]
+
+
+class StatsBackend:
+    """Base class for session storage backends
+    
+    Records are dicts with 'timestamp' (local ISO string), 'type', 'duration'
+    (minutes) and 'completed'. Time bounds are ISO strings; `until` is exclusive.
+    """
+    
+    name = None
+    
+    def __init__(self, stats_dir):
+        self.stats_dir = stats_dir
+    
+    def append(self, record):
+        """Persist a single session record"""
+        raise NotImplementedError
+    
+    def append_many(self, records):
+        """Persist several session records, in one write where the store allows"""
+        for record in records:
+            self.append(record)
+    
+    def load(self):
+        """Return the stats structure: lifetime counters and recent sessions"""
+        raise NotImplementedError
+    
+    def query(self, since=None, until=None, session_type=None, completed=None):
+        """Yield stored session records matching the filters, oldest first"""
+        raise NotImplementedError
+    
+    def iter_records(self, since=None, until=None, session_type=None, completed=None):
+        """Yield SessionRecord tuples matching the filters, oldest first"""
+        return map(SessionRecord.from_dict, self.query(since, until, session_type, completed))
+    
+    def aggregate(self, by=None, since=None, until=None, session_type=None):
+        """Return per-period rows for the matching sessions"""
+        return aggregate_records(self.query(since, until, session_type), by)
+    
+    def rollups(self):
+        """Return the daily and weekday x hour rollup buckets"""
+        rollups = empty_rollups()
+        for record in self.query():
+            apply_rollup(rollups, record)
+        return rollups
+    
+    def summary(self):
+        """Return the lifetime counters"""
+        stats = self.load()
+        return {
+            'total_sessions': stats['total_sessions'],
+            'total_minutes': stats['total_minutes'],
+            'sessions_by_type': stats['sessions_by_type']
+        }
+    
+    def compact(self):
+        """Reclaim space or fold write-ahead data; returns True on success"""
+        return True
+    
+    def data_version(self):
+        """Cheap identity of the stored data that changes with every write
+        
+        Used to key cached summaries; None means the backend cannot tell
+        and nothing is cached.
+        """
+        return None
+    
+    def totals_only(self):
+        """Where the store keeps totals instead of sessions, for deduplicating imports
+        
+        Returns (cutoff, buckets): sessions before cutoff are only counted
+        in the listed day ('YYYY-MM-DD') and month ('YYYY-MM') buckets.
+        Stores that keep every session return (None, an empty set).
+        """
+        return None, frozenset()
+    
+    def export_stats(self):
+        """Return the stats structure with every stored session in detail"""
+        stats = self.load()
+        stats['sessions'] = list(self.query())
+        return stats
+    
+    def import_records(self, records):
+        """Persist session records from another history, which may predate the stored ones"""
+        self.append_many(records)
+    
+    def import_stats(self, stats):
+        """Add the sessions of a stats structure, e.g. an exported stats.json"""
+        for record in stats['sessions']:
+            self.append(record)
+    
+    def exists(self):
+        """Check whether the backend holds any data on disk"""
+        raise NotImplementedError
+    
+    def clear(self):
+        """Remove all stored data"""
+        raise NotImplementedError
+    
+    def _ensure_dir(self):
+        """Create the stats directory; deferred until something is written"""
+        self.stats_dir.mkdir(parents=True, exist_ok=True)
+    
+    def close(self):
+        """Release any open resources"""
+
+
+class JournalBackend(StatsBackend):
+    """JSON snapshot (stats.json) plus an append-only journal of new sessions
+    
+    Retention is tiered: sessions from the last detail_days are kept in
+    full, the rollups keep per-day buckets for daily_days and per-month
+    buckets beyond that, and the lifetime counters cover everything.
+    Expired data is downsampled when the journal is compacted, so the work
+    is spread over the appends that filled it and the snapshot stays bounded.
+    
+    Many processes may log at once. Each record is a single O_APPEND write,
+    so concurrent appends never interleave; appenders and readers hold a
+    shared lock on stats.lock, and compaction, which replaces both files,
+    holds it exclusively.
+    """
+    
+    name = 'json'
+    
+    def __init__(self, stats_dir, stats_file=None, compact_bytes=JOURNAL_COMPACT_BYTES,
+                 detail_days=RETENTION_DETAIL_DAYS, daily_days=RETENTION_DAILY_DAYS):
+        super().__init__(stats_dir)
+        self.stats_file = stats_file or stats_dir / STATS_FILE_NAME
+        self.journal_file = stats_dir / JOURNAL_FILE_NAME
+        self.lock_file = stats_dir / STATS_LOCK_NAME
+        self.compact_bytes = compact_bytes
+        self.detail_days = detail_days
+        self.daily_days = daily_days
+    
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """Hold the stats lock; reads of a missing directory need none"""
+        if not exclusive and not self.stats_dir.exists():
+            yield
+            return
+        self._ensure_dir()
+        with file_lock(self.lock_file, exclusive):
+            yield
+    
+    def _load_snapshot(self):
+        """Load the compacted snapshot, or None if it is missing or unreadable"""
+        if self.stats_file.exists():
+            try:
+                with open(self.stats_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+        return None
+    
+    def _read_journal(self, offset=0):
+        """Yield journal records after offset, then the offset of the last complete line.
+        
+        A trailing line without a newline is a torn write and is ignored, as
+        is any line that does not parse.
+        """
+        try:
+            f = open(self.journal_file, 'rb')
+        except IOError:
+            yield offset
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                if isinstance(record, dict):
+                    yield record
+        yield offset
+    
+    def _replay(self):
+        """Load the snapshot and replay the journal on top of it.
+        
+        Returns the stats and a (inode, offset) mark describing how much of
+        the current journal file has been folded in.
+        """
+        stats = self._load_snapshot() or empty_stats()
+        mark = stats.pop('journal', None)
+        if 'rollups' not in stats:
+            # Snapshots from before rollups existed: rebuild from what is left
+            stats['rollups'] = empty_rollups()
+            for record in stats['sessions']:
+                apply_rollup(stats['rollups'], record)
+        for key, value in empty_rollups().items():
+            stats['rollups'].setdefault(key, value)
+        try:
+            inode = os.stat(self.journal_file).st_ino
+        except OSError:
+            return stats, None
+        
+        # A snapshot written just before a crash may already contain the head
+        # of this journal file; skip the part it covers.
+        offset = 0
+        if mark and mark.get('inode') == inode:
+            offset = mark.get('offset', 0)
+        
+        for item in self._read_journal(offset):
+            if isinstance(item, dict):
+                self._apply_record(stats, item)
+            else:
+                offset = item
+        return stats, (inode, offset)
+    
+    def _apply_record(self, stats, record):
+        """Fold a single session record into the stats structure"""
+        stats['total_sessions'] += 1
+        stats['sessions_by_type'][counter_type(record['type'])] += 1
+        
+        if record['completed']:
+            stats['total_minutes'] += record['duration']
+        
+        apply_rollup(stats['rollups'], record)
+        stats['sessions'].append(record)
+    
+    def totals_only(self):
+        cutoff = (date.today() - timedelta(days=self.detail_days)).isoformat()
+        rollups = self.load()['rollups']
+        return cutoff, set(rollups['days']) | set(rollups.get('months') or {})
+    
+    def _downsample(self, stats, today=None):
+        """Apply the retention tiers to a stats structure about to be saved"""
+        today = today or date.today()
+        cutoff = (today - timedelta(days=self.detail_days)).isoformat()
+        # Expired sessions are already counted in the daily buckets. Imported
+        # history may be out of order, so filter rather than cut the head;
+        # it costs no more than writing the snapshot.
+        stats['sessions'] = [record for record in stats['sessions'] if record['timestamp'] >= cutoff]
+        fold_days(stats['rollups'], today - timedelta(days=self.daily_days))
+    
+    def _save_snapshot(self, stats):
+        """Atomically replace the snapshot file, returning True on success"""
+        tmp_file = self.stats_file.with_name(self.stats_file.name + '.tmp')
+        try:
+            self._ensure_dir()
+            with open(tmp_file, 'w') as f:
+                json.dump(stats, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.stats_file)
+            return True
+        except (IOError, OSError):
+            return False
+    
+    def _append_journal(self, records):
+        """Append fsync'd records to the journal and return the journal size"""
+        line = b''.join((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8') for record in records)
+        self._ensure_dir()
+        # Unbuffered, so the record goes out in one write() call
+        with open(self.journal_file, 'ab+', buffering=0) as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size:
+                # Terminate a torn record so it cannot swallow this one
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+                f.seek(0, os.SEEK_END)
+            f.write(line)
+            os.fsync(f.fileno())
+        return size + len(line)
+    
+    def append(self, record):
+        self.append_many([record])
+    
+    def append_many(self, records):
+        if not records:
+            return
+        with self._locked():
+            size = self._append_journal(records)
+        # Outside the shared lock: compaction needs it exclusively
+        if size >= self.compact_bytes:
+            self.compact(min_bytes=self.compact_bytes)
+    
+    def load(self):
+        with self._locked():
+            stats, _ = self._replay()
+        return stats
+    
+    def rollups(self):
+        return self.load()['rollups']
+    
+    def query(self, since=None, until=None, session_type=None, completed=None):
+        for record in self.load()['sessions']:
+            if record_matches(record, since, until, session_type, completed):
+                yield record
+    
+    def compact(self, min_bytes=0):
+        """Fold the journal into the snapshot and start a new, empty journal
+        
+        With min_bytes, nothing happens unless the journal is at least that
+        large once the lock is held, so processes that crossed the threshold
+        together compact only once.
+        """
+        with self._locked(exclusive=True):
+            if min_bytes:
+                try:
+                    if os.path.getsize(self.journal_file) < min_bytes:
+                        return True
+                except OSError:
+                    return True
+            return self._compact()
+    
+    def _compact(self):
+        if self.stats_file.exists() and self._load_snapshot() is None:
+            # Keep an unreadable snapshot around rather than overwriting it
+            try:
+                os.replace(self.stats_file, self.stats_file.with_name(self.stats_file.name + '.corrupt'))
+            except OSError:
+                return False
+        
+        stats, mark = self._replay()
+        self._downsample(stats)
+        if mark:
+            stats['journal'] = {'inode': mark[0], 'offset': mark[1]}
+        if not self._save_snapshot(stats):
+            return False
+        if mark is None:
+            return True
+        
+        # The new journal gets a fresh inode, so the mark stored above stops
+        # matching once the swap is done.
+        tmp_journal = self.journal_file.with_name(self.journal_file.name + '.tmp')
+        try:
+            open(tmp_journal, 'wb').close()
+            os.replace(tmp_journal, self.journal_file)
+        except OSError:
+            return False
+        return True
+    
+    def data_version(self):
+        # Every write touches the journal: appends grow it, and compaction
+        # swaps in a new file. Without one, the snapshot is all there is.
+        return file_version(self.journal_file) or file_version(self.stats_file)
+    
+    def exists(self):
+        return self.stats_file.exists() or self.journal_file.exists()
+    
+    def clear(self):
+        with self._locked(exclusive=True):
+            for path in (self.stats_file, self.journal_file):
+                if path.exists():
+                    path.unlink()
+    
+    def retire(self):
+        """Rename the data files out of the way after migrating to another backend"""
+        with self._locked(exclusive=True):
+            for path in (self.stats_file, self.journal_file):
+                if path.exists():
+                    os.replace(path, path.with_name(path.name + '.migrated'))
+
+
+class SQLiteBackend(StatsBackend):
+    """Indexed SQLite store keeping the full session history
+    
+    Lifetime counters and rollup buckets live in small tables updated in the
+    same transaction as each insert, so summaries and reports never scan the
+    sessions table.
+    """
+    
+    name = 'sqlite'
+    
+    SCHEMA_VERSION = 2
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            type TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            completed INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_timestamp ON sessions (timestamp);
+        CREATE INDEX IF NOT EXISTS sessions_type_timestamp ON sessions (type, timestamp);
+        CREATE TABLE IF NOT EXISTS totals (
+            type TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL,
+            minutes INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            minutes INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS hourly_rollups (
+            weekday INTEGER NOT NULL,
+            hour INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (weekday, hour)
+        );
+    """
+    
+    BACKFILL_ROLLUPS = """
+        INSERT OR REPLACE INTO daily_rollups (day, sessions, completed, minutes)
+            SELECT substr(timestamp, 1, 10), COUNT(*), SUM(completed),
+                   SUM(CASE WHEN completed THEN duration ELSE 0 END)
+            FROM sessions GROUP BY 1;
+        INSERT OR REPLACE INTO hourly_rollups (weekday, hour, sessions)
+            SELECT (CAST(strftime('%w', timestamp) AS INTEGER) + 6) % 7,
+                   CAST(substr(timestamp, 12, 2) AS INTEGER), COUNT(*)
+            FROM sessions WHERE completed GROUP BY 1, 2;
+    """
+    
+    PERIOD_SQL = {
+        'hour': "substr(timestamp, 12, 2)",
+        'day': "substr(timestamp, 1, 10)",
+        'week': "date(timestamp, 'weekday 0', '-6 days')",
+        'month': "substr(timestamp, 1, 7)",
+    }
+    
+    def __init__(self, stats_dir):
+        super().__init__(stats_dir)
+        self.db_file = stats_dir / SQLITE_FILE_NAME
+        self._conn = None
+    
+    @property
+    def conn(self):
+        """Open the database on first use, creating and migrating it if needed"""
+        if self._conn is None:
+            self._ensure_dir()
+            # Sessions are logged on worker threads and read on the caller's,
+            # so the connection is not tied to the thread that opened it
+            self._conn = sqlite3.connect(str(self.db_file), timeout=SQLITE_TIMEOUT, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.SCHEMA_VERSION:
+                self._upgrade_schema(version)
+        return self._conn
+    
+    def _upgrade_schema(self, version):
+        """Create missing tables; import JSON stats into a new database"""
+        legacy = JournalBackend(self.stats_dir)
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+            if version == 0 and legacy.exists():
+                self._import_stats(legacy.load())
+            elif version == 1:
+                self._conn.executescript(self.BACKFILL_ROLLUPS)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        if version == 0:
+            legacy.retire()
+    
+    def _import_stats(self, stats):
+        """Copy a JSON stats structure into the tables"""
+        self._conn.executemany(
+            "INSERT INTO sessions (timestamp, type, duration, completed) VALUES (?, ?, ?, ?)",
+            [(r['timestamp'], r['type'], r['duration'], int(bool(r['completed'])))
+             for r in stats['sessions']]
+        )
+        # The JSON store only kept recent sessions in detail, so carry the
+        # lifetime counters over as-is. Minutes were never tracked per type,
+        # so the whole total goes on the first row.
+        minutes = stats['total_minutes']
+        for session_type, count in stats['sessions_by_type'].items():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO totals (type, sessions, minutes) VALUES (?, ?, ?)",
+                (counter_type(session_type), count, minutes)
+            )
+            minutes = 0
+        
+        rollups = stats['rollups']
+        self._conn.executemany(
+            "INSERT INTO daily_rollups (day, sessions, completed, minutes) VALUES (?, ?, ?, ?)",
+            [(day, *bucket) for day, bucket in rollups['days'].items()]
+            # Months the JSON store had folded land on their first day
+            + [(f"{month}-01", *bucket) for month, bucket in rollups.get('months', {}).items()]
+        )
+        self._conn.executemany(
+            "INSERT INTO hourly_rollups (weekday, hour, sessions) VALUES (?, ?, ?)",
+            [(weekday, hour, count)
+             for weekday, hours in enumerate(rollups['hours'])
+             for hour, count in enumerate(hours) if count]
+        )
+    
+    def append(self, record):
+        self.append_many([record])
+    
+    def append_many(self, records):
+        with self.conn:
+            for record in records:
+                self._insert(record)
+    
+    def _insert(self, record):
+        """Insert a record and bump its counters inside the current transaction"""
+        bucket = counter_type(record['type'])
+        minutes = record['duration'] if record['completed'] else 0
+        self.conn.execute(
+            "INSERT INTO sessions (timestamp, type, duration, completed) VALUES (?, ?, ?, ?)",
+            (record['timestamp'], record['type'], record['duration'], int(bool(record['completed'])))
+        )
+        self.conn.execute("INSERT OR IGNORE INTO totals (type, sessions, minutes) VALUES (?, 0, 0)", (bucket,))
+        self.conn.execute(
+            "UPDATE totals SET sessions = sessions + 1, minutes = minutes + ? WHERE type = ?",
+            (minutes, bucket)
+        )
+        self._update_rollups(record, minutes)
+    
+    def _update_rollups(self, record, minutes):
+        """Bump the rollup buckets for a record inside the current transaction"""
+        day = record['timestamp'][:10]
+        completed = int(bool(record['completed']))
+        self.conn.execute("INSERT OR IGNORE INTO daily_rollups (day, sessions, completed, minutes) VALUES (?, 0, 0, 0)", (day,))
+        self.conn.execute(
+            "UPDATE daily_rollups SET sessions = sessions + 1, completed = completed + ?, minutes = minutes + ? WHERE day = ?",
+            (completed, minutes, day)
+        )
+        if completed:
+            key = (parse_day(day).weekday(), int(record['timestamp'][11:13]))
+            self.conn.execute("INSERT OR IGNORE INTO hourly_rollups (weekday, hour, sessions) VALUES (?, ?, 0)", key)
+            self.conn.execute("UPDATE hourly_rollups SET sessions = sessions + 1 WHERE weekday = ? AND hour = ?", key)
+    
+    def _where(self, since, until, session_type, completed=None):
+        """Build a WHERE clause and parameters for the query filters"""
+        clauses, params = [], []
+        if session_type is not None:
+            clauses.append("type = ?")
+            params.append(session_type)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if completed is not None:
+            clauses.append("completed = ?")
+            params.append(int(completed))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+    
+    def _select(self, since, until, session_type, completed):
+        """Cursor over the matching (timestamp, type, duration, completed) rows, oldest first"""
+        where, params = self._where(since, until, session_type, completed)
+        return self.conn.execute(
+            f"SELECT timestamp, type, duration, completed FROM sessions {where} ORDER BY timestamp, id",
+            params
+        )
+    
+    def query(self, since=None, until=None, session_type=None, completed=None):
+        for timestamp, session_type, duration, completed in self._select(since, until, session_type, completed):
+            yield {
+                'timestamp': timestamp,
+                'type': session_type,
+                'duration': duration,
+                'completed': bool(completed)
+            }
+    
+    def iter_records(self, since=None, until=None, session_type=None, completed=None):
+        for timestamp, session_type, duration, completed in self._select(since, until, session_type, completed):
+            yield SessionRecord(timestamp, session_type, duration, bool(completed))
+    
+    def aggregate(self, by=None, since=None, until=None, session_type=None):
+        if by is not None and by not in self.PERIOD_SQL:
+            raise ValueError(f"Unknown period: {by}")
+        key = self.PERIOD_SQL[by] if by else "NULL"
+        where, params = self._where(since, until, session_type)
+        cursor = self.conn.execute(
+            f"SELECT {key} AS period, COUNT(*), SUM(completed), "
+            f"SUM(CASE WHEN completed THEN duration ELSE 0 END) "
+            f"FROM sessions {where} GROUP BY period ORDER BY period",
+            params
+        )
+        return [
+            {'period': period, 'sessions': sessions, 'completed': completed, 'minutes': minutes}
+            for period, sessions, completed, minutes in cursor
+        ]
+    
+    def rollups(self):
+        rollups = empty_rollups()
+        for day, sessions, completed, minutes in self.conn.execute("SELECT day, sessions, completed, minutes FROM daily_rollups"):
+            rollups['days'][day] = [sessions, completed, minutes]
+        for weekday, hour, sessions in self.conn.execute("SELECT weekday, hour, sessions FROM hourly_rollups"):
+            rollups['hours'][weekday][hour] = sessions
+        return rollups
+    
+    def summary(self):
+        counts = {session_type: 0 for session_type in SESSION_TYPES}
+        total_minutes = 0
+        for session_type, sessions, minutes in self.conn.execute("SELECT type, sessions, minutes FROM totals"):
+            counts[session_type] = sessions
+            total_minutes += minutes
+        return {
+            'total_sessions': sum(counts.values()),
+            'total_minutes': total_minutes,
+            'sessions_by_type': counts
+        }
+    
+    def load(self):
+        stats = self.summary()
+        cursor = self.conn.execute(
+            "SELECT timestamp, type, duration, completed FROM sessions ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (MAX_STORED_SESSIONS,)
+        )
+        stats['sessions'] = [
+            {'timestamp': t, 'type': s, 'duration': d, 'completed': bool(c)}
+            for t, s, d, c in reversed(cursor.fetchall())
+        ]
+        stats['rollups'] = self.rollups()
+        return stats
+    
+    def exists(self):
+        return self.db_file.exists()
+    
+    def clear(self):
+        self.close()
+        for suffix in ('', '-wal', '-shm'):
+            path = self.db_file.with_name(self.db_file.name + suffix)
+            if path.exists():
+                path.unlink()
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class BinaryBackend(StatsBackend):
+    """Packed fixed-width session records (see records.py) in sessions.bin
+    
+    Keeps the full history at 16 bytes a session. Summaries, reports and
+    rollups scan the memory-mapped file without building an object per
+    session, and time-bounded queries binary-search their range first.
+    Timestamps are kept to the second and session types outside
+    SESSION_TYPES are stored as custom.
+    
+    Writers append whole records with one O_APPEND write under the stats
+    lock; readers need no lock because they ignore a partial last record.
+    """
+    
+    name = 'binary'
+    
+    def __init__(self, stats_dir):
+        super().__init__(stats_dir)
+        self.data_file = stats_dir / BINARY_FILE_NAME
+        self.lock_file = stats_dir / STATS_LOCK_NAME
+        self._migrated = False
+    
+    def _migrate(self):
+        """Import JSON stats the first time the binary store is used"""
+        if self._migrated:
+            return
+        self._migrated = True
+        legacy = JournalBackend(self.stats_dir)
+        if self.data_file.exists() or not legacy.exists():
+            return
+        packed = self._packed_stats(legacy.load())
+        self._ensure_dir()
+        with file_lock(self.lock_file):
+            if not self.data_file.exists():
+                self._merge(packed)
+        legacy.retire()
+    
+    def _write(self, data, path=None):
+        """Append packed records, starting the file or cutting a torn record first"""
+        with open(path or self.data_file, 'ab+', buffering=0) as f:
+            size = f.seek(0, os.SEEK_END)
+            if size < records.HEADER.size:
+                f.truncate(0)
+                data = records.HEADER.pack(records.MAGIC, records.VERSION, records.RECORD.size) + data
+            elif (size - records.HEADER.size) % records.RECORD.size:
+                f.truncate(size - (size - records.HEADER.size) % records.RECORD.size)
+            f.write(data)
+            os.fsync(f.fileno())
+    
+    def _merge(self, packed):
+        """Merge packed records into the file in time order; hold the lock"""
+        with records.RecordFile(self.data_file) as existing:
+            merged = list(existing.scan())
+        merged.extend(records.RECORD.unpack(item) for item in packed)
+        merged.sort(key=lambda fields: fields[0])
+        
+        tmp_file = self.data_file.with_name(self.data_file.name + '.tmp')
+        if tmp_file.exists():
+            tmp_file.unlink()
+        self._write(b''.join(records.RECORD.pack(*fields) for fields in merged), tmp_file)
+        os.replace(tmp_file, self.data_file)
+    
+    def _packed_stats(self, stats):
+        """Pack a JSON stats structure into records
+        
+        Sessions the JSON store only kept as lifetime counters become
+        aggregate records at the time of the oldest detailed session, so
+        the totals carry over exactly.
+        """
+        sessions = sorted(stats['sessions'], key=lambda record: record['timestamp'])
+        packed = [records.pack_record(record) for record in sessions]
+        
+        detailed = {session_type: 0 for session_type in SESSION_TYPES}
+        detailed_minutes = 0
+        for record in sessions:
+            detailed[counter_type(record['type'])] += 1
+            if record['completed']:
+                detailed_minutes += record['duration']
+        
+        oldest = sessions[0]['timestamp'] if sessions else datetime.now().isoformat()
+        for session_type, count in stats['sessions_by_type'].items():
+            remaining = count - detailed.get(counter_type(session_type), 0)
+            while remaining > 0:
+                batch = min(remaining, records.MAX_COUNT)
+                record = {'timestamp': oldest, 'type': session_type, 'duration': 0, 'completed': False}
+                packed.append(records.pack_record(record, count=batch, aggregate=True))
+                remaining -= batch
+        # A completed aggregate of no sessions carries the untracked minutes
+        minutes = stats['total_minutes'] - detailed_minutes
+        if minutes > 0:
+            record = {'timestamp': oldest, 'type': 'custom', 'duration': minutes, 'completed': True}
+            packed.append(records.pack_record(record, count=0, aggregate=True))
+        return packed
+    
+    def _scan(self, since=None, until=None):
+        """Yield raw record tuples in [since, until) from the mapped file"""
+        self._migrate()
+        with records.RecordFile(self.data_file) as record_file:
+            rows = record_file.scan(
+                datetime.fromisoformat(since).timestamp() if since else None,
+                datetime.fromisoformat(until).timestamp() if until else None
+            )
+            try:
+                yield from rows
+            finally:
+                rows.close()
+    
+    def append(self, record):
+        self.append_many([record])
+    
+    def append_many(self, session_records):
+        if not session_records:
+            return
+        self._migrate()
+        self._ensure_dir()
+        with file_lock(self.lock_file):
+            self._write(b''.join(records.pack_record(record) for record in session_records))
+    
+    def import_records(self, session_records):
+        # Imported history is usually older than what is stored, and scans
+        # bisect on time, so it is merged in unless it all comes after
+        if not session_records:
+            return
+        self._migrate()
+        self._ensure_dir()
+        packed = sorted((records.pack_record(record) for record in session_records), key=records.EPOCH.unpack_from)
+        with file_lock(self.lock_file):
+            with records.RecordFile(self.data_file) as existing:
+                last = existing.epoch_at(len(existing) - 1) if len(existing) else None
+            if last is None or records.EPOCH.unpack_from(packed[0])[0] >= last:
+                self._write(b''.join(packed))
+            else:
+                self._merge(packed)
+    
+    def import_stats(self, stats):
+        self._migrate()
+        self._ensure_dir()
+        with file_lock(self.lock_file):
+            self._merge(self._packed_stats(stats))
+    
+    def _matching(self, since, until, session_type, completed):
+        """Yield the raw fields of the matching single-session records"""
+        wanted = records.type_index(session_type) if session_type is not None else None
+        for fields in self._scan(since, until):
+            _, _, type_number, flags, _ = fields
+            if flags & records.FLAG_AGGREGATE:
+                continue
+            if wanted is not None and type_number != wanted:
+                continue
+            if completed is not None and bool(flags & records.FLAG_COMPLETED) != completed:
+                continue
+            yield fields
+    
+    def query(self, since=None, until=None, session_type=None, completed=None):
+        for fields in self._matching(since, until, session_type, completed):
+            yield records.unpack_record(fields)
+    
+    def iter_records(self, since=None, until=None, session_type=None, completed=None):
+        for fields in self._matching(since, until, session_type, completed):
+            yield SessionRecord._make(records.unpack_fields(fields))
+    
+    def aggregate(self, by=None, since=None, until=None, session_type=None):
+        if by is not None and by not in PERIODS:
+            raise ValueError(f"Unknown period: {by}")
+        return records.aggregate(self._scan(since, until), by, session_type)
+    
+    def rollups(self):
+        return records.rollups(self._scan())
+    
+    def summary(self):
+        return records.summarize(self._scan())
+    
+    def load(self):
+        stats = self.summary()
+        self._migrate()
+        with records.RecordFile(self.data_file) as record_file:
+            start = max(0, len(record_file) - MAX_STORED_SESSIONS)
+            recent = [
+                records.unpack_record(fields) for fields in record_file.scan(start=start)
+                if not fields[3] & records.FLAG_AGGREGATE
+            ]
+        stats['sessions'] = recent
+        stats['rollups'] = self.rollups()
+        return stats
+    
+    def data_version(self):
+        return file_version(self.data_file)
+    
+    def exists(self):
+        return self.data_file.exists()
+    
+    def clear(self):
+        if not self.stats_dir.exists():
+            return
+        with file_lock(self.lock_file):
+            if self.data_file.exists():
+                self.data_file.unlink()
+
+
+BACKENDS = {
+    JournalBackend.name: JournalBackend,
+    SQLiteBackend.name: SQLiteBackend,
+    BinaryBackend.name: BinaryBackend,
+}
+
+
+def open_backend(name, stats_dir, **kwargs):
+    """Create the storage backend registered under name"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown stats backend: {name} (available: {', '.join(BACKENDS)})")
+    return backend_class(stats_dir, **kwargs)
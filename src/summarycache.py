@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from .constants import SUMMARY_CACHE_NAME, SUMMARY_CACHE_ENTRIES
+
+
+# In-process entries shared by every SessionStats, most recently used last;
+# a long-running daemon answers repeated summaries from here
+_entries = OrderedDict()
+_entries_lock = threading.Lock()
+
+
+class SummaryCache:
+    """Lifetime counters and rollups of a stats directory, computed once per change
+    
+    Entries are keyed on the backend's data_version(), the (inode, size,
+    mtime_ns) of the file every write touches, so checking an entry costs
+    a single stat(). Fresh entries are kept in memory and in a small JSON
+    sidecar next to the data, so a new process reads that instead of
+    parsing the whole history.
+    """
+    
+    def __init__(self, backend, path=None):
+        self.backend = backend
+        self.path = path or backend.stats_dir / SUMMARY_CACHE_NAME
+    
+    @property
+    def _name(self):
+        return (self.backend.name, str(self.backend.stats_dir))
+    
+    def get(self, save=True):
+        """Return {'summary': ..., 'rollups': ...} for the current data
+        
+        The result is shared between callers and must not be modified.
+        Without save, a fresh sidecar is still read but none is written,
+        for directories that are not ours to write into.
+        """
+        version = self.backend.data_version()
+        if version is None:
+            return self._compute()
+        version = list(version)
+        
+        with _entries_lock:
+            entry = _entries.get(self._name)
+            if entry is not None and entry['version'] == version:
+                _entries.move_to_end(self._name)
+                return entry
+        
+        entry = self._read_sidecar(version)
+        if entry is None:
+            # The version is taken before reading, so a write landing in
+            # between only makes this entry look stale, never the reverse
+            entry = dict(self._compute(), backend=self.backend.name, version=version)
+            if save:
+                self._write_sidecar(entry)
+        self._remember(entry)
+        return entry
+    
+    def invalidate(self):
+        """Forget the entry for this directory, in memory and on disk"""
+        with _entries_lock:
+            _entries.pop(self._name, None)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+    
+    def _compute(self):
+        stats = self.backend.load()
+        return {
+            'summary': {
+                'total_sessions': stats['total_sessions'],
+                'total_minutes': stats['total_minutes'],
+                'sessions_by_type': stats['sessions_by_type']
+            },
+            'rollups': stats['rollups']
+        }
+    
+    def _remember(self, entry):
+        with _entries_lock:
+            _entries[self._name] = entry
+            _entries.move_to_end(self._name)
+            while len(_entries) > SUMMARY_CACHE_ENTRIES:
+                _entries.popitem(last=False)
+    
+    def _read_sidecar(self, version):
+        """The sidecar entry if it was computed from this version of the data"""
+        try:
+            with open(self.path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('backend') != self.backend.name or entry.get('version') != version:
+            return None
+        if 'summary' not in entry or 'rollups' not in entry:
+            return None
+        return entry
+    
+    def _write_sidecar(self, entry):
+        """Atomically replace the sidecar; a cache that cannot be written is skipped"""
+        tmp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_file, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+
+import getpass
+import gzip
+import http.client
+import io
+import json
+import os
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+from .constants import (
+    SYNC_URL_ENV, SYNC_CONFIG_NAME, SYNC_DIR_NAME, SYNC_BATCH_SIZE, SYNC_TIMEOUT,
+    SYNC_BACKOFF_BASE, SYNC_BACKOFF_MAX
+)
+from .history import write_history, read_history
+from .locking import file_lock
+from .metrics import metrics
+
+
+class SyncError(Exception):
+    """A batch the collector did not take
+    
+    retryable is False when the collector rejected the batch itself, so
+    sending it again cannot help.
+    """
+    
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def load_sync_config(base_dir=None):
+    """Collector settings, or None when sync is off
+    
+    The URL comes from SAMAYA_SYNC_URL or the "url" of sync.json in the
+    stats directory, which may also set "user" (default: the login name)
+    and "batch_size".
+    """
+    if base_dir is None:
+        from .stats import base_stats_dir
+        base_dir = base_stats_dir()
+    config = {}
+    try:
+        with open(Path(base_dir) / SYNC_CONFIG_NAME, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Could not read sync settings: {e}")
+    if not isinstance(config, dict):
+        config = {}
+    url = os.environ.get(SYNC_URL_ENV) or config.get('url')
+    if not url:
+        return None
+    return {
+        'url': url,
+        'user': config.get('user') or getpass.getuser(),
+        'batch_size': int(config.get('batch_size', SYNC_BATCH_SIZE))
+    }
+
+
+class SyncQueue:
+    """Sessions waiting for the collector, as lines of an append-only file
+    
+    queue.jsonl holds one history line per session and cursor the byte
+    offset up to which the collector has acknowledged them. Appends are
+    single O_APPEND writes under a shared lock; once everything has been
+    acknowledged both files are emptied under the exclusive lock. Only one
+    process sends at a time, holding flush.lock. Batches the collector
+    refuses are set aside in rejected.jsonl.
+    """
+    
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.queue_file = self.directory / 'queue.jsonl'
+        self.cursor_file = self.directory / 'cursor'
+        self.state_file = self.directory / 'state.json'
+        self.lock_file = self.directory / 'queue.lock'
+        self.flush_lock = self.directory / 'flush.lock'
+        self.rejected_file = self.directory / 'rejected.jsonl'
+    
+    def append(self, records, path=None):
+        buffer = io.StringIO()
+        write_history(records, buffer)
+        data = buffer.getvalue().encode('utf-8')
+        if not data:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_file, exclusive=False):
+            fd = os.open(str(path or self.queue_file), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+    
+    def reject(self, records):
+        """Set aside sessions the collector will never take, for a person to look at"""
+        self.append(records, self.rejected_file)
+    
+    def cursor(self):
+        try:
+            return int(self.cursor_file.read_text())
+        except (OSError, ValueError):
+            return 0
+    
+    def batches(self, size):
+        """Yield (end offset, records) for the unacknowledged sessions, size at a time
+        
+        A trailing line without a newline is an append still in progress and
+        is left for later; lines that do not parse are skipped.
+        """
+        offset = start = self.cursor()
+        try:
+            f = open(self.queue_file, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            batch = []
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    batch.extend(read_history([line.decode('utf-8')], 'jsonl', str(self.queue_file)))
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                if len(batch) >= size:
+                    yield offset, batch
+                    batch = []
+            if batch or offset != start:
+                yield offset, batch
+    
+    def ack(self, offset):
+        """Record that everything before offset has been delivered"""
+        with file_lock(self.lock_file):
+            try:
+                size = self.queue_file.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if offset >= size:
+                open(self.queue_file, 'wb').close()
+                try:
+                    self.cursor_file.unlink()
+                except FileNotFoundError:
+                    pass
+                return
+            tmp_file = self.cursor_file.with_suffix('.tmp')
+            tmp_file.write_text(str(offset))
+            os.replace(tmp_file, self.cursor_file)
+    
+    def pending(self):
+        """How many sessions are waiting"""
+        return sum(len(batch) for _, batch in self.batches(SYNC_BATCH_SIZE))
+    
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            return {'failures': int(state['failures']), 'retry_at': float(state['retry_at'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {'failures': 0, 'retry_at': 0}
+    
+    def save_state(self, failures, retry_at):
+        tmp_file = self.state_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps({'failures': failures, 'retry_at': retry_at}))
+        os.replace(tmp_file, self.state_file)
+
+
+class SyncClient:
+    """Posts gzipped JSONL batches to the collector, reusing one keep-alive connection"""
+    
+    def __init__(self, url, user, timeout=SYNC_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: {url}")
+        self.url = url
+        self.user = user
+        self.timeout = timeout
+        self._parts = parts
+        self._connection = None
+        self.connections = 0
+        self.requests = 0
+    
+    def _connect(self):
+        if self._parts.scheme == 'https':
+            connection = http.client.HTTPSConnection(self._parts.hostname, self._parts.port, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self._parts.hostname, self._parts.port, timeout=self.timeout)
+        self.connections += 1
+        return connection
+    
+    def send(self, records):
+        """Post one batch; returns the collector's reply or raises SyncError"""
+        buffer = io.StringIO()
+        write_history(records, buffer)
+        body = gzip.compress(buffer.getvalue().encode('utf-8'))
+        headers = {
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            'X-Samaya-User': self.user
+        }
+        path = self._parts.path or '/'
+        # A kept-alive connection the collector has closed fails on first use; retry that once
+        for fresh in (self._connection is None, True):
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.request('POST', path, body, headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if fresh:
+                    raise SyncError(f"Could not reach {self._parts.netloc}: {e}")
+        self.requests += 1
+        if response.will_close:
+            self.close()
+        if response.status != 200:
+            retryable = response.status >= 500 or response.status in (408, 429)
+            raise SyncError(f"Collector answered {response.status} {response.reason}", retryable)
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise SyncError("Collector sent an unreadable reply")
+    
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Syncer:
+    """Queues logged sessions and ships them to the collector
+    
+    flush() sends everything queued in batches over one connection. A
+    failed flush leaves the sessions queued and backs off exponentially,
+    across processes, before the next automatic attempt. Session IDs are
+    content hashes, so a batch that was delivered but not acknowledged
+    is harmless to send again.
+    """
+    
+    def __init__(self, queue, client, batch_size=SYNC_BATCH_SIZE, sleep=time.sleep, clock=time.time):
+        self.queue = queue
+        self.client = client
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.clock = clock
+    
+    @classmethod
+    def from_config(cls, stats_dir, config=None):
+        """Syncer for a stats directory, or None when sync is off"""
+        config = config or load_sync_config()
+        if config is None:
+            return None
+        return cls(SyncQueue(Path(stats_dir) / SYNC_DIR_NAME), SyncClient(config['url'], config['user']),
+                   config.get('batch_size', SYNC_BATCH_SIZE))
+    
+    def enqueue(self, records):
+        self.queue.append(records)
+    
+    def flush(self, retries=0, force=False):
+        """Send the queued sessions; returns how many were sent and an error or None
+        
+        Each batch is tried retries more times after a retryable failure.
+        A batch the collector refuses outright is moved to rejected.jsonl
+        so the sessions behind it still go out. Unless forced, nothing is
+        sent while backing off from earlier failures, or while another
+        process is sending.
+        """
+        state = self.queue.load_state()
+        if not force and state['retry_at'] > self.clock():
+            retry_at = datetime.fromtimestamp(state['retry_at']).strftime('%H:%M:%S')
+            return 0, f"Waiting until {retry_at} after {state['failures']} failed attempts"
+        if not self.queue.queue_file.exists():
+            return 0, None
+        
+        sent = rejected = 0
+        rejection = None
+        try:
+            with file_lock(self.queue.flush_lock, blocking=False):
+                for offset, batch in self.queue.batches(self.batch_size):
+                    try:
+                        if batch:
+                            self._send(batch, retries)
+                    except SyncError as e:
+                        if e.retryable:
+                            raise
+                        # Sending it again cannot help, and it would hold up everything queued after it
+                        self.queue.reject(batch)
+                        self.queue.ack(offset)
+                        rejected += len(batch)
+                        rejection = e
+                        metrics.count('samaya_sync_rejected', len(batch))
+                        continue
+                    self.queue.ack(offset)
+                    sent += len(batch)
+        except BlockingIOError:
+            return 0, "Another samaya process is sending"
+        except (SyncError, OSError) as e:
+            failures = state['failures'] + 1
+            delay = min(SYNC_BACKOFF_MAX, SYNC_BACKOFF_BASE * 2 ** failures) * random.uniform(0.5, 1)
+            self.queue.save_state(failures, self.clock() + delay)
+            metrics.count('samaya_sync_failures')
+            return sent, str(e)
+        finally:
+            self.client.close()
+            if sent:
+                metrics.count('samaya_sync_sessions', sent)
+        if state['failures']:
+            self.queue.save_state(0, 0)
+        if rejected:
+            return sent, f"{rejection}; {rejected} sessions moved to {self.queue.rejected_file}"
+        return sent, None
+    
+    def _send(self, batch, retries):
+        for attempt in range(retries + 1):
+            try:
+                return self.client.send(batch)
+            except SyncError as e:
+                if not e.retryable or attempt == retries:
+                    raise
+            self.sleep(min(SYNC_BACKOFF_MAX, SYNC_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1))
@@ -1,23 +1,148 @@
 #!/usr/bin/env python3
 
+import os
+import threading
 import time
-from .audio import AudioPlayer
-from .stats import SessionStats
-from .constants import SESSION_END_EMOJI
+from .clock import SystemClock
+from .workers import WorkerPool
+from .metrics import metrics
+from .constants import SESSION_MODES, SESSION_END_EMOJI, COMPLETION_TIMEOUT, TICK_LATENESS_METRIC
 
 
 class SessionTimer:
     """Handles timing sessions with different durations"""
     
-    SESSION_MODES = {
-        'short': 5,      # 5 minutes
-        'medium': 15,    # 15 minutes
-        'long': 25       # 25 minutes (standard pomodoro)
-    }
+    SESSION_MODES = SESSION_MODES
     
-    def __init__(self):
-        self.audio_player = AudioPlayer()
-        self.stats = SessionStats()
+    def __init__(self, clock=None, control=True, display=None, stats=None):
+        # Audio and stats are built on first use so that informational
+        # commands never import them or touch the stats directory; an
+        # embedding program may pass its own SessionStats instead
+        self._audio_player = None
+        self._stats = stats
+        self.clock = clock or SystemClock()
+        self.control = control
+        # Display mode for the countdown (see render.py); None follows SAMAYA_DISPLAY
+        self.display = display
+        self.renderer = None
+        self.countdown = None
+        self.current_session = {}
+        # Crash-safe record of the running session (see checkpoint.py)
+        self.checkpoint = None
+        # Seconds of the current session run before a crash, when resuming it
+        self.resumed_seconds = 0
+        # Called on the worker pool with the finished session's details
+        self.completion_hooks = []
+        self.workers = WorkerPool()
+        # Session event hooks (see events.py), loaded on a thread of their
+        # own at the first event; events until then wait in _early_events
+        self._events = None
+        self._events_loader = None
+        self._early_events = []
+        self._events_lock = threading.Lock()
+        # Team sync (see sync.py); False until its settings have been read
+        self._sync = False
+        self._countdown_seen = None
+    
+    @property
+    def audio_player(self):
+        if self._audio_player is None:
+            from .audio import AudioPlayer
+            self._audio_player = AudioPlayer()
+        return self._audio_player
+    
+    @audio_player.setter
+    def audio_player(self, audio_player):
+        self._audio_player = audio_player
+    
+    @property
+    def stats(self):
+        if self._stats is None:
+            from .stats import SessionStats
+            self._stats = SessionStats()
+        return self._stats
+    
+    @stats.setter
+    def stats(self, stats):
+        self._stats = stats
+    
+    @property
+    def sync(self):
+        """Syncer shipping logged sessions to the team collector, or None when sync is off"""
+        if self._sync is False:
+            from .sync import Syncer
+            try:
+                self._sync = Syncer.from_config(self.stats.stats_dir)
+            except ValueError as e:
+                print(f"Sync is off: {e}")
+                self._sync = None
+        return self._sync
+    
+    @sync.setter
+    def sync(self, sync):
+        self._sync = sync
+    
+    def _queue_for_sync(self, records, flush=True):
+        """Queue logged records for the collector and, with flush, try to send them"""
+        if not records or self.sync is None:
+            return
+        try:
+            self.sync.enqueue(records)
+        except OSError:
+            return
+        if flush:
+            self.sync.flush()
+    
+    @property
+    def events(self):
+        if self._events is None:
+            loader = self._load_events_in_background()
+            if loader is not None:
+                loader.join()
+        return self._events
+    
+    @events.setter
+    def events(self, events):
+        self._events = events
+    
+    def _load_events_in_background(self):
+        """Start loading the hooks unless they are loaded; returns the loading thread"""
+        with self._events_lock:
+            if self._events is None and self._events_loader is None:
+                self._events_loader = threading.Thread(target=self._load_events, name='samaya-hook-loader', daemon=True)
+                self._events_loader.start()
+            return self._events_loader
+    
+    def _load_events(self):
+        # Importing events.py and scanning the entry points takes tens of
+        # milliseconds, which the countdown must not wait for
+        from .events import EventBus, load_hooks
+        events = EventBus(load_hooks())
+        with self._events_lock:
+            # Delivered under the lock so later events cannot overtake them
+            for event in self._early_events:
+                self._deliver(events, *event)
+            self._early_events = []
+            self._events = events
+    
+    def _emit(self, kind, remaining=None):
+        """Hand a session event to the hooks; never waits on them"""
+        session = self.current_session
+        event = (kind, session.get('type', 'custom'), self._logged_minutes(session.get('minutes')), remaining, time.time())
+        with self._events_lock:
+            events = self._events
+            if events is None:
+                self._early_events.append(event)
+        if events is None:
+            self._load_events_in_background()
+        else:
+            self._deliver(events, *event)
+    
+    @staticmethod
+    def _deliver(events, kind, session_type, minutes, remaining, timestamp):
+        if events.wants(kind):
+            from .events import SessionEvent
+            events.emit(SessionEvent(kind, session_type, minutes, remaining, timestamp))
     
     def start_session(self, mode):
         """Start a timer session with the specified mode"""
@@ -37,48 +162,275 @@ class SessionTimer:
         
         return self._run_session('custom', duration_minutes)
     
-    def _run_session(self, session_type, duration_minutes):
-        """Run a timer session with the specified type and duration"""
+    def resume_orphan(self, orphan):
+        """Continue a session left behind by a crashed process from where it would be now"""
+        from .checkpoint import claim_orphan
+        minutes = orphan['duration'] / 60
+        minutes = int(minutes) if minutes == int(minutes) else round(minutes, 2)
+        if not claim_orphan(orphan):
+            print(f"The session of process {orphan['pid']} was picked up by another process")
+            return False
+        return self._run_session(orphan['type'], minutes, remaining_seconds=orphan['remaining'])
+    
+    def recover_orphans(self, keep=None):
+        """Log sessions left behind by crashed processes, except keep
+        
+        A session that had finished is logged as completed; anything else
+        as incomplete, with the minutes it had run.
+        """
+        from .checkpoint import find_orphans, claim_orphan
+        for orphan in find_orphans(clock=self.clock):
+            if orphan is keep or not claim_orphan(orphan):
+                continue
+            completed = orphan['state'] == 'finished'
+            minutes = orphan['duration'] if completed else orphan['duration'] - orphan['remaining']
+            minutes = round(minutes / 60, 2)
+            record = self.stats.log_session(orphan['type'], int(minutes) if minutes == int(minutes) else minutes,
+                                            completed=completed)
+            # Sent after the next session, never before it starts
+            self._queue_for_sync([record] if record else [], flush=False)
+            print(f"Logged {'completed' if completed else 'interrupted'} {orphan['type']} session "
+                  f"from process {orphan['pid']} ({minutes:g} of {orphan['duration'] / 60:g} minutes)")
+    
+    def _run_session(self, session_type, duration_minutes, remaining_seconds=None):
+        """Run a timer session with the specified type and duration
+        
+        remaining_seconds resumes a session of duration_minutes part way through.
+        """
         duration_seconds = duration_minutes * 60
+        if remaining_seconds is not None:
+            self.resumed_seconds = duration_seconds - remaining_seconds
+            duration_seconds = remaining_seconds
         session_display = session_type if session_type != 'custom' else 'custom'
         
-        print(f"Starting {session_display} session: {duration_minutes} minutes")
+        if remaining_seconds is not None:
+            minutes_left, seconds_left = divmod(int(remaining_seconds), 60)
+            print(f"Resuming {session_display} session: {minutes_left:02d}:{seconds_left:02d} of {duration_minutes} minutes left")
+        else:
+            print(f"Starting {session_display} session: {duration_minutes} minutes")
         print("Press Ctrl+C to stop the session early")
         
         self.audio_player.start_brown_noise()
+        self.current_session = {'type': session_type, 'minutes': duration_minutes}
+        self.countdown = None
+        if self.control:
+            from .checkpoint import SessionCheckpoint
+            self.checkpoint = SessionCheckpoint(session_type, duration_minutes, clock=self.clock,
+                                                elapsed=self.resumed_seconds)
+        metrics.mark('startup')
+        self._emit('start', duration_seconds)
         
         try:
-            self._run_timer(duration_seconds)
+            completed = self._run_timer(duration_seconds)
+        except KeyboardInterrupt:
+            completed = False
+        
+        # The countdown may have been extended over the control socket
+        duration_minutes = self._logged_minutes(duration_minutes)
+        
+        if completed:
             print(f"\n{session_display.capitalize()} session complete!")
             print(f"{SESSION_END_EMOJI} Session ended")
-            self.audio_player.stop_brown_noise()
-            self.audio_player.play_bell_sound()
-            self.stats.log_session(session_type, duration_minutes, completed=True)
+            self._complete_session(session_type, duration_minutes, completed=True)
             return True
-            
-        except KeyboardInterrupt:
-            print(f"\n{session_display.capitalize()} session stopped early.")
-            self.audio_player.stop_brown_noise()
-            self.stats.log_session(session_type, duration_minutes, completed=False)
-            return False
+        
+        print(f"\n{session_display.capitalize()} session stopped early.")
+        self._complete_session(session_type, duration_minutes, completed=False)
+        return False
+    
+    def run_cycle(self, plan, start=0, checkpoint=None):
+        """Run every segment of a CyclePlan in this process; False if stopped early
+        
+        Brown noise keeps playing across segments. Work segments are logged
+        in a batch at the next segment boundary, on the worker pool, and
+        the checkpoint, if given, is updated as each segment starts so
+        the plan can be resumed from it.
+        """
+        segments = plan.segments()
+        print(f"Starting cycle {plan.spec} x{plan.cycles}: {len(segments)} segments, {plan.total_minutes()} minutes")
+        print("Press Ctrl+C to stop the cycle")
+        
+        self.audio_player.start_brown_noise()
+        metrics.mark('startup')
+        pending = []
+        finished = True
+        try:
+            for index in range(start, len(segments)):
+                segment = segments[index]
+                if checkpoint is not None:
+                    checkpoint.save(plan, index)
+                print(f"\n[{index + 1}/{len(segments)}] {segment.kind.capitalize()}: {segment.type} {segment.minutes} minutes")
+                self.current_session = {'type': segment.type, 'minutes': segment.minutes}
+                self.countdown = None
+                self._emit('start', segment.minutes * 60)
+                
+                try:
+                    finished = self._run_timer(segment.minutes * 60)
+                except KeyboardInterrupt:
+                    finished = False
+                
+                if segment.kind == 'work':
+                    minutes = self._logged_minutes(segment.minutes)
+                    pending.append(self.stats.make_record(segment.type, minutes, finished))
+                    session = dict(self.current_session, minutes=minutes, completed=finished)
+                    for hook in self.completion_hooks:
+                        self.workers.submit(hook, session)
+                self._emit('complete' if finished else 'abort', self._remaining())
+                pending = self._flush_records(pending)
+                if not finished:
+                    break
+                self.workers.submit(self.audio_player.play_bell_sound)
+        finally:
+            self.workers.submit(self.audio_player.detach_brown_noise())
+        if pending:
+            # The pool stayed backed up to the end; log them here rather than lose them
+            self._log_records(pending)
+        
+        if finished:
+            if checkpoint is not None:
+                checkpoint.clear()
+            print("\nCycle complete!")
+            print(f"{SESSION_END_EMOJI} Session ended")
+            return True
+        print("\nCycle stopped early.")
+        if checkpoint is not None:
+            print("Resume it with: samaya cycle --resume")
+        return False
+    
+    def _flush_records(self, records):
+        """Hand pending stats records to the worker pool; returns what is left over"""
+        if not records:
+            return records
+        if self.workers.submit(self._log_records, records) is None:
+            # The pool is backed up; keep them for the next boundary
+            return records
+        return []
+    
+    def _complete_session(self, session_type, duration_minutes, completed):
+        """Hand audio teardown, the bell, stats and hooks to the worker pool
+        
+        Returns immediately; call wait_for_completion() before exiting.
+        """
+        stop_noise = self.audio_player.detach_brown_noise()
+        if completed:
+            self.workers.submit(self._finish_audio, stop_noise)
+        else:
+            self.workers.submit(stop_noise)
+        self.workers.submit(self._log_session, self.checkpoint, session_type, duration_minutes, completed)
+        self.checkpoint = None
+        self.resumed_seconds = 0
+        
+        session = dict(self.current_session, minutes=duration_minutes, completed=completed)
+        for hook in self.completion_hooks:
+            self.workers.submit(hook, session)
+        self._emit('complete' if completed else 'abort', self._remaining())
+    
+    def _log_session(self, checkpoint, session_type, duration_minutes, completed):
+        record = self.stats.log_session(session_type, duration_minutes, completed=completed)
+        # Only now is the session safely recorded
+        if checkpoint is not None:
+            checkpoint.clear()
+        self._queue_for_sync([record] if record else [])
+    
+    def _log_records(self, records):
+        self.stats.log_sessions(records)
+        self._queue_for_sync(records)
+    
+    def _finish_audio(self, stop_noise):
+        stop_noise()
+        self.audio_player.play_bell_sound()
+    
+    def wait_for_completion(self, timeout=COMPLETION_TIMEOUT):
+        """Give pending completion work and hooks up to timeout seconds; False if some is still running"""
+        with metrics.span('completion_wait'):
+            start = time.monotonic()
+            drained = self.workers.drain(timeout)
+            # Hooks share what is left of the same budget
+            if self._events_loader is not None:
+                self._events_loader.join(None if timeout is None else max(0, timeout - (time.monotonic() - start)))
+            if self._events is None:
+                return drained
+            left = None if timeout is None else max(0, timeout - (time.monotonic() - start))
+            drained = self._events.drain(left) and drained
+            self._events.report_failures()
+            return drained
+    
+    def _logged_minutes(self, duration_minutes):
+        """Planned minutes plus any time added while the session ran"""
+        if self.countdown is None:
+            return duration_minutes
+        minutes = (self.countdown.duration + self.resumed_seconds) / 60
+        return int(minutes) if minutes == int(minutes) else round(minutes, 2)
     
     def _run_timer(self, duration_seconds):
-        """Run the countdown timer"""
-        start_time = time.time()
-        
-        while True:
-            elapsed = time.time() - start_time
-            remaining = duration_seconds - elapsed
-            
-            if remaining <= 0:
-                break
-            
-            minutes_left = int(remaining // 60)
-            seconds_left = int(remaining % 60)
-            
-            print(f"\rTime remaining: {minutes_left:02d}:{seconds_left:02d}", 
-                  end="", flush=True)
-            time.sleep(1)
+        """Run the countdown timer; returns False if it was aborted"""
+        from .countdown import Countdown
+        from .render import make_renderer
+        
+        self.renderer = make_renderer(self.display)
+        self.renderer.begin(self.current_session.get('type', 'custom'), duration_seconds)
+        self.countdown = Countdown(duration_seconds, self.clock)
+        self._countdown_seen = ('pending', duration_seconds)
+        self.countdown.listeners.append(self._follow_countdown)
+        if self.checkpoint is not None:
+            self.countdown.listeners.append(self.checkpoint.update)
+        try:
+            if not self.control:
+                return self.countdown.run(self._tick)
+            return self._run_controlled()
+        finally:
+            self.renderer.end()
+    
+    def _run_controlled(self):
+        """Run the countdown behind a control socket, publishing it to the status page"""
+        from .control import ControlServer
+        from .statuspage import StatusPage
+        
+        # Publish state changes for status bars without a per-tick cost
+        status_page = StatusPage()
+        if status_page.open():
+            session_type = self.current_session.get('type', 'custom')
+            self.countdown.listeners.append(
+                lambda countdown: status_page.publish_countdown(session_type, countdown))
+        
+        info = dict(self.current_session, pid=os.getpid())
+        try:
+            with ControlServer(self.countdown, info):
+                return self.countdown.run(self._tick)
+        finally:
+            status_page.close()
+    
+    def _follow_countdown(self, countdown):
+        """Pause and resume the brown noise along with the countdown, and tell the display and hooks"""
+        if countdown.state == 'paused':
+            self.audio_player.pause_brown_noise()
+        elif countdown.state == 'running':
+            self.audio_player.resume_brown_noise()
+        if self.renderer is not None:
+            self.renderer.update(countdown)
+        
+        state, duration = self._countdown_seen
+        self._countdown_seen = (countdown.state, countdown.duration)
+        if countdown.duration > duration:
+            self._emit('extend', countdown.remaining())
+        if countdown.state == 'paused' and state != 'paused':
+            self._emit('pause', countdown.remaining())
+        elif countdown.state == 'running' and state == 'paused':
+            self._emit('resume', countdown.remaining())
+    
+    def _remaining(self):
+        return None if self.countdown is None else self.countdown.remaining()
+    
+    def _tick(self, seconds_left):
+        self._show_remaining(seconds_left)
+        self._emit('tick', seconds_left)
+    
+    def _show_remaining(self, seconds_left):
+        """Show the remaining time through the renderer"""
+        if metrics.enabled and self.countdown is not None and self.countdown.deadline is not None:
+            # Ticks are due on whole-second boundaries of the remaining time
+            metrics.observe(TICK_LATENESS_METRIC, seconds_left - (self.countdown.deadline - self.clock.now()))
+        self.renderer.tick(seconds_left)
     
     def list_modes(self):
         """List available session modes"""
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+import time
+from .constants import COMPLETION_WORKERS, COMPLETION_QUEUE_SIZE, COMPLETION_SUBMIT_TIMEOUT
+
+
+class Job:
+    """A call submitted to a WorkerPool"""
+    
+    __slots__ = ('fn', 'args', 'kwargs', 'result', 'error', 'elapsed', '_done')
+    
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.elapsed = None
+        self._done = threading.Event()
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """Wait for the job to finish; returns False on timeout"""
+        return self._done.wait(timeout)
+    
+    def run(self):
+        start = time.monotonic()
+        try:
+            self.result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.monotonic() - start
+            self._done.set()
+
+
+class WorkerPool:
+    """A few daemon threads for work the caller must not wait on
+    
+    Threads start on first use. The queue is bounded: submit() waits at
+    most submit_timeout for room and returns None if the pool is still
+    saturated, so a stuck job never stalls the caller. drain() gives the
+    pending jobs a bounded amount of time, e.g. before the process exits;
+    daemon threads never keep the process alive beyond that.
+    """
+    
+    def __init__(self, workers=COMPLETION_WORKERS, max_pending=COMPLETION_QUEUE_SIZE,
+                 submit_timeout=COMPLETION_SUBMIT_TIMEOUT, name='samaya-worker'):
+        self.workers = workers
+        self.submit_timeout = submit_timeout
+        self.name = name
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._threads = []
+        self._pending = 0
+        self._idle = threading.Condition()
+    
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns its Job, or None if the pool is full"""
+        self._start_threads()
+        job = Job(fn, args, kwargs)
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put(job, timeout=self.submit_timeout)
+        except queue.Full:
+            self._finished()
+            self.dropped += 1
+            return None
+        return job
+    
+    def drain(self, timeout=None):
+        """Wait until every submitted job has finished; returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+    
+    def _start_threads(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _finished(self):
+        with self._idle:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+    
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.run()
+            if job.error is not None:
+                print(f"Background task failed: {job.error}")
+            self._finished()
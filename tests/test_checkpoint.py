@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import sys
+import os
+from pathlib import Path
+from contextlib import redirect_stdout
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.checkpoint import SessionCheckpoint, find_orphans, claim_orphan, elapsed_since
+from src.countdown import Countdown
+from src.clock import ManualClock
+from src.stats import SessionStats
+from src.timer import SessionTimer
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_orphan(directory, clock, state='running', remaining=600.0, duration=1500, age=100.0, pid=None):
+    pid = pid or dead_pid()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{pid}.json"
+    with open(path, 'w') as f:
+        json.dump({'pid': pid, 'type': 'long', 'minutes': 25, 'duration': duration, 'state': state,
+                   'remaining': remaining, 'clock': clock.now() - age, 'wall': time.time() - age}, f)
+    return path
+
+
+class TestSessionCheckpoint(unittest.TestCase):
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.clock = ManualClock()
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_written_only_on_state_changes(self):
+        """Test that a countdown rewrites the checkpoint per state change, not per tick"""
+        checkpoint = SessionCheckpoint('short', 5, self.test_dir / 'session.json', self.clock)
+        countdown = Countdown(5 * 60, self.clock)
+        countdown.listeners.append(checkpoint.update)
+        states = []
+        
+        def tick(seconds_left):
+            if seconds_left == 120 and countdown.duration == 300:
+                countdown.extend(60)
+            with open(checkpoint.path) as f:
+                states.append(json.load(f)['state'])
+        
+        with mock.patch('os.replace', wraps=os.replace) as replace:
+            self.assertTrue(countdown.run(tick))
+        # start, extend, finish
+        self.assertEqual(replace.call_count, 3)
+        self.assertEqual(set(states), {'running'})
+        with open(checkpoint.path) as f:
+            state = json.load(f)
+        self.assertEqual((state['state'], state['duration'], state['remaining']), ('finished', 360, 0))
+        
+        checkpoint.clear()
+        self.assertFalse(checkpoint.path.exists())
+    
+    def test_orphans_are_found_with_time_advanced(self):
+        """Test that only dead processes' checkpoints count and their time kept running"""
+        write_orphan(self.test_dir, self.clock, age=100.0)
+        write_orphan(self.test_dir, self.clock, pid=os.getppid())
+        write_orphan(self.test_dir, self.clock, state='paused', age=3000.0)
+        (self.test_dir / 'broken.json').write_text('{')
+        
+        orphans = find_orphans(self.test_dir, self.clock)
+        self.assertEqual([orphan['state'] for orphan in orphans], ['running', 'paused'])
+        self.assertAlmostEqual(orphans[0]['remaining'], 500.0, delta=0.5)
+        self.assertEqual(orphans[1]['remaining'], 600.0)
+    
+    def test_wall_clock_after_reboot(self):
+        """Test that a monotonic anchor from an earlier boot is not trusted"""
+        state = {'clock': self.clock.now() + 5000.0, 'wall': time.time() - 60.0}
+        self.assertAlmostEqual(elapsed_since(state, self.clock), 60.0, delta=0.5)
+        state = {'clock': self.clock.now() - 60.0, 'wall': time.time() - 60.0}
+        self.assertAlmostEqual(elapsed_since(state, self.clock), 60.0, delta=0.5)
+
+
+@unittest.skipUnless(os.name == 'posix', "needs a process liveness probe")
+class TestRecovery(unittest.TestCase):
+    
+    def setUp(self):
+        self.home = Path(tempfile.mkdtemp())
+        patcher = mock.patch.dict(os.environ, {'HOME': str(self.home)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sessions = self.home / '.samaya' / 'sessions'
+        self.timer = SessionTimer(clock=ManualClock())
+        self.timer.stats = SessionStats(stats_dir=self.home / '.samaya', backend='json')
+        self.timer.audio_player.start_brown_noise = lambda: False
+        self.timer.audio_player.play_bell_sound = lambda: None
+    
+    def tearDown(self):
+        shutil.rmtree(self.home)
+    
+    def test_orphans_are_logged_as_partial(self):
+        """Test logging sessions of killed processes before starting anew"""
+        write_orphan(self.sessions, self.timer.clock, remaining=600.0, age=300.0)
+        write_orphan(self.sessions, self.timer.clock, state='finished', remaining=0)
+        with redirect_stdout(io.StringIO()) as output:
+            self.timer.recover_orphans()
+        self.assertIn('interrupted long session', output.getvalue())
+        
+        sessions = self.timer.stats.query_sessions()
+        self.assertEqual(sorted((s['duration'], s['completed']) for s in sessions), [(20, False), (25, True)])
+        self.assertEqual(find_orphans(self.sessions), [])
+    
+    def test_orphan_is_logged_once(self):
+        """Test that an orphan another process has claimed is neither logged nor resumed"""
+        write_orphan(self.sessions, self.timer.clock, remaining=600.0, age=300.0)
+        orphans = find_orphans(self.sessions, self.timer.clock)
+        self.assertTrue(claim_orphan(orphans[0]))
+        self.assertFalse(claim_orphan(orphans[0]))
+        with mock.patch('src.checkpoint.find_orphans', return_value=orphans), redirect_stdout(io.StringIO()):
+            self.timer.recover_orphans()
+            self.assertFalse(self.timer.resume_orphan(orphans[0]))
+        self.assertEqual(self.timer.stats.query_sessions(), [])
+    
+    def test_resume_continues_from_the_anchor(self):
+        """Test that a resumed session runs its remaining time and logs the full length"""
+        path = write_orphan(self.sessions, self.timer.clock, remaining=600.0, age=300.0)
+        orphan = find_orphans(self.sessions, self.timer.clock)[0]
+        seen = []
+        
+        def tick(seconds_left):
+            if not seen:
+                seen.append(seconds_left)
+                with open(self.sessions / f"{os.getpid()}.json") as f:
+                    seen.append(json.load(f)['duration'])
+        self.timer._show_remaining = tick
+        
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.timer.resume_orphan(orphan))
+        self.assertTrue(self.timer.wait_for_completion())
+        
+        self.assertEqual(seen, [300, 1500])
+        self.assertFalse(path.exists())
+        self.assertEqual(list(self.sessions.glob('*.json')), [])
+        self.assertEqual(self.timer.stats.query_sessions()[0]['duration'], 25)
+        self.assertTrue(self.timer.stats.query_sessions()[0]['completed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 
 import unittest
+import shutil
+import subprocess
+import tempfile
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.cli import create_parser
+from src.constants import STARTUP_BUDGET_MS
 
 
 class TestCLI(unittest.TestCase):
@@ -42,6 +46,36 @@ class TestCLI(unittest.TestCase):
         args = self.parser.parse_args(['--list-modes'])
         self.assertTrue(args.list_modes)
     
+    def test_stats_report_arguments(self):
+        """Test parsing of stats report options"""
+        args = self.parser.parse_args(['stats', '--by', 'week', '--heatmap'])
+        self.assertEqual(args.mode, 'stats')
+        self.assertEqual(args.by, 'week')
+        self.assertTrue(args.heatmap)
+        
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['stats', '--by', 'year'])
+    
+    def test_stats_history_arguments(self):
+        """Test parsing of stats export, import and merge"""
+        args = self.parser.parse_args(['stats', 'export', 'laptop.jsonl'])
+        self.assertEqual((args.mode, args.action, args.files), ('stats', 'export', ['laptop.jsonl']))
+        
+        args = self.parser.parse_args(['stats', 'merge', 'a.jsonl', 'b.csv', '-o', 'all.jsonl'])
+        self.assertEqual(args.files, ['a.jsonl', 'b.csv'])
+        self.assertEqual(args.output, 'all.jsonl')
+        
+        args = self.parser.parse_args(['long'])
+        self.assertIsNone(args.action)
+        self.assertEqual(args.files, [])
+    
+    def test_display_argument(self):
+        """Test parsing of the countdown display mode"""
+        self.assertIsNone(self.parser.parse_args(['long']).display)
+        self.assertEqual(self.parser.parse_args(['long', '--display', 'full']).display, 'full')
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['long', '--display', 'fancy'])
+    
     def test_no_arguments(self):
         """Test parsing with no arguments"""
         args = self.parser.parse_args([])
@@ -50,5 +84,61 @@ class TestCLI(unittest.TestCase):
         self.assertFalse(args.list_modes)
 
 
+
+def import_times(code, env, cwd):
+    """Map each module imported by running code to its own import time in ms"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            env=env, cwd=cwd, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(self_us) / 1000
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    """Informational commands must stay cheap to start"""
+    
+    HEAVY_MODULES = ('src.audio', 'src.stats', 'src.storage', 'src.noise', 'src.daemon',
+                     'sqlite3', 'subprocess', 'platform', 'json', 'datetime', 'asyncio')
+    
+    # The cost of Python itself and of argparse, which every command pays
+    BASELINE = "import argparse; p = argparse.ArgumentParser(); p.add_argument('-x'); p.parse_args([])"
+    
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.env = dict(os.environ, HOME=self.home)
+        self.root = os.path.join(os.path.dirname(__file__), '..')
+    
+    def tearDown(self):
+        shutil.rmtree(self.home)
+    
+    def run_cli(self, *argv):
+        code = f"import sys; sys.argv = {['samaya', *argv]!r}; from src.cli import main; main()"
+        return import_times(code, self.env, self.root)
+    
+    def test_informational_commands_stay_light(self):
+        """Test that --version, --help and --list-modes skip the heavy subsystems"""
+        for argv in (['--version'], ['--help'], ['--list-modes']):
+            imported = self.run_cli(*argv)
+            self.assertIn('src.cli', imported)
+            for module in self.HEAVY_MODULES:
+                self.assertNotIn(module, imported, f"{' '.join(argv)} imported {module}")
+            self.assertFalse(os.path.exists(os.path.join(self.home, '.samaya')))
+    
+    def test_startup_budget(self):
+        """Test that samaya's own imports fit in the startup budget"""
+        baseline = set(import_times(self.BASELINE, self.env, self.root))
+        for argv in (['--version'], ['--help'], ['--list-modes']):
+            # Best of three runs to keep scheduler noise out of the number
+            costs = []
+            for _ in range(3):
+                imported = self.run_cli(*argv)
+                costs.append(sum(ms for module, ms in imported.items() if module not in baseline))
+            self.assertLess(min(costs), STARTUP_BUDGET_MS, f"{' '.join(argv)} took {min(costs):.1f} ms to import")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
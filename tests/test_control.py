@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import threading
+import time
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.countdown import Countdown
+from src.control import ControlServer
+from src.client import DaemonClient, DaemonError
+
+
+@unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "needs Unix domain sockets")
+class TestControlServer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.test_dir, 'session.sock')
+        self.countdown = Countdown(60)
+        self.server = ControlServer(self.countdown, {'type': 'long', 'minutes': 1}, self.socket_path)
+        self.assertTrue(self.server.start())
+        self.result = []
+        self.thread = threading.Thread(target=lambda: self.result.append(self.countdown.run(lambda s: None)))
+        self.thread.start()
+    
+    def tearDown(self):
+        self.countdown.abort()
+        self.thread.join(5)
+        self.server.stop()
+        shutil.rmtree(self.test_dir)
+    
+    def test_status_pause_resume_extend_abort(self):
+        """Test the full command set over one persistent connection"""
+        with DaemonClient(self.socket_path) as client:
+            session = client.request('status')['session']
+            self.assertEqual(session['type'], 'long')
+            self.assertEqual(session['state'], 'running')
+            
+            paused = client.request('pause')['session']
+            self.assertEqual(paused['state'], 'paused')
+            time.sleep(0.05)
+            self.assertEqual(client.request('status')['session']['remaining'], paused['remaining'])
+            with self.assertRaises(DaemonError):
+                client.request('pause')
+            
+            self.assertEqual(client.request('resume')['session']['state'], 'running')
+            extended = client.request('extend', seconds=120)['session']
+            self.assertEqual(extended['duration'], 180)
+            self.assertGreater(extended['remaining'], 170)
+            
+            client.request('abort')
+        
+        self.thread.join(5)
+        self.assertEqual(self.result, [False])
+    
+    def test_round_trip_latency(self):
+        """Test that status requests on a persistent connection are sub-millisecond"""
+        with DaemonClient(self.socket_path) as client:
+            client.request('status')
+            start = time.perf_counter()
+            for _ in range(200):
+                client.request('status')
+            average = (time.perf_counter() - start) / 200
+        self.assertLess(average, 0.001)
+    
+    def test_invalid_requests(self):
+        """Test that bad requests get an error instead of closing the connection"""
+        with DaemonClient(self.socket_path) as client:
+            with self.assertRaises(DaemonError):
+                client.request('explode')
+            with self.assertRaises(DaemonError):
+                client.request('extend', seconds=-5)
+            self.assertTrue(client.request('status')['ok'])
+    
+    def test_stop_removes_socket(self):
+        """Test that stopping the server cleans up its socket"""
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
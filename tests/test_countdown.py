@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.clock import ManualClock, SystemClock
+from src.countdown import Countdown
+
+
+class TestCountdown(unittest.TestCase):
+    
+    def setUp(self):
+        self.clock = ManualClock()
+        self.ticks = []
+    
+    def test_long_session_ticks_every_second(self):
+        """Test a simulated 25 minute session shows each second exactly once"""
+        Countdown(25 * 60, self.clock).run(self.ticks.append)
+        
+        self.assertEqual(self.ticks, list(range(1500, 0, -1)))
+        self.assertEqual(self.clock.now(), 1500)
+        self.assertEqual(self.clock.sleeps, 1500)
+    
+    def test_slow_redraw_does_not_drift(self):
+        """Test that the cost of drawing is not added to each second"""
+        def slow_tick(seconds_left):
+            self.ticks.append(seconds_left)
+            self.clock.advance(0.3)
+        
+        Countdown(60, self.clock).run(slow_tick)
+        
+        self.assertEqual(self.ticks, list(range(60, 0, -1)))
+        self.assertEqual(self.clock.now(), 60)
+    
+    def test_suspend_skips_ahead(self):
+        """Test that time spent suspended counts towards the session"""
+        def suspend_once(seconds_left):
+            self.ticks.append(seconds_left)
+            if seconds_left == 100:
+                self.clock.advance(50)
+        
+        Countdown(120, self.clock).run(suspend_once)
+        
+        self.assertEqual(self.ticks[:21], list(range(120, 99, -1)))
+        self.assertEqual(self.ticks[21], 50)
+        self.assertEqual(self.clock.now(), 120)
+    
+    def test_suspend_past_deadline_ends_session(self):
+        """Test that resuming after the deadline ends immediately"""
+        def suspend(seconds_left):
+            self.ticks.append(seconds_left)
+            self.clock.advance(3600)
+        
+        Countdown(60, self.clock).run(suspend)
+        self.assertEqual(self.ticks, [60])
+    
+    def test_pause_resume_and_extend(self):
+        """Test that pausing freezes and extending adds to the remaining time"""
+        countdown = Countdown(60, self.clock)
+        
+        def control(seconds_left):
+            self.ticks.append(seconds_left)
+            if seconds_left == 50 and countdown.duration == 60:
+                countdown.pause()
+                self.clock.advance(1000)
+                self.assertEqual(countdown.remaining(), 50)
+                countdown.extend(30)
+                countdown.resume()
+        
+        self.assertTrue(countdown.run(control))
+        self.assertEqual(self.ticks, list(range(60, 49, -1)) + list(range(80, 0, -1)))
+        self.assertEqual(countdown.duration, 90)
+        self.assertEqual(countdown.state, 'finished')
+    
+    def test_abort(self):
+        """Test that an aborted countdown returns early"""
+        countdown = Countdown(60, self.clock)
+        
+        def abort_at_half(seconds_left):
+            if seconds_left == 30:
+                countdown.abort()
+        
+        self.assertFalse(countdown.run(abort_at_half))
+        self.assertEqual(self.clock.now(), 30)
+        self.assertFalse(countdown.pause())
+        self.assertFalse(countdown.extend(10))
+    
+    def test_remaining(self):
+        """Test remaining time before and after starting"""
+        countdown = Countdown(90, self.clock)
+        self.assertEqual(countdown.remaining(), 90)
+        countdown.start()
+        self.clock.advance(30)
+        self.assertEqual(countdown.remaining(), 60)
+        self.clock.advance(100)
+        self.assertEqual(countdown.remaining(), 0)
+    
+    def test_system_clock_is_monotonic(self):
+        """Test that the system clock never goes backwards"""
+        clock = SystemClock()
+        first = clock.now()
+        clock.sleep(0.01)
+        self.assertGreater(clock.now(), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
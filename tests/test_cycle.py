@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import sys
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.cycle import CyclePlan, CycleCheckpoint
+from src.timer import SessionTimer
+from src.stats import SessionStats
+from src.clock import ManualClock
+
+
+class TestCyclePlan(unittest.TestCase):
+    
+    def test_default_plan(self):
+        """Test four long sessions with short breaks, then a medium long break"""
+        plan = CyclePlan.parse()
+        self.assertEqual([(s.kind, s.type, s.minutes) for s in plan.segments()], [
+            ('work', 'long', 25), ('break', 'short', 5),
+            ('work', 'long', 25), ('break', 'short', 5),
+            ('work', 'long', 25), ('break', 'short', 5),
+            ('work', 'long', 25), ('break', 'medium', 15),
+        ])
+        self.assertEqual(plan.total_minutes(), 130)
+    
+    def test_minutes_and_repeats(self):
+        """Test plans written with minutes and run several times"""
+        plan = CyclePlan.parse('2×50,10,30', cycles=2)
+        kinds = [(s.kind, s.type, s.minutes) for s in plan.segments()]
+        self.assertEqual(kinds[:4], [('work', 'custom', 50), ('break', 'custom', 10),
+                                     ('work', 'custom', 50), ('break', 'custom', 30)])
+        self.assertEqual(len(kinds), 8)
+        self.assertEqual(plan.spec, '2x50,10,30')
+        self.assertEqual(CyclePlan.parse(plan.spec).spec, plan.spec)
+    
+    def test_invalid_plans(self):
+        """Test that malformed plans are rejected with a message"""
+        for spec in ('long,short', 'fourxlong,short,medium', '4xlong,short,forever', '4xlong,0,short', '0xlong,short,medium'):
+            with self.assertRaises(ValueError):
+                CyclePlan.parse(spec)
+
+
+class TestRunCycle(unittest.TestCase):
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.checkpoint = CycleCheckpoint(self.test_dir / 'cycle.json')
+        self.timer = SessionTimer(clock=ManualClock(), control=False)
+        self.timer.stats = SessionStats(stats_dir=self.test_dir, backend='json')
+        self.noise_starts = []
+        self.bells = []
+        self.timer.audio_player.start_brown_noise = lambda: self.noise_starts.append(True)
+        self.timer.audio_player.play_bell_sound = lambda: self.bells.append(True)
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_full_cycle_in_one_process(self):
+        """Test that every segment runs with one noise start and work sessions are logged"""
+        self.timer._show_remaining = lambda seconds_left: None
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.timer.run_cycle(CyclePlan.parse('2xshort,1,2'), checkpoint=self.checkpoint))
+        self.assertTrue(self.timer.wait_for_completion())
+        
+        self.assertEqual(len(self.noise_starts), 1)
+        self.assertEqual(len(self.bells), 4)
+        self.assertEqual(self.timer.clock.now(), (5 + 1 + 5 + 2) * 60)
+        summary = self.timer.stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 2)
+        self.assertEqual(summary['total_minutes'], 10)
+        self.assertFalse(self.checkpoint.path.exists())
+    
+    def test_backed_up_pool_still_logs(self):
+        """Test that sessions the worker pool had no room for are logged when the cycle ends"""
+        self.timer._show_remaining = lambda seconds_left: None
+        submit = self.timer.workers.submit
+        self.timer.workers.submit = lambda fn, *args: None if fn == self.timer._log_records else submit(fn, *args)
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.timer.run_cycle(CyclePlan.parse('2xshort,1,2')))
+        self.assertTrue(self.timer.wait_for_completion())
+        self.assertEqual(self.timer.stats.get_summary()['total_sessions'], 2)
+    
+    def test_resume_from_checkpoint(self):
+        """Test that an interrupted cycle restarts at the segment it stopped in"""
+        plan = CyclePlan.parse('2xshort,1,2')
+        
+        def interrupt(seconds_left):
+            # Stop during the break after the first work session
+            if self.checkpoint.load()[1] == 1:
+                raise KeyboardInterrupt
+        self.timer._show_remaining = interrupt
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertFalse(self.timer.run_cycle(plan, checkpoint=self.checkpoint))
+        self.assertIn('samaya cycle --resume', output.getvalue())
+        self.timer.wait_for_completion()
+        
+        resumed_plan, start = self.checkpoint.load()
+        self.assertEqual((resumed_plan.spec, start), (plan.spec, 1))
+        self.timer._show_remaining = lambda seconds_left: None
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(self.timer.run_cycle(resumed_plan, start, self.checkpoint))
+        self.timer.wait_for_completion()
+        self.assertEqual(self.timer.stats.get_summary()['total_sessions'], 2)
+        self.assertIsNone(self.checkpoint.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
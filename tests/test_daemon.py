@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+import unittest
+import asyncio
+import itertools
+import tempfile
+import shutil
+import threading
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.daemon import TimerDaemon
+from src.client import DaemonClient, DaemonError
+
+
+class RecordingStats:
+    """Stand-in for SessionStats that remembers what was logged"""
+    
+    def __init__(self):
+        self.logged = []
+        self.lock = threading.Lock()
+    
+    def log_session(self, session_type, duration_minutes, completed=True):
+        with self.lock:
+            self.logged.append((session_type, duration_minutes, completed))
+
+
+@unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "needs Unix domain sockets")
+class TestTimerDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.test_dir, 'daemon.sock')
+        self.stats = RecordingStats()
+        self.daemon = TimerDaemon(self.socket_path, stats=self.stats)
+        self.loop = asyncio.new_event_loop()
+    
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.test_dir)
+    
+    def expire_sessions(self, count):
+        """Run count sessions due within 0.2 s of each other on a fresh daemon; returns it and their lateness"""
+        daemon = TimerDaemon(os.path.join(self.test_dir, 'jitter.sock'), stats=RecordingStats())
+        lateness = []
+        
+        async def scenario():
+            await daemon.start()
+            expire = daemon.scheduler.on_expire
+            
+            def record(session, late):
+                lateness.append(late)
+                expire(session, late)
+            
+            daemon.scheduler.on_expire = record
+            # The first deadline is due after every session is scheduled, so
+            # only the scheduler's own lateness is measured
+            for index in range(count):
+                seconds = 0.2 + (index % 100) * 0.002
+                daemon.start_session('custom', seconds / 60, bell=False)
+            while daemon.completed < count:
+                await asyncio.sleep(0.01)
+            daemon.stop()
+            await daemon.serve()
+        
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.wait_for(scenario(), 10))
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
+        return daemon, sorted(lateness)
+    
+    def test_many_concurrent_sessions_expire_on_time(self):
+        """Test that thousands of sessions expire within 10 ms"""
+        count = 5000
+        # A shared CI machine sometimes stalls the whole process for tens of
+        # milliseconds, which no scheduler can hide; the best of three runs
+        # filters that out, while a slower scheduler fails every run
+        for attempt in range(3):
+            daemon, lateness = self.expire_sessions(count)
+            self.assertEqual(daemon.completed, count)
+            self.assertEqual(len(daemon.stats.logged), count)
+            self.assertFalse(os.path.exists(daemon.socket_path))
+            if lateness[int(count * 0.99)] < 0.01 and lateness[-1] < 0.05:
+                break
+        self.assertLess(lateness[int(count * 0.99)], 0.01)
+        self.assertLess(lateness[-1], 0.05)
+        self.assertEqual(lateness[-1], daemon.max_lateness)
+    
+    def test_client_start_attach_and_cancel(self):
+        """Test the thin client against a daemon running in a thread"""
+        self.loop.run_until_complete(self.daemon.start())
+        thread = threading.Thread(target=self.loop.run_until_complete, args=(self.daemon.serve(),))
+        thread.start()
+        try:
+            ticks = []
+            with DaemonClient(self.socket_path) as client:
+                session = client.request('start', type='short', minutes=1.5 / 60, bell=False)['session']
+                self.assertEqual(session['state'], 'running')
+                self.assertEqual(len(client.request('list')['sessions']), 1)
+                self.assertEqual(client.attach(session['id'], ticks.append), 'completed')
+            self.assertEqual(ticks, [2, 1])
+            
+            with DaemonClient(self.socket_path) as client:
+                session = client.request('start', type='long', minutes=25)['session']
+                cancelled = client.request('cancel', id=session['id'])['session']
+                self.assertEqual(cancelled['state'], 'cancelled')
+                with self.assertRaises(DaemonError):
+                    client.request('status', id=session['id'])
+        finally:
+            self.loop.call_soon_threadsafe(self.daemon.stop)
+            thread.join(5)
+        
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.assertEqual(self.stats.logged, [('short', 1.5 / 60, True), ('long', 25, False)])
+    
+    def test_list_pages_many_sessions(self):
+        """Test that listing thousands of sessions arrives in pages that fit a frame"""
+        self.loop.run_until_complete(self.daemon.start())
+        for _ in range(3000):
+            self.daemon.start_session('long', 25, bell=False)
+        # Replies too large for a frame come back as errors instead of dropping the connection
+        for _ in range(3):
+            self.daemon.start_session('x' * 25000, 25, bell=False)
+        thread = threading.Thread(target=self.loop.run_until_complete, args=(self.daemon.serve(),))
+        thread.start()
+        try:
+            with DaemonClient(self.socket_path) as client:
+                page = client.request('list', limit=10 ** 6)
+                self.assertEqual((len(page['sessions']), page['total'], page['next']), (200, 3003, '200'))
+                sessions = [session['id'] for session in itertools.islice(client.list_sessions(), 3000)]
+                self.assertEqual(sessions, [str(index) for index in range(1, 3001)])
+                with self.assertRaises(DaemonError) as raised:
+                    client.request('list', after=3000)
+                self.assertIn('too large', str(raised.exception))
+                self.assertEqual(client.request('status', id='1')['session']['state'], 'running')
+        finally:
+            self.loop.call_soon_threadsafe(self.daemon.stop)
+            thread.join(5)
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+    
+    def test_pause_resume_extend(self):
+        """Test that paused sessions do not expire and extensions move the deadline"""
+        async def scenario():
+            await self.daemon.start()
+            session = self.daemon.start_session('short', 0.1 / 60, bell=False)
+            self.daemon.pause_session(session)
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.daemon.completed, 0)
+            self.assertEqual(self.daemon.handle_request({'cmd': 'status'})['session']['state'], 'paused')
+            
+            self.daemon.resume_session(session)
+            self.daemon.handle_request({'cmd': 'extend', 'seconds': 0.1})
+            await asyncio.sleep(0.15)
+            self.assertEqual(self.daemon.completed, 0)
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.daemon.completed, 1)
+            self.daemon.stop()
+            await self.daemon.serve()
+        
+        self.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.assertEqual(len(self.stats.logged), 1)
+        self.assertAlmostEqual(self.stats.logged[0][1], 0.2 / 60)
+    
+    def test_unknown_command(self):
+        """Test that bad requests are rejected without killing the daemon"""
+        with self.assertRaises(ValueError):
+            self.daemon.handle_request({'cmd': 'explode'})
+        with self.assertRaises(ValueError):
+            self.daemon.handle_request({'cmd': 'start', 'minutes': -1})
+    
+    def test_starts_without_stats_directory(self):
+        """Test that the daemon creates ~/.samaya on a fresh install"""
+        home = os.path.join(self.test_dir, 'home')
+        os.mkdir(home)
+        with mock.patch.dict(os.environ, {'HOME': home}):
+            daemon = TimerDaemon(stats=self.stats)
+        
+        async def scenario():
+            await daemon.start()
+            self.assertTrue(os.path.exists(os.path.join(home, '.samaya', 'daemon.sock')))
+            daemon.stop()
+            await daemon.serve()
+        
+        self.loop.run_until_complete(asyncio.wait_for(scenario(), 5))
+    
+    def test_client_without_daemon(self):
+        """Test a helpful error when no daemon is running"""
+        with self.assertRaises(DaemonError):
+            DaemonClient(self.socket_path).connect()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import tempfile
+import shutil
+import threading
+import time
+import sys
+import os
+from contextlib import redirect_stdout, redirect_stderr
+from pathlib import Path
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.events import SessionEvent, Hook, EventBus, load_hooks
+from src.metrics import metrics
+from src.clock import ManualClock
+from src.timer import SessionTimer
+from src.constants import EVENT_KINDS
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_hooks_get_their_events_in_order(self):
+        """Test that hooks see the kinds they subscribed to, in emit order"""
+        bus = EventBus()
+        default, ticks = [], []
+        bus.register(default.append)
+        bus.register(ticks.append, events=['tick'])
+        self.assertTrue(bus.wants('tick'))
+        for kind, remaining in (('start', 60), ('tick', 59), ('pause', 59), ('complete', 0)):
+            bus.emit(SessionEvent(kind, 'long', 25, remaining))
+        self.assertTrue(bus.drain(5))
+        self.assertEqual([event.kind for event in default], ['start', 'pause', 'complete'])
+        self.assertEqual([event.remaining for event in ticks], [59])
+        self.assertEqual(default[0].as_dict()['type'], 'long')
+        with self.assertRaises(ValueError):
+            Hook(print, events=['finish'])
+    
+    def test_slow_hook_never_blocks_emit(self):
+        """Test that a stuck hook drops ticks before other events, without holding up emit"""
+        bus = EventBus()
+        release = threading.Event()
+        seen = []
+        slow = bus.register(lambda event: release.wait(5) and seen.append(event.kind), events=EVENT_KINDS)
+        fast = []
+        bus.register(fast.append, events=['complete'])
+        
+        start = time.monotonic()
+        bus.emit(SessionEvent('start', 'short', 5, 300))
+        for remaining in range(299, 199, -1):
+            bus.emit(SessionEvent('tick', 'short', 5, remaining))
+        bus.emit(SessionEvent('complete', 'short', 5, 0))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(bus.pool.dropped, 0)
+        
+        # The fast hook is not stuck behind the slow one
+        deadline = time.monotonic() + 5
+        while not fast and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([event.kind for event in fast], ['complete'])
+        
+        release.set()
+        self.assertTrue(bus.drain(5))
+        self.assertEqual(seen[0], 'start')
+        self.assertEqual(seen[-1], 'complete')
+        self.assertEqual(len(seen) + slow.dropped, 102)
+        self.assertGreater(slow.dropped, 0)
+    
+    def test_failures_latency_and_timeouts_are_recorded(self):
+        """Test that every call is timed per hook and failures and overruns are counted"""
+        metrics.reset()
+        metrics.enable()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+        
+        def broken(event):
+            raise RuntimeError("no dashboard")
+        
+        bus = EventBus()
+        failing = bus.register(broken, name='dashboard')
+        overrunning = bus.register(lambda event: time.sleep(0.05), name='dnd', timeout=0.01)
+        with redirect_stdout(io.StringIO()) as output:
+            bus.emit(SessionEvent('start', 'long', 25, 1500))
+            bus.emit(SessionEvent('abort', 'long', 25, 1000))
+            self.assertTrue(bus.drain(5))
+        
+        # Nothing is printed over the countdown; failures are reported afterwards
+        self.assertEqual(output.getvalue(), '')
+        report = io.StringIO()
+        bus.report_failures(report)
+        bus.report_failures(report)
+        self.assertEqual(report.getvalue(), 'Hook dashboard failed 2 times, last on abort: no dashboard\n')
+        self.assertEqual((failing.calls, failing.failures), (2, 2))
+        self.assertEqual((overrunning.calls, overrunning.timeouts), (2, 2))
+        self.assertEqual(metrics.histogram('samaya_hook_seconds', hook='dnd').count, 2)
+        self.assertGreaterEqual(metrics.histogram('samaya_hook_seconds', hook='dnd').max, 0.05)
+        self.assertEqual(metrics.counter('samaya_hook_failures', hook='dashboard'), 2)
+        self.assertEqual(metrics.counter('samaya_hook_timeouts', hook='dnd'), 2)
+
+
+class TestHooksFile(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.hooks_file = Path(self.test_dir, 'hooks.json')
+    
+    def write_hooks(self, hooks):
+        with open(self.hooks_file, 'w') as f:
+            json.dump({'hooks': hooks}, f)
+    
+    def test_commands_get_the_event(self):
+        """Test that command hooks receive the event in their environment and on stdin"""
+        status = Path(self.test_dir, 'status')
+        self.write_hooks([
+            {'name': 'status', 'events': ['start', 'complete'],
+             'command': ['sh', '-c', f'echo "$SAMAYA_EVENT $SAMAYA_SESSION_TYPE $SAMAYA_REMAINING" >> {status}; cat >> {status}; echo >> {status}']},
+            {'events': ['start']},
+            {'command': 'true', 'events': ['finish']}
+        ])
+        with redirect_stdout(io.StringIO()) as output:
+            hooks = load_hooks(self.hooks_file)
+        self.assertEqual([hook.name for hook in hooks if hook.name == 'status'], ['status'])
+        self.assertIn('Skipping hook 2', output.getvalue())
+        self.assertIn('Skipping hook 3', output.getvalue())
+        
+        bus = EventBus(hooks)
+        bus.emit(SessionEvent('start', 'medium', 15, 900))
+        bus.emit(SessionEvent('tick', 'medium', 15, 899))
+        bus.emit(SessionEvent('complete', 'medium', 15, 0))
+        self.assertTrue(bus.drain(10))
+        lines = status.read_text().splitlines()
+        self.assertEqual(lines[0], 'start medium 900')
+        self.assertEqual(json.loads(lines[1])['event'], 'start')
+        self.assertEqual(lines[2], 'complete medium 0')
+    
+    def test_slow_command_is_killed(self):
+        """Test that a command running past its timeout is killed and counted"""
+        self.write_hooks([{'command': 'sleep 5', 'timeout': 0.1}])
+        hook, = load_hooks(self.hooks_file)
+        bus = EventBus([hook])
+        start = time.monotonic()
+        bus.emit(SessionEvent('start', 'short', 5, 300))
+        self.assertTrue(bus.drain(5))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual((hook.name, hook.timeouts, hook.failures), ('sleep', 1, 0))
+    
+    def test_missing_or_broken_file(self):
+        """Test that no hooks file means no hooks, and a broken one is reported"""
+        self.assertEqual([hook for hook in load_hooks(self.hooks_file) if isinstance(hook, Hook)
+                          and hasattr(hook, 'command')], [])
+        self.hooks_file.write_text('{"hooks": ')
+        with redirect_stdout(io.StringIO()) as output:
+            load_hooks(self.hooks_file)
+        self.assertIn('Could not read', output.getvalue())
+
+
+class TestTimerEvents(unittest.TestCase):
+
+    def test_session_emits_events(self):
+        """Test that a session reports start, ticks, control changes and completion"""
+        timer = SessionTimer(clock=ManualClock(), control=False)
+        timer.audio_player.start_brown_noise = lambda: False
+        timer.audio_player.play_bell_sound = lambda: None
+        timer.stats.log_session = lambda *args, **kwargs: None
+        timer.events = EventBus()
+        seen = []
+        # Room for every tick, so none are dropped while the test thread runs ahead
+        timer.events.register(Hook(seen.append, EVENT_KINDS, queue_size=200))
+        
+        show_remaining = timer._show_remaining
+        
+        def control(seconds_left):
+            show_remaining(seconds_left)
+            if seconds_left == 30 and timer.countdown.duration == 60:
+                timer.countdown.extend(60)
+                timer.countdown.pause()
+                timer.countdown.resume()
+        
+        timer._show_remaining = control
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(timer.start_custom_session(1))
+        self.assertTrue(timer.wait_for_completion(5))
+        
+        kinds = [event.kind for event in seen]
+        self.assertEqual(kinds[0], 'start')
+        self.assertEqual(kinds[30:35], ['tick', 'extend', 'pause', 'resume', 'tick'])
+        self.assertEqual(kinds.count('tick'), 31 + 90)
+        self.assertEqual(kinds[-1], 'complete')
+        self.assertEqual((seen[0].minutes, seen[0].remaining), (1, 60))
+        self.assertEqual((seen[-1].minutes, seen[-1].remaining), (2, 0))
+    
+    def test_hooks_load_off_the_main_thread(self):
+        """Test that events wait for the hooks to load instead of the countdown"""
+        timer = SessionTimer(clock=ManualClock(), control=False)
+        timer.current_session = {'type': 'long', 'minutes': 25}
+        loading = threading.Event()
+        seen = []
+        
+        def slow_load_hooks():
+            loading.wait(5)
+            return [Hook(seen.append, ['start', 'pause'])]
+        
+        with mock.patch('src.events.load_hooks', slow_load_hooks):
+            timer._emit('start', 1500)
+            timer._emit('tick', 1499)
+            timer._emit('pause', 1400)
+            self.assertIsNone(timer._events)
+            loading.set()
+            self.assertTrue(timer.wait_for_completion(5))
+        self.assertEqual([(event.kind, event.remaining) for event in seen], [('start', 1500), ('pause', 1400)])
+        self.assertLessEqual(seen[0].time, seen[1].time)
+    
+    def test_hook_failures_are_reported_after_the_session(self):
+        """Test that a failing hook leaves the countdown alone and is reported once it is over"""
+        timer = SessionTimer(clock=ManualClock(), control=False, display='line')
+        timer.audio_player.start_brown_noise = lambda: False
+        timer.audio_player.play_bell_sound = lambda: None
+        timer.stats.log_session = lambda *args, **kwargs: None
+        timer.events = EventBus()
+        
+        def broken(event):
+            raise RuntimeError("no lamp")
+        
+        timer.events.register(broken, events=['tick'], name='lamp')
+        with redirect_stdout(io.StringIO()) as output, redirect_stderr(io.StringIO()) as errors:
+            self.assertTrue(timer.start_custom_session(1))
+            self.assertNotIn('lamp', output.getvalue() + errors.getvalue())
+            self.assertTrue(timer.wait_for_completion(5))
+        self.assertNotIn('lamp', output.getvalue())
+        self.assertRegex(errors.getvalue(), r'^Hook lamp failed \d+ times, last on tick: no lamp\n$')
+
+
+if __name__ == '__main__':
+    unittest.main()
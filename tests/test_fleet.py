@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import unittest
+import errno
+import io
+import tempfile
+import shutil
+import sys
+import os
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.constants import SUMMARY_CACHE_NAME
+from src.fleet import find_stores, aggregate_stores, display_aggregate
+from src.stats import SessionStats, profile_stats_dir, list_profiles
+
+
+class TestProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        environ = mock.patch.dict(os.environ, {'SAMAYA_STATS_DIR': self.test_dir})
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop('SAMAYA_PROFILE', None)
+    
+    def test_profile_directories(self):
+        """Test that profiles live under the stats directory and keep separate stores"""
+        self.assertEqual(profile_stats_dir(), Path(self.test_dir))
+        self.assertEqual(profile_stats_dir('work'), Path(self.test_dir, 'profiles', 'work'))
+        with mock.patch.dict(os.environ, {'SAMAYA_PROFILE': 'home'}):
+            self.assertEqual(SessionStats().stats_dir, Path(self.test_dir, 'profiles', 'home'))
+        for name in ('../etc', '.hidden', 'a/b'):
+            with self.assertRaises(ValueError):
+                profile_stats_dir(name)
+        
+        SessionStats(profile='work').log_session('long', 25)
+        SessionStats(profile='home').log_session('short', 5)
+        self.assertEqual(SessionStats(profile='work').get_summary()['sessions_by_type']['long'], 1)
+        self.assertEqual(SessionStats(profile='work').get_summary()['total_sessions'], 1)
+        self.assertEqual(SessionStats().get_summary()['total_sessions'], 0)
+        self.assertEqual(list_profiles(), ['home', 'work'])
+
+
+class TestAggregate(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        backends = ('json', 'sqlite', 'binary')
+        for index in range(6):
+            stats = SessionStats(Path(self.test_dir, f"team{index % 2}", f"user{index}"), backend=backends[index % 3])
+            stats.log_sessions([stats.make_record('long', 25)] * (index + 1) + [stats.make_record('short', 5, False)])
+            stats.close()
+    
+    def test_find_stores(self):
+        """Test that stores of every backend are found at any depth"""
+        stores = sorted(find_stores(self.test_dir))
+        self.assertEqual(len(stores), 6)
+        self.assertEqual({backend for _, backend in stores}, {'json', 'sqlite', 'binary'})
+    
+    def test_parallel_matches_serial(self):
+        """Test that the process pool merges to the same totals as one process"""
+        serial = aggregate_stores(self.test_dir, jobs=1)
+        parallel = aggregate_stores(self.test_dir, jobs=3)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial['stores'], 6)
+        self.assertEqual(serial['summary']['total_sessions'], 21 + 6)
+        self.assertEqual(serial['summary']['total_minutes'], 21 * 25)
+        self.assertEqual(serial['summary']['sessions_by_type']['short'], 6)
+        day = next(iter(serial['rollups']['days'].values()))
+        self.assertEqual(day, [27, 21, 525])
+    
+    def test_unreadable_store_is_reported(self):
+        """Test that a broken store is skipped and named instead of failing the run"""
+        broken = Path(self.test_dir, 'broken')
+        broken.mkdir()
+        (broken / 'stats.db').write_bytes(b'not a database' * 100)
+        result = aggregate_stores(self.test_dir, jobs=2)
+        self.assertEqual(result['stores'], 6)
+        self.assertEqual([path for path, _ in result['failed']], [str(broken)])
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            display_aggregate(result, self.test_dir, by='week')
+        self.assertIn('Stores: 6', output.getvalue())
+        self.assertIn(f'Skipped {broken}', output.getvalue())
+    
+    def test_read_only_stores(self):
+        """Test that stores that cannot be written are summarized without writing to them"""
+        real_open = os.open
+        
+        def read_only(path, flags, *args):
+            if flags & (os.O_WRONLY | os.O_RDWR | os.O_CREAT):
+                raise PermissionError(errno.EACCES, 'Permission denied', path)
+            return real_open(path, flags, *args)
+        
+        with mock.patch('src.locking.os.open', side_effect=read_only):
+            result = aggregate_stores(self.test_dir, jobs=1)
+        self.assertEqual(result['failed'], [])
+        self.assertEqual(result['stores'], 6)
+        self.assertEqual(result['summary']['total_sessions'], 21 + 6)
+        self.assertEqual(list(Path(self.test_dir).rglob(SUMMARY_CACHE_NAME)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
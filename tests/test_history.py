@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import tempfile
+import shutil
+import sys
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.history import (
+    session_id, history_format, write_history, read_history, sort_history, merge_history, merge_files
+)
+from src.stats import SessionStats
+
+
+def session(minute, session_type='long', duration=25, completed=True):
+    return {
+        'timestamp': f"2025-07-{1 + minute // 1440:02d}T{minute // 60 % 24:02d}:{minute % 60:02d}:00.123456",
+        'type': session_type,
+        'duration': duration,
+        'completed': completed
+    }
+
+
+class TestHistoryFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+    
+    def test_ids_survive_store_rounding(self):
+        """Test that IDs ignore what the binary store drops"""
+        record = session(10, 'short', 5)
+        rounded = dict(record, timestamp=record['timestamp'][:19], duration=5.0)
+        self.assertEqual(session_id(record), session_id(rounded))
+        self.assertEqual(session_id(dict(record, type='tea')), session_id(dict(record, type='custom')))
+        self.assertNotEqual(session_id(record), session_id(dict(record, completed=False)))
+        self.assertNotEqual(session_id(record), session_id(session(11, 'short', 5)))
+    
+    def test_round_trip(self):
+        """Test that both formats read back what was written"""
+        records = [session(1), session(2, 'custom', 12.5, False)]
+        for fmt in ('jsonl', 'csv'):
+            f = io.StringIO()
+            self.assertEqual(write_history(records, f, fmt), 2)
+            f.seek(0)
+            self.assertEqual(list(read_history(f, fmt)), records)
+            self.assertIn(session_id(records[1]), f.getvalue())
+    
+    def test_bad_rows_name_the_line(self):
+        """Test that malformed records are rejected with their line number"""
+        f = io.StringIO(json.dumps(session(1)) + "\n\n" + '{"timestamp": "yesterday"}\n')
+        with self.assertRaisesRegex(ValueError, r"in.jsonl:3"):
+            list(read_history(f, 'jsonl', 'in.jsonl'))
+        f = io.StringIO("timestamp,type,duration,completed\n2025-07-01T10:00:00,long,-1,true\n")
+        with self.assertRaisesRegex(ValueError, r"in.csv:2"):
+            list(read_history(f, 'csv', 'in.csv'))
+        with self.assertRaises(ValueError):
+            history_format('stats.json')
+    
+    def test_sort_spills_runs(self):
+        """Test that inputs larger than a run are sorted through temporary runs"""
+        records = [session(minute) for minute in (7, 3, 9, 1, 4, 8, 2, 6, 5, 0)]
+        ordered = [record for _, record in sort_history(records, run_size=3)]
+        self.assertEqual(ordered, sorted(records, key=lambda record: record['timestamp']))
+    
+    def test_merge_drops_duplicates(self):
+        """Test that sessions present in several inputs are kept once, in time order"""
+        laptop = [session(5), session(1), session(3)]
+        server = [session(2), session(3), session(1), session(1)]
+        merged = list(merge_history([laptop, server], run_size=2))
+        self.assertEqual(merged, [session(1), session(2), session(3), session(5)])
+    
+    def test_merge_files(self):
+        """Test merging a JSONL and a CSV file into one of the inputs"""
+        first = os.path.join(self.test_dir, 'laptop.jsonl')
+        second = os.path.join(self.test_dir, 'server.csv')
+        with open(first, 'w') as f:
+            write_history([session(1), session(2)], f)
+        with open(second, 'w', newline='') as f:
+            write_history([session(2), session(3)], f, 'csv')
+        self.assertEqual(merge_files([first, second], first), 3)
+        with open(first) as f:
+            self.assertEqual(list(read_history(f)), [session(1), session(2), session(3)])
+        self.assertFalse(os.path.exists(first + '.tmp'))
+
+
+class TestStatsHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+    
+    def test_import_skips_stored_sessions(self):
+        """Test that importing a history twice, or over an export, adds nothing twice"""
+        for backend in ('json', 'sqlite', 'binary'):
+            with self.subTest(backend=backend):
+                stats_dir = Path(self.test_dir, backend)
+                stats = SessionStats(stats_dir, backend=backend)
+                self.addCleanup(stats.backend.close)
+                history = stats_dir.with_suffix('.jsonl')
+                now = stats.make_record('long', 25)
+                stats.log_sessions([now])
+                with open(history, 'w') as f:
+                    write_history([now, dict(now, type='short', duration=5)], f)
+                
+                self.assertEqual(stats.import_history([history]), (1, 1, 0))
+                self.assertEqual(stats.import_history([history, history]), (0, 4, 0))
+                self.assertEqual(stats.get_summary()['total_sessions'], 2)
+                
+                exported = stats_dir.with_suffix('.csv')
+                self.assertEqual(stats.export_history(exported), 2)
+                self.assertEqual(stats.import_history([exported]), (0, 2, 0))
+    
+    def test_import_older_history_keeps_ranges(self):
+        """Test that history older than the stored sessions is found by range queries"""
+        for backend in ('sqlite', 'binary'):
+            with self.subTest(backend=backend):
+                stats_dir = Path(self.test_dir, backend)
+                stats = SessionStats(stats_dir, backend=backend)
+                self.addCleanup(stats.backend.close)
+                stats.log_sessions([stats.make_record('long', 25)])
+                history = stats_dir.with_suffix('.jsonl')
+                older = [dict(session(minute * 60), timestamp=f"2020-01-{10 - minute:02d}T09:00:00")
+                         for minute in range(5)]
+                with open(history, 'w') as f:
+                    write_history(older, f)
+                
+                self.assertEqual(stats.import_history([history]), (5, 0, 0))
+                january = stats.query_sessions('2020-01-01', '2020-02-01')
+                self.assertEqual([record['timestamp'] for record in january],
+                                 sorted(record['timestamp'] for record in older))
+                self.assertEqual(stats.get_range_summary('2020-01-01', '2020-02-01')['sessions'], 5)
+                self.assertEqual(len(stats.query_sessions(since='2021-01-01')), 1)
+    
+    def test_reimport_after_compaction(self):
+        """Test that sessions folded into daily totals are not imported again"""
+        stats = SessionStats(self.test_dir)
+        history = os.path.join(self.test_dir, 'old.jsonl')
+        old = dict(stats.make_record('long', 25),
+                   timestamp=(datetime.now() - timedelta(days=60)).isoformat())
+        with open(history, 'w') as f:
+            write_history([old], f)
+        
+        self.assertEqual(stats.import_history([history]), (1, 0, 0))
+        self.assertTrue(stats.compact())
+        self.assertEqual(stats.query_sessions(), [])
+        self.assertEqual(stats.import_history([history]), (0, 0, 1))
+        self.assertEqual(stats.get_summary()['total_sessions'], 1)
+    
+    def test_bad_file_imports_nothing(self):
+        """Test that a file that does not parse leaves the store untouched"""
+        stats = SessionStats(self.test_dir)
+        history = os.path.join(self.test_dir, 'bad.jsonl')
+        with open(history, 'w') as f:
+            write_history([stats.make_record('long', 25)], f)
+            f.write('not json\n')
+        with self.assertRaises(ValueError):
+            stats.import_history([history])
+        self.assertEqual(stats.get_summary()['total_sessions'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
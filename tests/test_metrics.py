@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import tempfile
+import shutil
+import urllib.request
+import sys
+import os
+from contextlib import redirect_stdout
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.metrics import Metrics, metrics, serve_http
+from src.constants import PHASE_METRIC, TICK_LATENESS_METRIC
+from src.clock import ManualClock
+from src.stats import SessionStats
+from src.audio import AudioPlayer
+from src.timer import SessionTimer
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_disabled_registry_records_nothing(self):
+        """Test that spans and counters are no-ops until enabled"""
+        registry = Metrics()
+        first = registry.span('noise_start')
+        with first:
+            pass
+        self.assertIs(registry.span('bell'), first)
+        registry.count('samaya_sessions')
+        registry.mark('startup')
+        self.assertEqual(registry.counter('samaya_sessions'), 0)
+        self.assertIsNone(registry.histogram(PHASE_METRIC, phase='noise_start'))
+        self.assertEqual(registry.to_openmetrics(), "# EOF\n")
+    
+    def test_spans_counters_and_marks(self):
+        """Test that enabled spans, counters and one-shot marks are recorded"""
+        registry = Metrics()
+        registry.enable()
+        for _ in range(3):
+            with registry.span('stats_write'):
+                pass
+        registry.count('samaya_sessions', type='long', completed='true')
+        registry.count('samaya_sessions', 2, completed='true', type='long')
+        registry.mark('startup')
+        registry.mark('startup')
+        
+        self.assertEqual(registry.histogram(PHASE_METRIC, phase='stats_write').count, 3)
+        self.assertEqual(registry.histogram(PHASE_METRIC, phase='startup').count, 1)
+        self.assertEqual(registry.counter('samaya_sessions', type='long', completed='true'), 3)
+        report = registry.format_report()
+        self.assertIn('stats_write', report)
+        self.assertIn('samaya_sessions{completed=true,type=long}', report)
+    
+    def test_openmetrics_text(self):
+        """Test the OpenMetrics rendering of histograms and counters"""
+        registry = Metrics()
+        registry.enable()
+        registry.observe(PHASE_METRIC, 0.003, phase='bell')
+        registry.observe(PHASE_METRIC, 2.0, phase='bell')
+        registry.count('samaya_audio_failures', operation='bell')
+        lines = registry.to_openmetrics().splitlines()
+        
+        self.assertIn(f'# TYPE {PHASE_METRIC} histogram', lines)
+        self.assertIn(f'{PHASE_METRIC}_bucket{{phase="bell",le="0.001"}} 0', lines)
+        self.assertIn(f'{PHASE_METRIC}_bucket{{phase="bell",le="0.005"}} 1', lines)
+        self.assertIn(f'{PHASE_METRIC}_bucket{{phase="bell",le="+Inf"}} 2', lines)
+        self.assertIn(f'{PHASE_METRIC}_count{{phase="bell"}} 2', lines)
+        self.assertIn(f'{PHASE_METRIC}_sum{{phase="bell"}} 2.003', lines)
+        self.assertIn('# TYPE samaya_audio_failures counter', lines)
+        self.assertIn('samaya_audio_failures_total{operation="bell"} 1', lines)
+        self.assertEqual(lines[-1], '# EOF')
+    
+    def test_http_endpoint(self):
+        """Test that the daemon endpoint serves the registry"""
+        registry = Metrics()
+        registry.enable()
+        registry.count('samaya_sessions', type='short', completed='false')
+        server = serve_http(registry, 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertIn('application/openmetrics-text', response.headers['Content-Type'])
+            body = response.read().decode('utf-8')
+        self.assertIn('samaya_sessions_total{completed="false",type="short"} 1', body)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+    
+    def test_stats_writes_and_sessions_are_counted(self):
+        """Test that log_sessions times the write and counts sessions by outcome"""
+        stats = SessionStats(stats_dir=self.test_dir)
+        stats.log_session('long', 25)
+        stats.log_session('short', 2, completed=False)
+        self.assertEqual(metrics.histogram(PHASE_METRIC, phase='stats_write').count, 2)
+        self.assertEqual(metrics.counter('samaya_sessions', type='long', completed='true'), 1)
+        self.assertEqual(metrics.counter('samaya_sessions', type='short', completed='false'), 1)
+    
+    def test_audio_failures_are_counted(self):
+        """Test that a brown noise start that fails is timed and counted"""
+        player = AudioPlayer(engine='file')
+        player.audio_dir = self.test_dir
+        with redirect_stdout(io.StringIO()):
+            self.assertFalse(player.start_brown_noise())
+        self.assertEqual(metrics.histogram(PHASE_METRIC, phase='noise_start').count, 1)
+        self.assertEqual(metrics.counter('samaya_audio_failures', operation='noise_start'), 1)
+    
+    def test_session_records_startup_and_tick_lateness(self):
+        """Test that a session marks startup once and measures every tick"""
+        timer = SessionTimer(clock=ManualClock(), control=False)
+        timer.audio_player.start_brown_noise = lambda: False
+        timer.audio_player.play_bell_sound = lambda: None
+        timer.stats = SessionStats(stats_dir=Path(self.test_dir))
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(timer.start_custom_session(1))
+            self.assertTrue(timer.start_custom_session(1))
+        self.assertTrue(timer.wait_for_completion(5))
+        
+        self.assertEqual(metrics.histogram(PHASE_METRIC, phase='startup').count, 1)
+        lateness = metrics.histogram(TICK_LATENESS_METRIC)
+        self.assertEqual(lateness.count, 120)
+        self.assertEqual(lateness.max, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
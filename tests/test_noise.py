@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import threading
+import wave
+import tempfile
+import shutil
+import sys
+import os
+from unittest import mock
+from array import array
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.noise import (
+    BrownNoise, NoiseEngine, WarmOutput, FULL_SCALE, bell_pcm, play_pcm, synthesize_bell, wav_header,
+    _import_numpy
+)
+from src.audio import AudioPlayer, Mpg123Remote
+
+
+def samples(pcm):
+    values = array('h', pcm)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def lag_one_correlation(values):
+    mean = sum(values) / len(values)
+    centered = [v - mean for v in values]
+    variance = sum(c * c for c in centered)
+    return sum(a * b for a, b in zip(centered, centered[1:])) / variance
+
+
+class RecordingSink:
+    """PCM sink that keeps what it is given"""
+    
+    def __init__(self, sample_rate, wanted=3):
+        self.sample_rate = sample_rate
+        self.blocks = []
+        self.finished = False
+        self.closed = threading.Event()
+        self.enough = threading.Event()
+        self.wanted = wanted
+    
+    def write(self, pcm):
+        if self.closed.is_set():
+            raise ValueError("write to closed sink")
+        self.blocks.append(pcm)
+        if len(self.blocks) >= self.wanted:
+            self.enough.set()
+            # Block like a full sound card until stopped
+            self.closed.wait()
+    
+    def finish(self):
+        self.finished = True
+    
+    def close(self):
+        self.closed.set()
+
+
+class PacedSink:
+    """Sound card stand-in that accepts samples at the playback rate"""
+    
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.blocks = []
+        self.closed = threading.Event()
+    
+    def write(self, pcm):
+        if self.closed.wait(len(pcm) / 2 / self.sample_rate):
+            raise ValueError("write to closed sink")
+        self.blocks.append(pcm)
+    
+    def finish(self):
+        self.closed.set()
+    
+    def close(self):
+        self.closed.set()
+
+
+def wait_for(condition, timeout=5):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.005)):
+        if condition():
+            return True
+        event.wait(0.005)
+    return condition()
+
+
+class TestBrownNoise(unittest.TestCase):
+
+    def check_brown(self, noise):
+        values = []
+        for _ in range(20):
+            block = noise.block()
+            self.assertEqual(len(block), noise.block_frames * 2)
+            values.extend(samples(block))
+        self.assertTrue(all(-FULL_SCALE <= v <= FULL_SCALE for v in values))
+        # Neighbouring samples of brown noise are strongly correlated
+        self.assertGreater(lag_one_correlation(values), 0.95)
+        # The leak keeps the walk centred instead of drifting to full scale
+        rms = (sum(v * v for v in values) / len(values)) ** 0.5
+        self.assertLess(rms, 0.25 * FULL_SCALE)
+        self.assertGreater(rms, 0.01 * FULL_SCALE)
+    
+    def test_array_blocks(self):
+        """Test the pure Python generator"""
+        self.check_brown(BrownNoise(volume=0.3, seed=1, use_numpy=False))
+    
+    @unittest.skipUnless(_import_numpy(), "numpy is not installed")
+    def test_numpy_blocks(self):
+        """Test the vectorized generator"""
+        self.check_brown(BrownNoise(volume=0.3, seed=1, use_numpy=True))
+    
+    def test_seed_is_reproducible(self):
+        """Test that a seeded generator repeats itself"""
+        first = BrownNoise(seed=7, use_numpy=False)
+        second = BrownNoise(seed=7, use_numpy=False)
+        self.assertEqual(first.block(), second.block())
+    
+    def test_wav_header(self):
+        """Test that header and samples form a valid WAV file"""
+        pcm = BrownNoise(seed=3, use_numpy=False).block()
+        with wave.open(io.BytesIO(wav_header(22050, len(pcm) // 2) + pcm)) as wav:
+            self.assertEqual(wav.getnchannels(), 1)
+            self.assertEqual(wav.getsampwidth(), 2)
+            self.assertEqual(wav.getframerate(), 22050)
+            self.assertEqual(wav.readframes(wav.getnframes()), pcm)
+    
+    def test_bell_is_built_once(self):
+        """Test that the bell buffer is synthesized once and decays"""
+        bell = bell_pcm(sample_rate=8000)
+        self.assertIs(bell_pcm(sample_rate=8000), bell)
+        self.assertEqual(bell, synthesize_bell(8000))
+        values = samples(bell)
+        head = max(abs(v) for v in values[:800])
+        tail = max(abs(v) for v in values[-800:])
+        self.assertGreater(head, 10 * tail)
+
+
+class TestNoiseEngine(unittest.TestCase):
+
+    def test_streams_until_stopped(self):
+        """Test that blocks flow to the sink until stop()"""
+        sinks = []
+        
+        def factory(sample_rate):
+            sinks.append(RecordingSink(sample_rate))
+            return sinks[-1]
+        
+        engine = NoiseEngine(BrownNoise(seed=1, use_numpy=False), sink_factory=factory)
+        self.assertTrue(engine.start())
+        self.assertTrue(sinks[0].enough.wait(5))
+        engine.stop()
+        self.assertTrue(sinks[0].closed.is_set())
+        self.assertEqual(engine.blocks_written, 3)
+        self.assertEqual(len(sinks[0].blocks), 3)
+        self.assertIsNone(engine.sink)
+    
+    def test_no_sink(self):
+        """Test that a missing audio output is reported, not raised"""
+        engine = NoiseEngine(sink_factory=lambda sample_rate: None)
+        self.assertFalse(engine.start())
+        engine.stop()
+        self.assertFalse(play_pcm(b'\0\0', sink_factory=lambda sample_rate: None))
+    
+    def test_play_pcm_finishes(self):
+        """Test that one-shot playback drains the sink"""
+        sink = RecordingSink(8000, wanted=10)
+        self.assertTrue(play_pcm(b'\1\0' * 100, 8000, sink_factory=lambda sample_rate: sink))
+        self.assertEqual(sink.blocks, [b'\1\0' * 100])
+        self.assertTrue(sink.finished)
+
+
+class TestAudioPlayerEngine(unittest.TestCase):
+
+    def test_engine_selection(self):
+        """Test engine names from the argument and the environment"""
+        self.assertEqual(AudioPlayer('file').engine, 'file')
+        with self.assertRaises(ValueError):
+            AudioPlayer('vinyl')
+        os.environ['SAMAYA_AUDIO_ENGINE'] = 'generated'
+        try:
+            self.assertEqual(AudioPlayer().engine, 'generated')
+        finally:
+            del os.environ['SAMAYA_AUDIO_ENGINE']
+    
+    def test_generated_noise_uses_warm_output(self):
+        """Test that sessions share one sink for noise and the bell"""
+        sinks = []
+        
+        def factory(sample_rate):
+            sinks.append(PacedSink(sample_rate))
+            return sinks[-1]
+        
+        output = WarmOutput(sink_factory=factory, block_frames=256)
+        self.addCleanup(output.close)
+        player = AudioPlayer('generated', output=output)
+        short_bell = mock.patch('src.noise.bell_pcm', return_value=b'\0\0' * 512)
+        short_bell.start()
+        self.addCleanup(short_bell.stop)
+        for _ in range(3):
+            self.assertTrue(player.start_brown_noise())
+            self.assertIsNone(player.brown_noise_process)
+            self.assertTrue(wait_for(lambda: sinks[0].blocks))
+            player.pause_brown_noise()
+            player.resume_brown_noise()
+            player.stop_brown_noise()
+            self.assertIsNone(player.noise_engine)
+            player.play_bell_sound()
+        self.assertEqual(len(sinks), 1)
+        self.assertFalse(sinks[0].closed.is_set())
+
+
+class TestWarmOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.sinks = []
+        self.output = WarmOutput(sample_rate=8000, sink_factory=self.factory, block_frames=80)
+        self.addCleanup(self.output.close)
+    
+    def factory(self, sample_rate):
+        self.sinks.append(PacedSink(sample_rate))
+        return self.sinks[-1]
+    
+    def noise(self):
+        return BrownNoise(sample_rate=8000, block_frames=80, seed=1, use_numpy=False)
+    
+    def test_stale_voice_does_not_stop_the_next_noise(self):
+        """Test that stopping an old session's noise late leaves the new one playing"""
+        first = self.output.start_noise(self.noise())
+        second = self.output.start_noise(self.noise())
+        self.assertFalse(first.stop())
+        self.assertFalse(first.pause())
+        written = self.output.blocks_written
+        self.assertTrue(wait_for(lambda: self.output.blocks_written > written + 2))
+        self.assertTrue(second.stop())
+    
+    def test_pause_stops_writing(self):
+        """Test that a paused voice writes nothing until resumed"""
+        voice = self.output.start_noise(self.noise())
+        self.assertTrue(wait_for(lambda: self.output.blocks_written))
+        voice.pause()
+        # Let a write in progress land
+        threading.Event().wait(0.05)
+        written = self.output.blocks_written
+        threading.Event().wait(0.1)
+        self.assertEqual(self.output.blocks_written, written)
+        voice.resume()
+        self.assertTrue(wait_for(lambda: self.output.blocks_written > written))
+    
+    def test_clips_play_ahead_of_noise(self):
+        """Test that a bell is written whole, in blocks, while noise plays"""
+        self.output.start_noise(self.noise())
+        clip = b'\1\0' * 200
+        self.assertTrue(self.output.play(clip, timeout=5))
+        blocks = self.sinks[0].blocks
+        start = blocks.index(clip[:160])
+        self.assertEqual(b''.join(blocks[start:start + 3]), clip)
+    
+    def test_idle_output_is_released(self):
+        """Test that the sink closes after idle_timeout and reopens on demand"""
+        self.output.idle_timeout = 0.05
+        self.assertTrue(self.output.play(b'\0\0' * 10, timeout=5))
+        self.assertTrue(wait_for(lambda: self.output.sink is None))
+        self.assertTrue(self.sinks[0].closed.is_set())
+        self.assertTrue(self.output.play(b'\0\0' * 10, timeout=5))
+        self.assertEqual(self.output.sinks_opened, 2)
+    
+    def test_no_sink(self):
+        """Test that a missing audio output is reported, not raised"""
+        output = WarmOutput(sink_factory=lambda sample_rate: None)
+        self.assertIsNone(output.start_noise(self.noise()))
+        self.assertFalse(output.play(b'\0\0'))
+
+
+@unittest.skipIf(sys.platform == 'win32', "uses a shell script as mpg123")
+class TestMpg123Remote(unittest.TestCase):
+
+    def test_one_process_serves_every_session(self):
+        """Test that noise is loaded, paused and stopped over one mpg123 -R"""
+        bin_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, bin_dir)
+        log = os.path.join(bin_dir, 'commands')
+        stub = os.path.join(bin_dir, 'mpg123')
+        with open(stub, 'w') as f:
+            f.write(f'#!/bin/sh\ncat >> "{log}"\n')
+        os.chmod(stub, 0o755)
+        
+        remote = Mpg123Remote()
+        with mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ.get('PATH', '')}):
+            first = remote.play('/noise.mp3')
+            first.pause()
+            first.pause()
+            first.resume()
+            first.stop()
+            second = remote.play('/noise.mp3')
+            self.assertFalse(first.stop())
+            second.stop()
+        remote.process.stdin.close()
+        remote.process.wait(5)
+        
+        self.assertEqual(remote.spawned, 1)
+        with open(log) as f:
+            self.assertEqual(f.read().splitlines(), [
+                'LOAD /noise.mp3', 'PAUSE', 'PAUSE', 'STOP', 'LOAD /noise.mp3', 'STOP'
+            ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import records
+from src.records import RECORD, HEADER, MAGIC, VERSION, RecordFile, FLAG_COMPLETED, FLAG_AGGREGATE
+
+
+def write_records(path, rows):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        for row in rows:
+            f.write(RECORD.pack(*row))
+
+
+class TestRecordFormat(unittest.TestCase):
+
+    def test_pack_roundtrip(self):
+        """Test that a session survives packing, to the second"""
+        record = {'timestamp': '2025-07-10T14:30:05.250000', 'type': 'long', 'duration': 25, 'completed': True}
+        fields = RECORD.unpack(records.pack_record(record))
+        self.assertEqual(RECORD.size, 16)
+        self.assertEqual(records.unpack_record(fields), dict(record, timestamp='2025-07-10T14:30:05'))
+    
+    def test_unknown_types_and_fractional_minutes(self):
+        """Test the type enum fallback and sub-minute durations"""
+        record = {'timestamp': '2025-07-10T14:30:00', 'type': 'focus', 'duration': 12.35, 'completed': False}
+        unpacked = records.unpack_record(RECORD.unpack(records.pack_record(record)))
+        self.assertEqual(unpacked['type'], 'custom')
+        self.assertEqual(unpacked['duration'], 12.35)
+        self.assertFalse(unpacked['completed'])
+    
+    def test_period_bounds(self):
+        """Test period keys and boundaries in local time"""
+        epoch = records.to_epoch('2025-07-10T14:30:00')
+        key, start, end = records.period_bounds(epoch, 'week')
+        self.assertEqual(key, '2025-07-07')
+        self.assertEqual(start, records.to_epoch('2025-07-07T00:00:00'))
+        self.assertEqual(end, records.to_epoch('2025-07-14T00:00:00'))
+        self.assertEqual(records.period_bounds(epoch, 'month')[0], '2025-07')
+        self.assertEqual(records.period_bounds(epoch, 'hour')[0], '14')
+
+
+class TestRecordFile(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'sessions.bin')
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_scan_and_bisect_across_chunks(self):
+        """Test bounded scans over more records than one chunk"""
+        count = records.SCAN_CHUNK * 2 + 10
+        write_records(self.path, [(1000 + i, 60, i % 4, FLAG_COMPLETED, 1) for i in range(count)])
+        with RecordFile(self.path) as record_file:
+            self.assertEqual(len(record_file), count)
+            self.assertEqual(record_file.bisect(1000 + 5000), 5000)
+            self.assertEqual(sum(1 for _ in record_file.scan()), count)
+            bounded = list(record_file.scan(1000 + 10, 1000 + 20))
+            self.assertEqual([row[0] for row in bounded], list(range(1010, 1020)))
+            summary = records.summarize(record_file.scan())
+        self.assertEqual(summary['total_sessions'], count)
+        self.assertEqual(summary['total_minutes'], count)
+    
+    def test_abandoned_scan_releases_the_map(self):
+        """Test that closing the file after a partial scan does not fail"""
+        write_records(self.path, [(1000 + i, 60, 0, 0, 1) for i in range(10)])
+        record_file = RecordFile(self.path)
+        rows = record_file.scan()
+        next(rows)
+        rows.close()
+        record_file.close()
+    
+    def test_missing_empty_and_foreign_files(self):
+        """Test files that hold no records"""
+        self.assertEqual(len(RecordFile(self.path)), 0)
+        open(self.path, 'wb').close()
+        self.assertEqual(list(RecordFile(self.path).scan()), [])
+        with open(self.path, 'wb') as f:
+            f.write(b'{"sessions": []}' * 4)
+        with self.assertRaises(ValueError):
+            RecordFile(self.path)
+    
+    def test_aggregate_records_count_many_sessions(self):
+        """Test that aggregates add their count but stay off the hour grid"""
+        day = records.to_epoch('2025-07-10T00:00:00')
+        write_records(self.path, [
+            (day, 30 * 60, 2, FLAG_COMPLETED | FLAG_AGGREGATE, 3),
+            (day + 9 * 3600, 25 * 60, 2, FLAG_COMPLETED, 1),
+            (day + 10 * 3600, 25 * 60, 2, 0, 1),
+        ])
+        with RecordFile(self.path) as record_file:
+            rows = records.aggregate(record_file.scan(), 'day')
+            rollups = records.rollups(record_file.scan())
+        self.assertEqual(rows, [{'period': '2025-07-10', 'sessions': 5, 'completed': 4, 'minutes': 55}])
+        self.assertEqual(rollups['days'], {'2025-07-10': [5, 4, 55]})
+        self.assertEqual(rollups['hours'][3][9], 1)
+        self.assertEqual(sum(map(sum, rollups['hours'])), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import re
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.render import (
+    LineRenderer, LogRenderer, JsonRenderer, FullScreenRenderer, Renderer, make_renderer, LEAVE_SCREEN
+)
+
+
+class Screen:
+    """Just enough of a terminal to replay what a renderer wrote"""
+    
+    CONTROL = re.compile(r'\033\[(\?\d+[hl]|\d+;\d+H|H|2J|K)|\r\n|[\r\b]')
+    
+    def __init__(self, columns=80, lines=24):
+        self.columns = columns
+        self.rows = [[' '] * columns for _ in range(lines)]
+        self.row = self.column = 0
+    
+    def feed(self, text):
+        position = 0
+        for match in self.CONTROL.finditer(text):
+            self._put(text[position:match.start()])
+            position = match.end()
+            code = match.group(0)
+            if code == '\r':
+                self.column = 0
+            elif code == '\b':
+                self.column = max(0, self.column - 1)
+            elif code == '\r\n':
+                self.row, self.column = self.row + 1, 0
+            elif code == '\033[K':
+                self.rows[self.row][self.column:] = [' '] * (self.columns - self.column)
+            elif code == '\033[H':
+                self.row = self.column = 0
+            elif code == '\033[2J':
+                self.rows = [[' '] * self.columns for _ in self.rows]
+            elif code.endswith('H'):
+                row, column = code[2:-1].split(';')
+                self.row, self.column = int(row) - 1, int(column) - 1
+        self._put(text[position:])
+    
+    def _put(self, text):
+        for char in text:
+            self.rows[self.row][self.column] = char
+            self.column += 1
+    
+    def line(self, row=0):
+        return ''.join(self.rows[row]).rstrip()
+    
+    def lines(self):
+        return [''.join(row) for row in self.rows]
+
+
+class Countdown:
+
+    def __init__(self, state, duration, remaining):
+        self.state = state
+        self.duration = duration
+        self._remaining = remaining
+    
+    def remaining(self):
+        return self._remaining
+
+
+class TestLineRenderer(unittest.TestCase):
+
+    def test_only_changes_are_written(self):
+        """Test that each tick rewrites only the characters that changed"""
+        output = io.StringIO()
+        renderer = LineRenderer(output)
+        renderer.begin('long', 1500)
+        screen = Screen()
+        for seconds_left in range(1500, 0, -1):
+            written = len(output.getvalue())
+            renderer.tick(seconds_left)
+            screen.feed(output.getvalue()[written:])
+        self.assertEqual(screen.line(), 'Time remaining: 00:01')
+        self.assertEqual(renderer.writes, 1500)
+        self.assertLess(len(output.getvalue()), 1500 * 5)
+    
+    def test_pause_is_shown_and_cleared(self):
+        """Test that pausing appends a marker that resuming erases"""
+        output = io.StringIO()
+        renderer = LineRenderer(output)
+        renderer.begin('short', 300)
+        renderer.tick(300)
+        renderer.update(Countdown('paused', 300, 299.5))
+        screen = Screen()
+        screen.feed(output.getvalue())
+        self.assertEqual(screen.line(), 'Time remaining: 05:00 (paused)')
+        renderer.update(Countdown('running', 300, 299.5))
+        renderer.update(Countdown('finished', 300, 0))
+        screen.feed(output.getvalue())
+        self.assertEqual(screen.line(), 'Time remaining: 05:00')
+        self.assertEqual(renderer.writes, 3)
+
+
+class TestLogRenderers(unittest.TestCase):
+
+    def test_log_lines(self):
+        """Test that logs get a line a minute and one per control change"""
+        output = io.StringIO()
+        renderer = LogRenderer(output)
+        renderer.begin('short', 290)
+        for seconds_left in range(290, 178, -1):
+            renderer.tick(seconds_left)
+        renderer.update(Countdown('paused', 290, 178.2))
+        renderer.update(Countdown('running', 290, 178.2))
+        renderer.update(Countdown('running', 350, 238.2))
+        self.assertEqual(output.getvalue().splitlines(), [
+            'Time remaining: 04:50', 'Time remaining: 04:00', 'Time remaining: 03:00',
+            'Paused: 02:59', 'Resumed: 02:59', 'Extended: 03:59'
+        ])
+    
+    def test_json_lines(self):
+        """Test that the structured mode writes one JSON object per line"""
+        output = io.StringIO()
+        renderer = JsonRenderer(output)
+        renderer.begin('long', 1500)
+        renderer.tick(1500)
+        renderer.update(Countdown('paused', 1500, 1499))
+        events = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(events[0], {'event': 'tick', 'type': 'long', 'state': 'running', 'remaining': 1500, 'duration': 1500})
+        self.assertEqual((events[1]['event'], events[1]['state']), ('pause', 'paused'))
+
+
+class TestFullScreenRenderer(unittest.TestCase):
+
+    def test_repaints_only_changed_cells(self):
+        """Test that the screen always matches the frame while most ticks write a few bytes"""
+        output = io.StringIO()
+        renderer = FullScreenRenderer(output, size=(60, 20))
+        renderer.begin('medium', 900)
+        screen = Screen(60, 20)
+        sizes = []
+        for seconds_left in range(900, 880, -1):
+            written = len(output.getvalue())
+            renderer.tick(seconds_left)
+            sizes.append(len(output.getvalue()) - written)
+            screen.feed(output.getvalue()[written:])
+            self.assertEqual(screen.lines(), renderer.frame(60, 20))
+        self.assertIn('Medium session', '\n'.join(screen.lines()))
+        self.assertEqual(renderer.writes, 20)
+        self.assertLess(max(sizes[1:]), sizes[0] / 2)
+        
+        renderer.update(Countdown('paused', 900, 880.5))
+        screen.feed(output.getvalue()[written + sizes[-1]:])
+        self.assertEqual(screen.lines(), renderer.frame(60, 20))
+        self.assertIn('paused', '\n'.join(screen.lines()))
+        renderer.end()
+        self.assertTrue(output.getvalue().endswith(LEAVE_SCREEN))
+    
+    def test_resize_repaints_everything(self):
+        """Test that a new terminal size clears and redraws the whole frame"""
+        output = io.StringIO()
+        renderer = FullScreenRenderer(output, size=(60, 20))
+        renderer.begin('short', 300)
+        renderer.tick(300)
+        renderer._fixed_size = (40, 12)
+        renderer._resized(None, None)
+        written = len(output.getvalue())
+        renderer.tick(299)
+        screen = Screen(40, 12)
+        screen.feed(output.getvalue()[written:])
+        self.assertEqual(screen.lines(), renderer.frame(40, 12))
+
+
+class TestMakeRenderer(unittest.TestCase):
+
+    def test_modes(self):
+        """Test that auto follows the output and SAMAYA_DISPLAY picks a default"""
+        terminal = io.StringIO()
+        terminal.isatty = lambda: True
+        with mock.patch.dict(os.environ, {'SAMAYA_DISPLAY': ''}):
+            self.assertIsInstance(make_renderer(stream=terminal), LineRenderer)
+            self.assertIsInstance(make_renderer(stream=io.StringIO()), LogRenderer)
+            self.assertIs(type(make_renderer('quiet')), Renderer)
+        with mock.patch.dict(os.environ, {'SAMAYA_DISPLAY': 'json'}):
+            self.assertIsInstance(make_renderer(stream=terminal), JsonRenderer)
+            self.assertIsInstance(make_renderer('full'), FullScreenRenderer)
+        with self.assertRaises(ValueError):
+            make_renderer('fancy')
+
+
+if __name__ == '__main__':
+    unittest.main()
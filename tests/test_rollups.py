@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import unittest
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.rollups import empty_rollups, apply_rollup, fold_days, group_days, find_streaks
+
+
+def make_record(timestamp, duration=25, completed=True):
+    return {'timestamp': timestamp, 'type': 'long', 'duration': duration, 'completed': completed}
+
+
+class TestRollups(unittest.TestCase):
+    
+    def test_apply_rollup(self):
+        """Test that records land in the daily and hourly buckets"""
+        rollups = empty_rollups()
+        apply_rollup(rollups, make_record('2025-07-10T09:15:00'))
+        apply_rollup(rollups, make_record('2025-07-10T09:45:00', completed=False))
+        
+        self.assertEqual(rollups['days'], {'2025-07-10': [2, 1, 25]})
+        # 2025-07-10 is a Thursday
+        self.assertEqual(rollups['hours'][3][9], 1)
+        self.assertEqual(sum(map(sum, rollups['hours'])), 1)
+    
+    def test_group_days_fills_gaps(self):
+        """Test grouping into continuous day, week and month periods"""
+        days = {'2025-07-01': [1, 1, 25], '2025-07-10': [2, 2, 30], '2025-06-30': [1, 0, 0]}
+        today = date(2025, 7, 10)
+        
+        rows = group_days(days, 'day', 3, today)
+        self.assertEqual([row['period'] for row in rows], ['2025-07-08', '2025-07-09', '2025-07-10'])
+        self.assertEqual([row['minutes'] for row in rows], [0, 0, 30])
+        
+        rows = group_days(days, 'week', 2, today)
+        self.assertEqual(rows, [
+            {'period': '2025-06-30', 'sessions': 2, 'completed': 1, 'minutes': 25},
+            {'period': '2025-07-07', 'sessions': 2, 'completed': 2, 'minutes': 30},
+        ])
+        
+        rows = group_days(days, 'month', 2, today)
+        self.assertEqual([(row['period'], row['sessions']) for row in rows], [('2025-06-01', 1), ('2025-07-01', 3)])
+    
+    def test_find_streaks(self):
+        """Test current and longest streak detection"""
+        days = {
+            '2025-07-01': [1, 1, 25], '2025-07-02': [1, 1, 25], '2025-07-03': [1, 1, 25],
+            '2025-07-05': [1, 0, 0],
+            '2025-07-08': [1, 1, 25], '2025-07-09': [1, 1, 25],
+        }
+        self.assertEqual(find_streaks(days, date(2025, 7, 10)), {'current': 2, 'longest': 3})
+        self.assertEqual(find_streaks(days, date(2025, 7, 11)), {'current': 0, 'longest': 3})
+        self.assertEqual(find_streaks({}, date(2025, 7, 11)), {'current': 0, 'longest': 0})
+
+    
+    def test_fold_days_into_months(self):
+        """Test downsampling old days while keeping streaks and monthly totals"""
+        rollups = empty_rollups()
+        rollups['days'] = {
+            '2025-05-30': [1, 1, 25], '2025-05-31': [2, 1, 25], '2025-06-01': [1, 1, 25],
+            '2025-06-02': [1, 0, 0], '2025-06-03': [1, 1, 25], '2025-06-04': [1, 1, 25],
+        }
+        self.assertEqual(fold_days(rollups, date(2025, 6, 2)), 3)
+        self.assertEqual(fold_days(rollups, date(2025, 6, 2)), 0)
+        self.assertEqual(rollups['months'], {'2025-05': [3, 2, 50], '2025-06': [1, 1, 25]})
+        self.assertEqual(list(rollups['days']), ['2025-06-02', '2025-06-03', '2025-06-04'])
+        self.assertEqual(rollups['streak'], {'day': '2025-06-01', 'run': 3, 'longest': 3})
+        
+        rows = group_days(rollups['days'], 'month', 2, date(2025, 6, 4), months=rollups['months'])
+        self.assertEqual([(row['period'], row['sessions'], row['minutes']) for row in rows],
+                         [('2025-05-01', 3, 50), ('2025-06-01', 4, 75)])
+        
+        # A run crossing the cutoff continues from the folded days
+        rollups['days']['2025-06-02'][1] = 1
+        streaks = find_streaks(rollups['days'], date(2025, 6, 4), streak=rollups['streak'])
+        self.assertEqual(streaks, {'current': 6, 'longest': 6})
+        fold_days(rollups, date(2025, 6, 5))
+        self.assertEqual(find_streaks(rollups['days'], date(2025, 6, 5), streak=rollups['streak']),
+                         {'current': 6, 'longest': 6})
+        self.assertEqual(find_streaks({}, date(2025, 6, 9), streak=rollups['streak']),
+                         {'current': 0, 'longest': 6})
+
+
+if __name__ == '__main__':
+    unittest.main()
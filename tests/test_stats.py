@@ -2,8 +2,10 @@
 
 import unittest
 import tempfile
+import json
 import os
 import sys
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
@@ -112,6 +114,126 @@ class TestSessionStats(unittest.TestCase):
         except Exception as e:
             self.fail(f"clear_stats() raised an exception: {e}")
 
+    
+    def test_log_session_appends_to_journal(self):
+        """Test that logging appends to the journal instead of rewriting the snapshot"""
+        self.stats.log_session('short', 5, completed=True)
+        self.stats.log_session('long', 25, completed=True)
+        
+        self.assertFalse(self.stats.stats_file.exists())
+        with open(self.stats.journal_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])['type'], 'long')
+    
+    def test_compact_folds_journal_into_snapshot(self):
+        """Test that compaction moves journal records into the snapshot"""
+        self.stats.log_session('short', 5, completed=True)
+        self.stats.log_session('medium', 15, completed=True)
+        self.assertTrue(self.stats.compact())
+        
+        self.assertEqual(self.stats.journal_file.stat().st_size, 0)
+        with open(self.stats.stats_file) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['total_sessions'], 2)
+        self.assertEqual(len(snapshot['sessions']), 2)
+        
+        self.stats.log_session('long', 25, completed=True)
+        summary = self.stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 3)
+        self.assertEqual(summary['total_minutes'], 45)
+    
+    def test_torn_journal_tail_is_ignored(self):
+        """Test that a partially written last record only loses that record"""
+        self.stats.log_session('short', 5, completed=True)
+        with open(self.stats.journal_file, 'ab') as f:
+            f.write(b'{"timestamp": "2025-07-10T10:00:00", "ty')
+        
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 1)
+        
+        # The next record must not be swallowed by the torn one
+        self.stats.log_session('medium', 15, completed=True)
+        summary = self.stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 2)
+        self.assertEqual(summary['total_minutes'], 20)
+    
+    def test_crash_during_compaction_does_not_double_count(self):
+        """Test that a snapshot written before the journal swap is not replayed twice"""
+        self.stats.log_session('short', 5, completed=True)
+        self.stats.log_session('medium', 15, completed=True)
+        
+        # Simulate a crash after the snapshot write but before the journal swap
+        stats, mark = self.stats.backend._replay()
+        stats['journal'] = {'inode': mark[0], 'offset': mark[1]}
+        self.stats.backend._save_snapshot(stats)
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 2)
+        
+        self.stats.log_session('long', 25, completed=False)
+        summary = self.stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 3)
+        self.assertEqual(summary['total_minutes'], 20)
+    
+    def test_corrupted_snapshot_is_preserved(self):
+        """Test that compaction keeps an unreadable snapshot aside"""
+        with open(self.stats.stats_file, 'w') as f:
+            f.write('{not json')
+        self.stats.log_session('short', 5, completed=True)
+        self.assertTrue(self.stats.compact())
+        
+        self.assertTrue((self.stats.stats_dir / 'stats.json.corrupt').exists())
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 1)
+
+    
+    def test_report_from_rollups(self):
+        """Test that reports come from the incrementally updated rollups"""
+        self.stats.log_session('short', 5, completed=True)
+        self.stats.log_session('long', 25, completed=True)
+        self.stats.log_session('long', 25, completed=False)
+        self.stats.compact()
+        
+        rows = self.stats.get_report('day')
+        self.assertEqual(len(rows), 14)
+        self.assertEqual(rows[-1]['sessions'], 3)
+        self.assertEqual(rows[-1]['completed'], 2)
+        self.assertEqual(rows[-1]['minutes'], 30)
+        self.assertEqual(self.stats.get_streaks(), {'current': 1, 'longest': 1})
+        self.assertEqual(sum(map(sum, self.stats.get_heatmap())), 2)
+    
+    def test_tiered_retention(self):
+        """Test that compaction downsamples by age instead of keeping the last 100 sessions"""
+        today = date.today()
+        backend = self.stats.backend
+        for days_ago in (400, 399, 100, 40):
+            timestamp = datetime.combine(today - timedelta(days=days_ago), time(9)).isoformat()
+            backend.append({'timestamp': timestamp, 'type': 'long', 'duration': 25, 'completed': True})
+        for index in range(150):
+            timestamp = datetime.combine(today - timedelta(days=index % 10), time(10)).isoformat()
+            backend.append({'timestamp': timestamp, 'type': 'short', 'duration': 5, 'completed': True})
+        self.assertTrue(self.stats.compact())
+        
+        stats = backend.load()
+        self.assertEqual(len(stats['sessions']), 150)
+        self.assertEqual(stats['total_sessions'], 154)
+        self.assertEqual(stats['total_minutes'], 850)
+        self.assertEqual(len(stats['rollups']['days']), 12)
+        self.assertEqual(sum(bucket[0] for bucket in stats['rollups']['months'].values()), 2)
+        
+        # Long-range reports still see the downsampled history
+        rows = self.stats.get_report('month', periods=15)
+        self.assertEqual(sum(row['minutes'] for row in rows), 850)
+        self.assertEqual(self.stats.get_range_summary()['sessions'], 150)
+        self.assertEqual(self.stats.get_streaks(), {'current': 10, 'longest': 10})
+    
+    def test_display_report_no_crash(self):
+        """Test that the report and heatmap displays don't crash"""
+        self.stats.log_session('short', 5, completed=True)
+        try:
+            for by in ('day', 'week', 'month'):
+                self.stats.display_report(by)
+            self.stats.display_heatmap()
+        except Exception as e:
+            self.fail(f"display_report() raised an exception: {e}")
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
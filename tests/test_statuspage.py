@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import subprocess
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.clock import ManualClock, SystemClock
+from src.countdown import Countdown
+from src.statuspage import StatusPage, read_status, format_status
+
+
+class TestStatusPage(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'status')
+        self.clock = ManualClock()
+        self.page = StatusPage(self.path)
+        self.assertTrue(self.page.open())
+    
+    def tearDown(self):
+        self.page.close()
+        shutil.rmtree(self.test_dir)
+    
+    def test_running_session_roundtrip(self):
+        """Test that readers compute the remaining time from the deadline"""
+        countdown = Countdown(25 * 60, self.clock)
+        countdown.listeners.append(lambda cd: self.page.publish_countdown('long', cd))
+        countdown.start()
+        self.clock.advance(90)
+        
+        status = read_status(self.path, self.clock)
+        self.assertEqual(status['state'], 'running')
+        self.assertEqual(status['type'], 'long')
+        self.assertEqual(status['remaining'], 25 * 60 - 90)
+        self.assertEqual(status['pid'], os.getpid())
+    
+    def test_paused_session_keeps_remaining(self):
+        """Test that a paused session reports its frozen remaining time"""
+        countdown = Countdown(5 * 60, self.clock)
+        countdown.listeners.append(lambda cd: self.page.publish_countdown('short', cd))
+        countdown.start()
+        self.clock.advance(60)
+        countdown.pause()
+        self.clock.advance(600)
+        
+        status = read_status(self.path, self.clock)
+        self.assertEqual(status['state'], 'paused')
+        self.assertEqual(status['remaining'], 4 * 60)
+    
+    def test_close_marks_page_idle(self):
+        """Test that closing the writer leaves an idle page behind"""
+        self.page.publish('running', 'medium', deadline=100.0, remaining=60.0, duration=900.0)
+        self.page.close()
+        self.assertEqual(read_status(self.path, self.clock)['state'], 'idle')
+    
+    def test_page_of_killed_process_reads_idle(self):
+        """Test that a session whose process died without closing the page is not reported"""
+        self.page.close()
+        writer = (
+            "import os, sys; sys.path.insert(0, sys.argv[2]); from src.statuspage import StatusPage; "
+            "page = StatusPage(sys.argv[1]); page.open(); "
+            "page.publish('running', 'long', deadline=1e12, remaining=1500.0, duration=1500.0); os._exit(0)"
+        )
+        subprocess.run([sys.executable, '-c', writer, self.path, os.path.join(os.path.dirname(__file__), '..')],
+                       check=True)
+        status = read_status(self.path, self.clock)
+        self.assertEqual((status['state'], status['remaining']), ('idle', 0.0))
+        self.assertNotEqual(status['pid'], os.getpid())
+    
+    def test_missing_or_foreign_page(self):
+        """Test that absent or unrelated files read as no status"""
+        self.assertIsNone(read_status(os.path.join(self.test_dir, 'missing')))
+        other = os.path.join(self.test_dir, 'other')
+        with open(other, 'wb') as f:
+            f.write(b'\0' * 64)
+        self.assertIsNone(read_status(other))
+    
+    def test_format_status(self):
+        """Test the fields available to --format"""
+        status = {'state': 'running', 'type': 'long', 'remaining': 754.2, 'duration': 1500.0, 'pid': 42}
+        self.assertEqual(format_status(status, '{type} {mmss}'), 'long 12:35')
+        self.assertEqual(format_status(status, '{mm}m{ss}s of {minutes} ({state}, {pid})'),
+                         '12m35s of 25 (running, 42)')
+        self.assertEqual(format_status(status, '{remaining}'), '755')
+
+
+class TestStatusCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.env = dict(os.environ, HOME=self.home)
+        self.root = os.path.join(os.path.dirname(__file__), '..')
+    
+    def tearDown(self):
+        shutil.rmtree(self.home)
+    
+    def status_imports(self):
+        """Modules imported by `samaya status`, and its exit code"""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'src.cli', 'status'],
+            cwd=self.root, env=self.env, capture_output=True, text=True
+        )
+        return result.returncode, {line.split('|')[-1].strip() for line in result.stderr.splitlines() if '|' in line}
+    
+    def test_status_command_stays_light(self):
+        """Test that `samaya status` avoids the timer, stats and audio stack"""
+        returncode, imported = self.status_imports()
+        self.assertEqual(returncode, 1)
+        for module in ('src.timer', 'src.stats', 'src.audio', 'sqlite3', 'subprocess', 'asyncio'):
+            self.assertNotIn(module, imported)
+        
+        page = StatusPage(os.path.join(self.home, '.samaya', 'status'))
+        self.assertTrue(page.open())
+        try:
+            page.publish('running', 'long', deadline=SystemClock().now() + 60, duration=1500.0)
+            returncode, imported = self.status_imports()
+        finally:
+            page.close()
+        self.assertEqual(returncode, 0)
+        for module in ('src.timer', 'src.stats', 'src.checkpoint', 'src.control', 'socket', 'json', 'threading'):
+            self.assertNotIn(module, imported)
+    
+    def test_status_command_prints_running_session(self):
+        """Test that a published session is printed in the requested format"""
+        page = StatusPage(os.path.join(self.home, '.samaya', 'status'))
+        self.assertTrue(page.open())
+        try:
+            page.publish('paused', 'medium', remaining=125.0, duration=900.0)
+            result = subprocess.run(
+                [sys.executable, '-m', 'src.cli', 'status', '--format', '{state} {type} {mmss}'],
+                cwd=self.root, env=self.env, capture_output=True, text=True
+            )
+        finally:
+            page.close()
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, 'paused medium 02:05\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
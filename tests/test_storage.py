@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import json
+import os
+import sys
+import shutil
+import multiprocessing
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.storage import JournalBackend, SQLiteBackend, BinaryBackend, SessionRecord, open_backend, period_key
+from src.stats import SessionStats
+
+
+def make_record(timestamp, session_type='long', duration=25, completed=True):
+    return {'timestamp': timestamp, 'type': session_type, 'duration': duration, 'completed': completed}
+
+
+class TestPeriodKey(unittest.TestCase):
+
+    def test_period_keys(self):
+        """Test bucketing of local ISO timestamps"""
+        timestamp = '2025-07-10T14:30:00.123456'
+        self.assertEqual(period_key(timestamp, 'hour'), '14')
+        self.assertEqual(period_key(timestamp, 'day'), '2025-07-10')
+        self.assertEqual(period_key(timestamp, 'week'), '2025-07-07')
+        self.assertEqual(period_key(timestamp, 'month'), '2025-07')
+
+    def test_unknown_period(self):
+        """Test that an unknown period is rejected"""
+        with self.assertRaises(ValueError):
+            period_key('2025-07-10T14:30:00', 'year')
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.backend = SQLiteBackend(self.test_dir)
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_summary_counts_every_session(self):
+        """Test that the totals table tracks all sessions"""
+        for day in range(1, 31):
+            self.backend.append(make_record(f'2025-06-{day:02d}T09:00:00'))
+        self.backend.append(make_record('2025-07-01T09:00:00', 'custom', 40, completed=False))
+
+        summary = self.backend.summary()
+        self.assertEqual(summary['total_sessions'], 31)
+        self.assertEqual(summary['total_minutes'], 750)
+        self.assertEqual(summary['sessions_by_type']['long'], 30)
+        self.assertEqual(summary['sessions_by_type']['custom'], 1)
+
+    def test_range_query_and_group_by(self):
+        """Test range filtering and grouping by day and month"""
+        self.backend.append(make_record('2025-06-30T23:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-01T09:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-01T11:00:00', 'long', 25, completed=False))
+        self.backend.append(make_record('2025-07-02T10:00:00', 'long', 25))
+
+        records = list(self.backend.query(since='2025-07-01', until='2025-07-02'))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['type'], 'short')
+        self.assertFalse(records[1]['completed'])
+
+        days = self.backend.aggregate('day', since='2025-07-01')
+        self.assertEqual(days, [
+            {'period': '2025-07-01', 'sessions': 2, 'completed': 1, 'minutes': 5},
+            {'period': '2025-07-02', 'sessions': 1, 'completed': 1, 'minutes': 25},
+        ])
+
+        months = self.backend.aggregate('month', session_type='long')
+        self.assertEqual(months, [{'period': '2025-07', 'sessions': 2, 'completed': 1, 'minutes': 25}])
+
+    def test_matches_journal_aggregation(self):
+        """Test that both backends bucket weeks the same way"""
+        journal_dir = self.test_dir / 'journal'
+        journal_dir.mkdir()
+        journal = JournalBackend(journal_dir)
+        for timestamp in ('2025-07-06T10:00:00', '2025-07-07T10:00:00', '2025-07-13T10:00:00'):
+            journal.append(make_record(timestamp))
+            self.backend.append(make_record(timestamp))
+        self.assertEqual(journal.aggregate('week'), self.backend.aggregate('week'))
+
+    def test_migrates_json_stats_on_first_use(self):
+        """Test that an existing stats.json is imported and retired"""
+        snapshot = {
+            'total_sessions': 150,
+            'sessions_by_type': {'short': 50, 'medium': 0, 'long': 100, 'custom': 0},
+            'total_minutes': 2750,
+            'sessions': [make_record('2025-07-01T09:00:00')]
+        }
+        with open(self.test_dir / 'stats.json', 'w') as f:
+            json.dump(snapshot, f)
+
+        backend = SQLiteBackend(self.test_dir)
+        backend.append(make_record('2025-07-02T09:00:00', 'short', 5))
+        summary = backend.summary()
+        self.assertEqual(summary['total_sessions'], 151)
+        self.assertEqual(summary['total_minutes'], 2755)
+        self.assertEqual(summary['sessions_by_type']['short'], 51)
+        self.assertEqual(len(list(backend.query())), 2)
+        self.assertFalse((self.test_dir / 'stats.json').exists())
+        self.assertTrue((self.test_dir / 'stats.json.migrated').exists())
+        backend.close()
+
+    def test_rollups_match_sessions(self):
+        """Test that rollup tables are kept in step with inserts"""
+        self.backend.append(make_record('2025-07-10T09:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-10T21:00:00', 'long', 25, completed=False))
+        self.backend.append(make_record('2025-07-11T09:00:00', 'long', 25))
+        
+        rollups = self.backend.rollups()
+        self.assertEqual(rollups['days'], {'2025-07-10': [2, 1, 5], '2025-07-11': [1, 1, 25]})
+        self.assertEqual(rollups['hours'][3][9], 1)
+        self.assertEqual(rollups['hours'][4][9], 1)
+        self.assertEqual(rollups['hours'][3][21], 0)
+    
+    def test_upgrade_backfills_rollups(self):
+        """Test that a version 1 database gets its rollups rebuilt"""
+        self.backend.append(make_record('2025-07-10T09:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-13T18:00:00', 'long', 25))
+        expected = self.backend.rollups()
+        
+        conn = self.backend.conn
+        conn.execute("DELETE FROM daily_rollups")
+        conn.execute("DELETE FROM hourly_rollups")
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        self.backend.close()
+        
+        self.assertEqual(self.backend.rollups(), expected)
+    
+    def test_clear_removes_database(self):
+        """Test clearing the database"""
+        self.backend.append(make_record('2025-07-01T09:00:00'))
+        self.backend.clear()
+        self.assertFalse(self.backend.exists())
+        self.assertEqual(self.backend.summary()['total_sessions'], 0)
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with self.assertRaises(ValueError):
+            open_backend('csv', self.test_dir)
+
+
+class TestBinaryBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.backend = BinaryBackend(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_summary_and_records_are_fixed_width(self):
+        """Test that every session costs one 16 byte record"""
+        for day in range(1, 31):
+            self.backend.append(make_record(f'2025-06-{day:02d}T09:00:00'))
+        self.backend.append(make_record('2025-07-01T09:00:00', 'custom', 12.5, completed=False))
+
+        summary = self.backend.summary()
+        self.assertEqual(summary['total_sessions'], 31)
+        self.assertEqual(summary['total_minutes'], 750)
+        self.assertEqual(summary['sessions_by_type']['custom'], 1)
+        self.assertEqual(os.path.getsize(self.test_dir / 'sessions.bin'), 16 + 31 * 16)
+        self.assertEqual(list(self.backend.query(completed=False))[0]['duration'], 12.5)
+
+    def test_range_query_and_group_by(self):
+        """Test range filtering and grouping by day and month"""
+        self.backend.append(make_record('2025-06-30T23:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-01T09:00:00', 'short', 5))
+        self.backend.append(make_record('2025-07-01T11:00:00', 'long', 25, completed=False))
+        self.backend.append(make_record('2025-07-02T10:00:00', 'long', 25))
+
+        records = list(self.backend.query(since='2025-07-01', until='2025-07-02'))
+        self.assertEqual([r['timestamp'] for r in records], ['2025-07-01T09:00:00', '2025-07-01T11:00:00'])
+
+        self.assertEqual(self.backend.aggregate('day', since='2025-07-01'), [
+            {'period': '2025-07-01', 'sessions': 2, 'completed': 1, 'minutes': 5},
+            {'period': '2025-07-02', 'sessions': 1, 'completed': 1, 'minutes': 25},
+        ])
+        self.assertEqual(self.backend.aggregate('month', session_type='long'),
+                         [{'period': '2025-07', 'sessions': 2, 'completed': 1, 'minutes': 25}])
+        with self.assertRaises(ValueError):
+            self.backend.aggregate('year')
+
+    def test_matches_journal_backend(self):
+        """Test that reports and rollups agree with the JSON store"""
+        journal_dir = self.test_dir / 'journal'
+        journal_dir.mkdir()
+        journal = JournalBackend(journal_dir)
+        for index, timestamp in enumerate(('2025-07-06T10:00:00', '2025-07-07T10:30:00',
+                                           '2025-07-07T23:59:59', '2025-07-13T10:00:00')):
+            record = make_record(timestamp, ('short', 'long')[index % 2], 5 + index, completed=index != 2)
+            journal.append(record)
+            self.backend.append(record)
+        for by in ('hour', 'day', 'week', 'month', None):
+            self.assertEqual(journal.aggregate(by), self.backend.aggregate(by))
+        self.assertEqual(journal.rollups(), self.backend.rollups())
+        self.assertEqual(journal.summary(), self.backend.summary())
+        self.assertEqual(journal.load()['sessions'], self.backend.load()['sessions'])
+
+    def test_migrates_json_stats_on_first_use(self):
+        """Test that counters kept only in stats.json carry over exactly"""
+        snapshot = {
+            'total_sessions': 150,
+            'sessions_by_type': {'short': 50, 'medium': 0, 'long': 100, 'custom': 0},
+            'total_minutes': 2750,
+            'sessions': [make_record('2025-07-01T09:00:00')]
+        }
+        with open(self.test_dir / 'stats.json', 'w') as f:
+            json.dump(snapshot, f)
+
+        self.backend.append(make_record('2025-07-02T09:00:00', 'short', 5))
+        summary = self.backend.summary()
+        self.assertEqual(summary['total_sessions'], 151)
+        self.assertEqual(summary['total_minutes'], 2755)
+        self.assertEqual(summary['sessions_by_type']['short'], 51)
+        self.assertEqual(len(list(self.backend.query())), 2)
+        self.assertTrue((self.test_dir / 'stats.json.migrated').exists())
+
+    def test_torn_record_is_ignored_and_cut(self):
+        """Test recovery from a crash in the middle of a write"""
+        self.backend.append(make_record('2025-07-01T09:00:00'))
+        with open(self.test_dir / 'sessions.bin', 'ab') as f:
+            f.write(b'\x01\x02\x03')
+        self.assertEqual(self.backend.summary()['total_sessions'], 1)
+        self.backend.append(make_record('2025-07-02T09:00:00'))
+        self.assertEqual(self.backend.summary()['total_sessions'], 2)
+        self.assertEqual(os.path.getsize(self.test_dir / 'sessions.bin'), 16 + 2 * 16)
+
+    def test_json_export_import_roundtrip(self):
+        """Test moving history between the binary and JSON stores"""
+        source = SessionStats(stats_dir=self.test_dir / 'source', backend='binary')
+        for day in range(1, 4):
+            source.backend.append(make_record(f'2025-07-{day:02d}T09:00:00', 'medium', 15))
+        export_file = self.test_dir / 'export.json'
+        self.assertEqual(source.export_json(export_file), 3)
+
+        target = SessionStats(stats_dir=self.test_dir / 'target', backend='binary')
+        target.backend.append(make_record('2025-07-02T12:00:00', 'short', 5))
+        self.assertEqual(target.import_json(export_file), 3)
+        timestamps = [r['timestamp'] for r in target.query_sessions()]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(target.get_summary()['total_minutes'], 50)
+
+        journal = SessionStats(stats_dir=self.test_dir / 'journal', backend='json')
+        journal.import_json(export_file)
+        self.assertEqual(journal.get_summary()['sessions_by_type']['medium'], 3)
+
+        with open(self.test_dir / 'bad.json', 'w') as f:
+            json.dump([1, 2, 3], f)
+        with self.assertRaises(ValueError):
+            target.import_json(self.test_dir / 'bad.json')
+
+
+class TestSessionStatsBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_sqlite_session_stats(self):
+        """Test SessionStats on top of the SQLite backend"""
+        stats = SessionStats(stats_dir=self.test_dir, backend='sqlite')
+        stats.log_session('custom', 10, completed=True)
+        stats.log_session('custom', 10, completed=False)
+        stats.log_session('long', 25, completed=True)
+
+        summary = stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 3)
+        self.assertEqual(summary['total_minutes'], 35)
+
+        custom = stats.get_range_summary(session_type='custom')
+        self.assertEqual(custom['sessions'], 2)
+        self.assertEqual(custom['completion_rate'], 0.5)
+        stats.backend.close()
+
+    def test_backend_from_environment(self):
+        """Test selecting the backend through SAMAYA_STATS_BACKEND"""
+        os.environ['SAMAYA_STATS_BACKEND'] = 'sqlite'
+        try:
+            stats = SessionStats(stats_dir=self.test_dir)
+        finally:
+            del os.environ['SAMAYA_STATS_BACKEND']
+        self.assertEqual(stats.backend.name, 'sqlite')
+        stats.backend.close()
+
+    def test_iter_sessions(self):
+        """Test that iter_sessions streams the same filtered sessions as query_sessions on every backend"""
+        now = datetime.now().replace(microsecond=0)
+        sessions = [make_record((now - timedelta(days=3, minutes=index * 40)).isoformat(),
+                                session_type=('long', 'short')[index % 2], completed=index % 3 != 0)
+                    for index in range(20)]
+        for backend in ('json', 'sqlite', 'binary'):
+            with self.subTest(backend=backend), SessionStats(Path(self.test_dir, backend), backend=backend) as stats:
+                stats.log_sessions(sorted(sessions, key=lambda record: record['timestamp']))
+                since = now - timedelta(days=3, hours=6)
+                records = list(stats.iter_sessions(since=since, until=date.today(), session_type='long', completed=True))
+                self.assertEqual([record.as_dict() for record in records],
+                                 stats.query_sessions(since, date.today(), 'long', True))
+                self.assertEqual(len(records), 3)
+                self.assertIsInstance(records[0], SessionRecord)
+                self.assertFalse(hasattr(records[0], '__dict__'))
+                self.assertEqual(len(list(stats.iter_sessions())), 20)
+
+    def test_iter_sessions_memory_stays_flat(self):
+        """Test that iterating a long history holds one record at a time"""
+        start = datetime(2024, 1, 1)
+        for backend in ('sqlite', 'binary'):
+            with self.subTest(backend=backend), SessionStats(Path(self.test_dir, backend), backend=backend) as stats:
+                stats.backend.append_many([make_record((start + timedelta(minutes=index * 30)).isoformat())
+                                           for index in range(50000)])
+                tracemalloc.start()
+                try:
+                    minutes = sum(record.duration for record in stats.iter_sessions(completed=True))
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.assertEqual(minutes, 50000 * 25)
+                self.assertLess(peak, 1024 * 1024)
+
+
+
+def append_records(backend_name, stats_dir, worker, count, barrier):
+    backend = open_backend(backend_name, Path(stats_dir), **({'compact_bytes': 2048} if backend_name == 'json' else {}))
+    barrier.wait()
+    for index in range(count):
+        backend.append(make_record(f'2025-07-10T10:{worker:02d}:{index % 60:02d}', duration=index % 5 + 1))
+    backend.close()
+
+
+class TestConcurrentWriters(unittest.TestCase):
+    """Several processes logging into one directory must not lose sessions"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def check_exact_counters(self, backend_name, processes=4, count=100):
+        barrier = multiprocessing.Barrier(processes)
+        workers = [
+            multiprocessing.Process(target=append_records, args=(backend_name, self.test_dir, worker, count, barrier))
+            for worker in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+
+        backend = open_backend(backend_name, Path(self.test_dir))
+        summary = backend.summary()
+        backend.close()
+        self.assertEqual(summary['total_sessions'], processes * count)
+        self.assertEqual(summary['total_minutes'], processes * sum(index % 5 + 1 for index in range(count)))
+        self.assertEqual(summary['sessions_by_type']['long'], processes * count)
+
+    def test_journal_appends_and_compactions_are_exact(self):
+        """Test concurrent appends across many forced compactions"""
+        self.check_exact_counters('json')
+
+    def test_sqlite_writers_are_exact(self):
+        """Test concurrent inserts into one database"""
+        self.check_exact_counters('sqlite')
+
+    def test_binary_writers_are_exact(self):
+        """Test concurrent appends of packed records"""
+        self.check_exact_counters('binary')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import json
+import io
+import sys
+import os
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import summarycache
+from src.stats import SessionStats
+from src.storage import JournalBackend
+
+
+class TestSummaryCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.sidecar = self.test_dir / 'summary.json'
+        summarycache._entries.clear()
+        self.stats = self.new_stats()
+        for minutes in (5, 15, 25):
+            self.stats.log_session('custom', minutes)
+    
+    def tearDown(self):
+        summarycache._entries.clear()
+        shutil.rmtree(self.test_dir)
+    
+    def new_stats(self, backend='json'):
+        return SessionStats(stats_dir=self.test_dir, backend=backend)
+    
+    def count_loads(self, stats):
+        return mock.patch.object(stats.backend, 'load', wraps=stats.backend.load)
+    
+    def test_repeated_summary_does_not_reload(self):
+        """Test that an unchanged history is loaded only once"""
+        with self.count_loads(self.stats) as load:
+            self.assertEqual(self.stats.get_summary()['total_minutes'], 45)
+            self.stats.get_summary()
+            self.stats.get_streaks()
+            self.stats.get_report('week')
+        self.assertEqual(load.call_count, 1)
+        self.assertTrue(self.sidecar.exists())
+    
+    def test_new_process_reads_the_sidecar(self):
+        """Test that a fresh process answers from the sidecar alone"""
+        self.stats.get_summary()
+        summarycache._entries.clear()
+        
+        stats = self.new_stats()
+        with self.count_loads(stats) as load, mock.patch('os.stat', wraps=os.stat) as stat:
+            with redirect_stdout(io.StringIO()) as output:
+                stats.display_stats()
+        self.assertEqual(load.call_count, 0)
+        self.assertIn('Total Time: 45 minutes', output.getvalue())
+        # The journal's identity is the only thing checked
+        self.assertEqual(stat.call_count, 1)
+    
+    def test_writes_from_elsewhere_are_noticed(self):
+        """Test that another writer's session changes the cache key"""
+        self.stats.get_summary()
+        JournalBackend(self.test_dir).append(
+            {'timestamp': '2025-07-01T09:00:00', 'type': 'short', 'duration': 5, 'completed': True})
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 4)
+        
+        JournalBackend(self.test_dir).compact()
+        with self.count_loads(self.stats) as load:
+            self.assertEqual(self.stats.get_summary()['total_minutes'], 50)
+        self.assertEqual(load.call_count, 1)
+    
+    def test_log_and_clear_invalidate(self):
+        """Test that log_session and clear_stats drop the cached entry"""
+        self.stats.get_summary()
+        self.stats.log_session('short', 5)
+        self.assertFalse(self.sidecar.exists())
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 4)
+        
+        with redirect_stdout(io.StringIO()):
+            self.stats.clear_stats()
+        self.assertFalse(self.sidecar.exists())
+        self.assertEqual(self.stats.get_summary()['total_sessions'], 0)
+    
+    def test_mismatched_sidecar_is_ignored(self):
+        """Test sidecars from other data or other backends"""
+        self.stats.get_summary()
+        with open(self.sidecar) as f:
+            entry = json.load(f)
+        entry['summary']['total_sessions'] = 1000
+        for changes in ({'version': [0, 0, 0]}, {'backend': 'binary'}):
+            summarycache._entries.clear()
+            with open(self.sidecar, 'w') as f:
+                json.dump(dict(entry, **changes), f)
+            self.assertEqual(self.new_stats().get_summary()['total_sessions'], 3)
+        
+        summarycache._entries.clear()
+        self.sidecar.write_text('{not json')
+        self.assertEqual(self.new_stats().get_summary()['total_sessions'], 3)
+    
+    def test_binary_backend(self):
+        """Test caching over the packed record file"""
+        stats = self.new_stats('binary')
+        # The first use migrates the JSON history, before any file exists to key on
+        self.assertEqual(stats.get_summary()['total_sessions'], 3)
+        with self.count_loads(stats) as load:
+            stats.get_summary()
+            self.assertEqual(stats.get_summary()['total_minutes'], 45)
+        self.assertEqual(load.call_count, 1)
+        stats.log_session('long', 25)
+        self.assertEqual(stats.get_summary()['total_minutes'], 70)
+    
+    def test_lru_is_bounded(self):
+        """Test that the in-process cache keeps a fixed number of directories"""
+        for index in range(summarycache.SUMMARY_CACHE_ENTRIES + 3):
+            directory = self.test_dir / str(index)
+            stats = SessionStats(stats_dir=directory, backend='json')
+            stats.log_session('short', 5)
+            stats.get_summary()
+        self.assertEqual(len(summarycache._entries), summarycache.SUMMARY_CACHE_ENTRIES)
+
+
+if __name__ == '__main__':
+    unittest.main()
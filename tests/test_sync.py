@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import json
+import tempfile
+import shutil
+import socket
+import threading
+import urllib.request
+import sys
+import os
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sync import SyncQueue, SyncClient, Syncer, SyncError, load_sync_config
+from src.collector import CollectorStore, make_collector
+from src.history import read_history
+from src.clock import ManualClock
+from src.timer import SessionTimer
+
+
+def session(minute, session_type='long', duration=25, completed=True):
+    return {
+        'timestamp': (datetime(2025, 7, 1) + timedelta(minutes=minute)).isoformat(),
+        'type': session_type,
+        'duration': duration,
+        'completed': completed
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeClient:
+    """Stands in for SyncClient, failing the first sends as told"""
+    
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.batches = []
+        self.requests = 0
+    
+    def send(self, records):
+        self.requests += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append(records)
+        return {'accepted': len(records), 'duplicates': 0}
+    
+    def close(self):
+        pass
+
+
+class TestSyncQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.queue = SyncQueue(Path(self.test_dir, 'sync'))
+    
+    def test_batches_and_acknowledgements(self):
+        """Test that acknowledged sessions are not sent again and a drained queue is emptied"""
+        self.queue.append([session(minute) for minute in range(5)])
+        with open(self.queue.queue_file, 'a') as f:
+            f.write('{"timestamp": "torn')
+        batches = list(self.queue.batches(2))
+        self.assertEqual([len(batch) for _, batch in batches], [2, 2, 1])
+        self.assertEqual(self.queue.pending(), 5)
+        
+        self.queue.ack(batches[0][0])
+        self.assertEqual([record for _, batch in self.queue.batches(10) for record in batch],
+                         [session(minute) for minute in range(2, 5)])
+        with open(self.queue.queue_file, 'a') as f:
+            f.write('", "type": "long"}\nnot json\n')
+        offset, batch = list(self.queue.batches(10))[-1]
+        self.assertEqual(len(batch), 3)
+        self.queue.ack(offset)
+        self.assertEqual(self.queue.queue_file.stat().st_size, 0)
+        self.assertEqual(self.queue.pending(), 0)
+
+
+class TestSyncer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.queue = SyncQueue(Path(self.test_dir, 'sync'))
+        self.now = 1000.0
+        self.sleeps = []
+    
+    def syncer(self, client, batch_size=1000):
+        return Syncer(self.queue, client, batch_size, sleep=self.sleeps.append, clock=lambda: self.now)
+    
+    def test_retries_with_exponential_backoff(self):
+        """Test that retryable failures are retried with growing delays"""
+        client = FakeClient([SyncError("503"), SyncError("503")])
+        self.queue.append([session(1)])
+        self.assertEqual(self.syncer(client).flush(retries=3), (1, None))
+        self.assertEqual(client.requests, 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0.5 <= self.sleeps[0] <= 1 and 1 <= self.sleeps[1] <= 2)
+        
+        client = FakeClient([SyncError("400", retryable=False)])
+        self.queue.append([session(2)])
+        sent, error = self.syncer(client).flush(retries=3)
+        self.assertEqual((sent, client.requests), (0, 1))
+        self.assertTrue(error.startswith("400; 1 sessions moved to"))
+    
+    def test_rejected_batch_is_set_aside(self):
+        """Test that a batch the collector refuses does not hold up the sessions behind it"""
+        client = FakeClient([SyncError("Collector answered 400 Bad Request", retryable=False)])
+        self.queue.append([session(minute) for minute in range(5)])
+        sent, error = self.syncer(client, batch_size=2).flush()
+        self.assertEqual(sent, 3)
+        self.assertIn('2 sessions moved to', error)
+        self.assertEqual([record for batch in client.batches for record in batch], [session(minute) for minute in range(2, 5)])
+        with open(self.queue.rejected_file) as f:
+            self.assertEqual(list(read_history(f, 'jsonl', 'rejected')), [session(0), session(1)])
+        self.assertEqual(self.queue.pending(), 0)
+        self.assertEqual(self.queue.load_state(), {'failures': 0, 'retry_at': 0})
+        self.assertEqual(self.syncer(client).flush(), (0, None))
+    
+    def test_offline_backs_off_across_flushes(self):
+        """Test that a failed flush keeps sessions queued and delays the next automatic one"""
+        client = FakeClient([SyncError("offline")] * 2)
+        syncer = self.syncer(client)
+        self.queue.append([session(1), session(2)])
+        self.assertEqual(syncer.flush(), (0, "offline"))
+        state = self.queue.load_state()
+        self.assertEqual(state['failures'], 1)
+        self.assertTrue(self.now + 1 <= state['retry_at'] <= self.now + 2)
+        
+        sent, error = syncer.flush()
+        self.assertEqual(sent, 0)
+        self.assertIn('Waiting until', error)
+        self.assertEqual(client.requests, 1)
+        
+        self.assertEqual(syncer.flush(force=True), (0, "offline"))
+        self.assertEqual(self.queue.load_state()['failures'], 2)
+        self.now = self.queue.load_state()['retry_at']
+        self.assertEqual(syncer.flush(), (2, None))
+        self.assertEqual(self.queue.load_state(), {'failures': 0, 'retry_at': 0})
+    
+    def test_one_sender_at_a_time(self):
+        """Test that a flush leaves the queue alone while another process is sending"""
+        from src.locking import file_lock
+        self.queue.append([session(1)])
+        with file_lock(self.queue.flush_lock):
+            self.assertEqual(self.syncer(FakeClient()).flush(), (0, "Another samaya process is sending"))
+        self.assertEqual(self.queue.pending(), 1)
+    
+    def test_config(self):
+        """Test that sync is off without a URL and reads sync.json otherwise"""
+        with mock.patch.dict(os.environ, {'SAMAYA_SYNC_URL': ''}):
+            self.assertIsNone(load_sync_config(self.test_dir))
+            with open(Path(self.test_dir, 'sync.json'), 'w') as f:
+                json.dump({'url': 'http://collector:8750/sessions', 'user': 'ana', 'batch_size': 50}, f)
+            self.assertEqual(load_sync_config(self.test_dir),
+                             {'url': 'http://collector:8750/sessions', 'user': 'ana', 'batch_size': 50})
+        with mock.patch.dict(os.environ, {'SAMAYA_SYNC_URL': 'http://localhost:1/sessions'}):
+            self.assertEqual(load_sync_config(self.test_dir)['url'], 'http://localhost:1/sessions')
+        with self.assertRaises(ValueError):
+            SyncClient('ftp://collector/sessions', 'ana')
+
+
+class TestCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.store = CollectorStore(Path(self.test_dir, 'collector'))
+        self.addCleanup(self.store.close)
+        self.server = make_collector(self.store, 0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def test_week_offline_drains_in_few_requests(self):
+        """Test that a backlog goes out in gzipped batches over one connection, once"""
+        records = [session(minute * 30, completed=minute % 5 != 0) for minute in range(2500)]
+        queue = SyncQueue(Path(self.test_dir, 'sync'))
+        queue.append(records)
+        client = SyncClient(f"{self.url}/sessions", 'ana')
+        self.assertEqual(Syncer(queue, client).flush(), (2500, None))
+        self.assertEqual((client.requests, client.connections), (3, 1))
+        self.assertEqual(queue.pending(), 0)
+        
+        # Sending the same sessions again, e.g. after a lost reply, adds nothing
+        self.assertEqual(client.send(records[:10]), {'accepted': 0, 'duplicates': 10})
+        with urllib.request.urlopen(f"{self.url}/summary", timeout=5) as response:
+            summary = json.loads(response.read())
+        self.assertEqual(summary['ana']['sessions'], 2500)
+        self.assertEqual(summary['ana']['completed'], 2000)
+        self.assertEqual(summary['ana']['minutes'], 2000 * 25)
+    
+    def test_bad_batches_are_rejected(self):
+        """Test that a malformed batch is refused and not retried"""
+        client = SyncClient(f"{self.url}/sessions", 'ana')
+        with self.assertRaises(SyncError) as raised:
+            client.send([dict(session(1), duration=-5)])
+        self.assertFalse(raised.exception.retryable)
+        self.assertIn('400', str(raised.exception))
+        client.close()
+    
+    def test_unreachable_collector(self):
+        """Test that a collector that is down fails the flush without losing sessions"""
+        queue = SyncQueue(Path(self.test_dir, 'sync'))
+        queue.append([session(1)])
+        sent, error = Syncer(queue, SyncClient(f"http://127.0.0.1:{free_port()}/sessions", 'ana')).flush()
+        self.assertEqual(sent, 0)
+        self.assertIn('Could not reach', error)
+        self.assertEqual(queue.pending(), 1)
+
+
+class TestTimerSync(unittest.TestCase):
+
+    def test_logged_sessions_are_queued_and_sent(self):
+        """Test that the record logged for a session is what gets sent"""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        timer = SessionTimer(clock=ManualClock(), control=False, display='quiet')
+        timer.audio_player.start_brown_noise = lambda: False
+        timer.audio_player.play_bell_sound = lambda: None
+        from src.stats import SessionStats
+        timer.stats = SessionStats(Path(test_dir))
+        client = FakeClient()
+        timer.sync = Syncer(SyncQueue(Path(test_dir, 'sync')), client)
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(timer.start_custom_session(1))
+        self.assertTrue(timer.wait_for_completion(5))
+        self.assertEqual(client.batches, [timer.stats.query_sessions()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 
 import unittest
+import io
 import sys
 import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import redirect_stdout
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.timer import SessionTimer
+from src.clock import ManualClock
 
 
 class TestSessionTimer(unittest.TestCase):
@@ -39,6 +46,99 @@ class TestSessionTimer(unittest.TestCase):
         except Exception as e:
             self.fail(f"list_modes() raised an exception: {e}")
 
+    
+    def test_run_timer_with_manual_clock(self):
+        """Test that a full countdown runs instantly on a manual clock"""
+        clock = ManualClock()
+        timer = SessionTimer(clock=clock, display='line')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            timer._run_timer(25 * 60)
+        
+        self.assertTrue(output.getvalue().startswith('\rTime remaining: 25:00'))
+        self.assertEqual(output.getvalue().split('\r')[-1].split('\b')[-1], '1')
+        self.assertEqual(timer.renderer.writes, 1500)
+        self.assertEqual(clock.now(), 1500)
+    
+    def test_countdown_into_a_pipe_writes_a_line_a_minute(self):
+        """Test that a session whose output is not a terminal logs the time once a minute"""
+        timer = SessionTimer(clock=ManualClock())
+        output = io.StringIO()
+        with redirect_stdout(output):
+            timer._run_timer(25 * 60)
+        
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual((lines[0], lines[-1]), ('Time remaining: 25:00', 'Time remaining: 01:00'))
+        self.assertEqual(timer.renderer.writes, 25)
+
+    
+    def test_extended_then_aborted_session_is_logged(self):
+        """Test that an aborted session is logged incomplete with its extended length"""
+        clock = ManualClock()
+        timer = SessionTimer(clock=clock, control=False)
+        timer.audio_player.start_brown_noise = lambda: False
+        stats_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, stats_dir)
+        timer.stats.stats_dir = Path(stats_dir)
+        timer.stats.stats_file = timer.stats.stats_dir / 'stats.json'
+        
+        def control(seconds_left):
+            if seconds_left == 60 and timer.countdown.duration == 5 * 60:
+                timer.countdown.extend(5 * 60)
+            elif seconds_left == 30:
+                timer.countdown.abort()
+        timer._show_remaining = control
+        
+        with redirect_stdout(io.StringIO()):
+            self.assertFalse(timer.start_session('short'))
+        self.assertTrue(timer.wait_for_completion())
+        
+        summary = timer.stats.get_summary()
+        self.assertEqual(summary['total_sessions'], 1)
+        self.assertEqual(summary['total_minutes'], 0)
+        self.assertEqual(timer.stats.query_sessions()[0]['duration'], 10)
+    
+    def test_completion_does_not_wait_for_the_bell(self):
+        """Test that a finished session returns while the bell still rings"""
+        clock = ManualClock()
+        timer = SessionTimer(clock=clock, control=False)
+        timer.audio_player.start_brown_noise = lambda: False
+        ringing = threading.Event()
+        timer.audio_player.play_bell_sound = lambda: ringing.wait(5)
+        logged = []
+        timer.stats.log_session = lambda *args, **kwargs: logged.append((args, kwargs))
+        hooked = []
+        timer.completion_hooks.append(hooked.append)
+        timer._show_remaining = lambda seconds_left: None
+        
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(timer.start_custom_session(1))
+        self.assertFalse(timer.wait_for_completion(0.05))
+        self.assertEqual(logged, [(('custom', 1), {'completed': True})])
+        self.assertEqual(hooked, [{'type': 'custom', 'minutes': 1, 'completed': True}])
+        
+        ringing.set()
+        self.assertTrue(timer.wait_for_completion(5))
+    
+    def test_embedded_with_its_own_stats(self):
+        """Test that a program can hand the timer its own stats store and read the history back"""
+        from src import SessionStats, SessionRecord
+        stats_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, stats_dir)
+        with SessionStats(stats_dir, backend='sqlite') as stats:
+            timer = SessionTimer(clock=ManualClock(), control=False, display='quiet', stats=stats)
+            self.assertIs(timer.stats, stats)
+            timer.audio_player.start_brown_noise = lambda: False
+            timer.audio_player.play_bell_sound = lambda: None
+            with redirect_stdout(io.StringIO()):
+                self.assertTrue(timer.start_custom_session(1))
+            self.assertTrue(timer.wait_for_completion(5))
+            sessions = list(stats.iter_sessions(session_type='custom', completed=True))
+        self.assertEqual(len(sessions), 1)
+        self.assertIsInstance(sessions[0], SessionRecord)
+        self.assertEqual((sessions[0].type, sessions[0].duration), ('custom', 1))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import threading
+import sys
+import os
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.workers import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_jobs_run_in_the_background(self):
+        """Test that submit returns before the job finishes"""
+        pool = WorkerPool(workers=2)
+        release = threading.Event()
+        job = pool.submit(release.wait, 5)
+        self.assertFalse(job.done())
+        self.assertFalse(pool.drain(0.01))
+        release.set()
+        self.assertTrue(pool.drain(5))
+        self.assertTrue(job.result)
+        self.assertIsNotNone(job.elapsed)
+    
+    def test_slow_job_does_not_block_others(self):
+        """Test that a stuck job leaves the other workers free"""
+        pool = WorkerPool(workers=2)
+        release = threading.Event()
+        pool.submit(release.wait, 5)
+        quick = pool.submit(lambda: 42)
+        self.assertTrue(quick.wait(5))
+        self.assertEqual(quick.result, 42)
+        release.set()
+        self.assertTrue(pool.drain(5))
+    
+    def test_errors_are_kept_on_the_job(self):
+        """Test that a failing job is reported without killing its worker"""
+        pool = WorkerPool(workers=1)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            failed = pool.submit(lambda: 1 / 0)
+            after = pool.submit(lambda: 'ok')
+            self.assertTrue(pool.drain(5))
+        self.assertIsInstance(failed.error, ZeroDivisionError)
+        self.assertEqual(after.result, 'ok')
+        self.assertIn('Background task failed', output.getvalue())
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test back-pressure: submit gives up after submit_timeout"""
+        pool = WorkerPool(workers=1, max_pending=1, submit_timeout=0.01)
+        release = threading.Event()
+        pool.submit(release.wait, 5)
+        # Wait until the worker has taken the first job off the queue
+        while pool._queue.qsize():
+            threading.Event().wait(0.001)
+        self.assertIsNotNone(pool.submit(lambda: None))
+        self.assertIsNone(pool.submit(lambda: None))
+        self.assertEqual(pool.dropped, 1)
+        release.set()
+        self.assertTrue(pool.drain(5))
+
+
+if __name__ == '__main__':
+    unittest.main()